@@ -0,0 +1,216 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from werkzeug.wrappers import Request as WsgiRequest, Response as WsgiResponse
+
+logger = logging.getLogger(__name__)
+
+ASGI_BRIDGE_CHUNK_BYTES = int(os.getenv("ASGI_BRIDGE_CHUNK_BYTES", str(256 * 1024)))
+# Bound on the app's lifespan startup/shutdown, so a stuck hook cannot hang an instance
+ASGI_BRIDGE_LIFESPAN_TIMEOUT_SEC = float(os.getenv("ASGI_BRIDGE_LIFESPAN_TIMEOUT_SEC", "30"))
+# Bound on the wait for response headers, so a stuck route cannot pin the invocation thread.
+# Kept under the function's 60s timeout so the client gets a 504 rather than a dropped connection.
+ASGI_BRIDGE_START_TIMEOUT_SEC = float(os.getenv("ASGI_BRIDGE_START_TIMEOUT_SEC", "55"))
+
+_END = object()
+
+
+class AsgiFunctionBridge:
+    """
+    Serves an ASGI app (the FastAPI `app`) from a WSGI-style function handler such as a
+    Firebase https_fn.on_request function.
+
+    The app runs on one event loop in a daemon thread that lives as long as the instance,
+    so async clients, connection pools, caches and lifespan-started workers are reused
+    across warm invocations. Each invocation thread blocks on its own request only.
+    """
+
+    def __init__(self, app: Any, root_path_aliases: Optional[Dict[str, str]] = None,
+                 chunk_bytes: int = ASGI_BRIDGE_CHUNK_BYTES):
+        self.app = app
+        # Exact paths to rewrite, e.g. the bare function URL "/" onto "/analyze"
+        self.path_aliases = root_path_aliases or {}
+        self.chunk_bytes = chunk_bytes
+        self.invocations = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._lifespan_queue: Optional[asyncio.Queue] = None
+        self._lifespan_sent: Optional[asyncio.Queue] = None
+        self._lifespan_task: Optional[asyncio.Task] = None
+
+    # --- loop and lifespan ---
+
+    def start(self):
+        """Starts the loop thread and runs the app's lifespan startup. Idempotent."""
+        with self._lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=run, name="asgi-bridge-loop", daemon=True).start()
+            ready.wait()
+            self.loop = loop
+            try:
+                self._submit(self._lifespan_startup()).result(timeout=ASGI_BRIDGE_LIFESPAN_TIMEOUT_SEC)
+            except Exception as e:
+                logger.error(f"ASGI lifespan startup failed: {e}")
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Runs the lifespan shutdown and stops the loop thread."""
+        with self._lock:
+            loop, self.loop = self.loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._lifespan_shutdown(), loop).result(timeout=ASGI_BRIDGE_LIFESPAN_TIMEOUT_SEC)
+        except Exception as e:
+            logger.warning(f"ASGI lifespan shutdown failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _submit(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _lifespan_reply(self) -> Optional[Dict[str, Any]]:
+        """Next lifespan message from the app, or None if the app does not speak lifespan."""
+        reply = asyncio.ensure_future(self._lifespan_sent.get())
+        await asyncio.wait({reply, self._lifespan_task}, return_when=asyncio.FIRST_COMPLETED)
+        if reply.done():
+            return reply.result()
+        reply.cancel()
+        return None
+
+    async def _lifespan_startup(self):
+        self._lifespan_queue = asyncio.Queue()
+        self._lifespan_sent = asyncio.Queue()
+        self._lifespan_queue.put_nowait({"type": "lifespan.startup"})
+        self._lifespan_task = asyncio.ensure_future(self.app(
+            {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}},
+            self._lifespan_queue.get, self._lifespan_sent.put
+        ))
+        message = await self._lifespan_reply()
+        if message is not None and message["type"] == "lifespan.startup.failed":
+            raise RuntimeError(message.get("message", "lifespan startup failed"))
+
+    async def _lifespan_shutdown(self):
+        if self._lifespan_task is None or self._lifespan_task.done():
+            return
+        self._lifespan_queue.put_nowait({"type": "lifespan.shutdown"})
+        await self._lifespan_reply()
+
+    # --- requests ---
+
+    def _scope(self, request: "WsgiRequest") -> Dict[str, Any]:
+        path = self.path_aliases.get(request.path, request.path)
+        environ = request.environ
+        server_port = int(environ.get("SERVER_PORT") or (443 if request.scheme == "https" else 80))
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": environ.get("SERVER_PROTOCOL", "HTTP/1.1").split("/")[-1],
+            "method": request.method,
+            "scheme": request.scheme,
+            "path": path,
+            "raw_path": path.encode("latin-1", "replace"),
+            "root_path": "",
+            "query_string": environ.get("QUERY_STRING", "").encode("latin-1"),
+            "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in request.headers.items()],
+            "client": (request.remote_addr or "", 0),
+            "server": (environ.get("SERVER_NAME", "localhost"), server_port),
+            "state": {},
+        }
+
+    @staticmethod
+    def _error_response(response_class, status: int, detail: str) -> "WsgiResponse":
+        return response_class(json.dumps({"detail": detail}), status=status, mimetype="application/json")
+
+    def handle(self, request: "WsgiRequest") -> "WsgiResponse":
+        """
+        Runs one invocation through the app. Returns once the response headers are ready;
+        the body is streamed from the loop, so SSE and NDJSON responses flow as produced.
+        """
+        # Only the function runtime calls this; uvicorn deployments never load werkzeug
+        from werkzeug.wrappers import Response as WsgiResponse
+        self.start()
+        self.invocations += 1
+        loop = self.loop
+        stream = request.stream
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        started: Future = Future()
+        # Set on the loop once the response is complete or the client has gone away
+        finished = asyncio.Event()
+        body_read = False
+
+        async def receive():
+            nonlocal body_read
+            if body_read:
+                # Apps that listen for disconnects keep calling receive while they respond
+                await finished.wait()
+                return {"type": "http.disconnect"}
+            # The function runtime's input stream is blocking; read it off the loop
+            data = await asyncio.to_thread(stream.read, self.chunk_bytes)
+            body_read = not data
+            return {"type": "http.request", "body": data or b"", "more_body": bool(data)}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.set_result((message["status"], message.get("headers", [])))
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body:
+                    chunks.put(body)
+                if not message.get("more_body", False):
+                    finished.set()
+
+        async def run():
+            try:
+                await self.app(self._scope(request), receive, send)
+            except Exception as e:
+                logger.error(f"ASGI app raised: {e}")
+                if not started.done():
+                    started.set_exception(e)
+            finally:
+                finished.set()
+                chunks.put(_END)
+
+        task = self._submit(run())
+        try:
+            status, raw_headers = started.result(timeout=ASGI_BRIDGE_START_TIMEOUT_SEC)
+        except FutureTimeoutError:
+            task.cancel()
+            logger.error(f"ASGI app did not start a response for {request.path} within {ASGI_BRIDGE_START_TIMEOUT_SEC}s")
+            return self._error_response(WsgiResponse, 504, "Request timed out")
+        except Exception:
+            return self._error_response(WsgiResponse, 500, "Internal Server Error")
+        headers: List[Tuple[str, str]] = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in raw_headers]
+
+        def body() -> Iterator[bytes]:
+            try:
+                while True:
+                    chunk = chunks.get()
+                    if chunk is _END:
+                        return
+                    yield chunk
+            finally:
+                # Closed early by the runtime: tell the app its client disconnected
+                loop.call_soon_threadsafe(finished.set)
+
+        content_type = next((v for k, v in headers if k.lower() == "content-type"), "")
+        if content_type.startswith(("text/event-stream", "application/x-ndjson")):
+            return WsgiResponse(body(), status=status, headers=headers, direct_passthrough=True)
+        # Buffer ordinary responses so the runtime can set Content-Length
+        return WsgiResponse(b"".join(body()), status=status, headers=headers)
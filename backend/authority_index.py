@@ -0,0 +1,276 @@
+import functools
+import json
+import logging
+import os
+import urllib.parse
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from domain_registry import MemoryRegistry
+
+logger = logging.getLogger(__name__)
+
+# JSON file replacing DEFAULT_AUTHORITY_TIERS: {"default_score": 0.7, "tiers": [{"name", "score", "domains" | "source"}]}
+AUTHORITY_TIERS_PATH = os.getenv("AUTHORITY_TIERS_PATH", "")
+# Distinct raw domain strings remembered per index; segments cite the same few sources over and over
+AUTHORITY_CACHE_SIZE = int(os.getenv("AUTHORITY_CACHE_SIZE", "65536"))
+# A full cache that misses more often than it hits doubles, up to this many entries (~200 bytes each)
+AUTHORITY_CACHE_MAX_SIZE = int(os.getenv("AUTHORITY_CACHE_MAX_SIZE", "262144"))
+# Misses between hit-rate checks
+_CACHE_CHECK_INTERVAL = 8192
+# Registries up to this many domains are decoded into the trie when an index is built, which
+# halves the uncached lookup cost; larger ones are searched in place in the shared mapping
+AUTHORITY_INLINE_VERIFIED_MAX = int(os.getenv("AUTHORITY_INLINE_VERIFIED_MAX", "20000"))
+# Full public_suffix_list.dat (https://publicsuffix.org/list/); the built-in excerpt covers common ccTLD zones
+PUBLIC_SUFFIX_LIST_PATH = os.getenv("PUBLIC_SUFFIX_LIST_PATH", "")
+
+# Earlier tiers win. Every entry matches itself and its subdomains, so "gov" covers any
+# *.gov host, "reuters.com" covers uk.reuters.com, and "pdf" covers an uploaded "report.pdf".
+# A tier with "source": "verified_domains" matches hosts listed in the verified fact-checker registry.
+DEFAULT_AUTHORITY_TIERS: List[Dict[str, Any]] = [
+    {"name": "verified_fact_checker", "score": 1.0, "source": "verified_domains"},
+    {"name": "institutional", "score": 1.0, "domains": ["gov", "edu", "int"]},
+    {"name": "high_authority", "score": 0.9, "domains": ["org", "bbc.com", "bbc.co.uk", "reuters.com", "apnews.com", "npr.org"]},
+    {"name": "encyclopedia", "score": 0.8, "domains": ["wikipedia.org"]},
+    {"name": "social_media", "score": 0.4, "domains": ["twitter.com", "x.com", "facebook.com", "instagram.com", "tiktok.com", "reddit.com", "youtube.com"]},
+    {"name": "uploaded_file", "score": 1.0, "domains": ["pdf", "jpg", "jpeg", "png", "txt", "docx"]},
+]
+DEFAULT_AUTHORITY_SCORE = 0.7
+
+# Multi-label public suffixes seen among fact-checkers and news sources. Single labels
+# (com, uk, my, ...) are always public suffixes, as in the PSL's implicit "*" rule.
+_BUILTIN_PUBLIC_SUFFIXES = """
+co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk
+com.au net.au org.au edu.au gov.au asn.au
+com.my net.my org.my edu.my gov.my mil.my name.my
+com.sg net.sg org.sg edu.sg gov.sg
+co.id or.id ac.id go.id web.id
+com.ph net.ph org.ph edu.ph gov.ph
+co.in net.in org.in ac.in gov.in nic.in
+co.jp ne.jp or.jp ac.jp go.jp
+co.kr or.kr ac.kr go.kr
+com.cn net.cn org.cn edu.cn gov.cn
+com.hk org.hk edu.hk gov.hk
+com.tw org.tw edu.tw gov.tw
+co.nz org.nz ac.nz govt.nz
+co.za org.za ac.za gov.za
+com.br org.br gov.br jus.br
+com.ar org.ar gob.ar
+com.mx org.mx gob.mx
+com.tn com.tr org.tr gov.tr
+com.ng gov.ng com.pk gov.pk com.bd gov.bd com.np com.lk com.eg gov.eg
+co.ke or.ke go.ke co.ug co.tz co.zw
+com.ua org.ua gov.ua
+github.io blogspot.com wordpress.com substack.com medium.com
+""".split()
+
+
+class AuthorityMatch(NamedTuple):
+    score: float
+    tier: str
+
+    @property
+    def verified(self) -> bool:
+        return self.tier == "verified_fact_checker"
+
+
+def normalize_domain_name(domain: str) -> str:
+    """Host part of a domain or URL: lower-cased, without scheme, www., port or trailing dot."""
+    if not domain:
+        return ""
+    if "%" in domain:
+        domain = urllib.parse.unquote(domain)
+    domain = domain.strip().lower()
+    scheme_end = domain.find("://")
+    if scheme_end != -1:
+        domain = domain[scheme_end + 3:]
+    # netloc by hand, also for scheme-less "bbc.com/news": urlparse costs more than the whole tier lookup
+    for delimiter in "/?#":
+        if delimiter in domain:
+            domain = domain.split(delimiter, 1)[0]
+    domain = domain.rsplit("@", 1)[-1].split(":", 1)[0].rstrip(".")
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
+
+
+class PublicSuffixes:
+    """Public suffix rules as a set of reversed label tuples, plus wildcard and exception rules."""
+
+    def __init__(self, rules: Iterable[str]):
+        self.exact = set()
+        self.wildcards = set()
+        self.exceptions = set()
+        for rule in rules:
+            rule = rule.strip().lower()
+            if not rule or rule.startswith("//"):
+                continue
+            rule = rule.split()[0]
+            if rule.startswith("!"):
+                self.exceptions.add(tuple(reversed(rule[1:].split("."))))
+            elif rule.startswith("*."):
+                self.wildcards.add(tuple(reversed(rule[2:].split("."))))
+            else:
+                self.exact.add(tuple(reversed(rule.split("."))))
+
+    @classmethod
+    def load(cls, path: str = PUBLIC_SUFFIX_LIST_PATH) -> "PublicSuffixes":
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return cls(f)
+            except OSError as e:
+                logger.warning(f"Public suffix list {path} unreadable, using the built-in excerpt: {e}")
+        return cls(_BUILTIN_PUBLIC_SUFFIXES)
+
+    def suffix_labels(self, reversed_labels: List[str]) -> int:
+        """How many trailing labels of the host form its public suffix (at least 1)."""
+        longest = 1
+        for n in range(2, len(reversed_labels) + 1):
+            prefix = tuple(reversed_labels[:n])
+            if prefix in self.exceptions:
+                return n - 1
+            if prefix in self.exact or prefix[:-1] in self.wildcards:
+                longest = n
+        return longest
+
+    def is_public_suffix(self, domain: str) -> bool:
+        labels = domain.split(".")[::-1]
+        return self.suffix_labels(labels) >= len(labels)
+
+    def registrable_domain(self, domain: str) -> str:
+        """eTLD+1, e.g. news.bbc.co.uk -> bbc.co.uk; a bare public suffix is returned as is."""
+        labels = domain.split(".")[::-1]
+        keep = min(len(labels), self.suffix_labels(labels) + 1)
+        return ".".join(reversed(labels[:keep]))
+
+
+class AuthorityIndex:
+    """
+    Compiled domain-authority tiers: a trie over reversed domain labels
+    (gov -> example -> www) whose nodes carry the best tier of any entry at or above them,
+    so a lookup is one walk down the host's labels. Results are memoized in a bounded
+    LRU keyed by the raw domain string, which grows while the working set does not fit it.
+    """
+
+    def __init__(self, tiers: List[Dict[str, Any]], verified_domains: Any = (),
+                 default_score: float = DEFAULT_AUTHORITY_SCORE, public_suffixes: Optional[PublicSuffixes] = None,
+                 cache_size: int = AUTHORITY_CACHE_SIZE, max_cache_size: int = AUTHORITY_CACHE_MAX_SIZE,
+                 inline_verified_max: int = AUTHORITY_INLINE_VERIFIED_MAX):
+        self.default_score = default_score
+        self.public_suffixes = public_suffixes or PublicSuffixes.load()
+        # Large registries are queried in place rather than copied into the trie, so every process
+        # shares one mapped registry. The index is bound to the snapshot current when it was built.
+        if not hasattr(verified_domains, "has_key"):
+            verified_domains = MemoryRegistry(verified_domains)
+        self.verified = getattr(verified_domains, "snapshot", verified_domains)
+        self.tiers: List[AuthorityMatch] = []
+        self.entries = 0
+        self._registry_rank: Optional[int] = None
+        # node: {label: child}; the best tier index reachable at a node sits under the key ""
+        self._root: Dict[str, Any] = {}
+        for rank, tier in enumerate(tiers):
+            self.tiers.append(AuthorityMatch(float(tier["score"]), tier["name"]))
+            if tier.get("source") == "verified_domains":
+                if self._registry_rank is None:
+                    self._registry_rank = rank
+                continue
+            for entry in tier.get("domains", []):
+                domain = normalize_domain_name(entry)
+                if domain:
+                    self._insert(domain, rank)
+        # A few thousand decoded keys cost little memory and spare every uncached lookup the registry probes
+        self.verified_inline = self._registry_rank is not None and len(self.verified) <= inline_verified_max
+        if self.verified_inline:
+            for domain in self.verified:
+                # A listed bare zone ("com.au", "https") must not cover every host under it
+                if not self.public_suffixes.is_public_suffix(domain):
+                    self._insert(domain, self._registry_rank)
+            self._registry_rank = None
+        self._propagate(self._root, None)
+        self._default = AuthorityMatch(default_score, "default")
+        self.max_cache_size = max(cache_size, max_cache_size)
+        self._misses_until_check = _CACHE_CHECK_INTERVAL
+        self._checked_at = (0, 0)
+        self.lookup = functools.lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _insert(self, domain: str, rank: int):
+        node = self._root
+        for label in reversed(domain.split(".")):
+            if label:
+                node = node.setdefault(label, {})
+        if node.get("", rank) >= rank:
+            node[""] = rank
+            self.entries += 1
+
+    def _propagate(self, node: Dict[str, Any], inherited: Optional[int]):
+        own = node.get("")
+        best = own if inherited is None else (inherited if own is None else min(own, inherited))
+        if best is not None:
+            node[""] = best
+        for label, child in node.items():
+            if label:
+                self._propagate(child, best)
+
+    def _adapt_cache(self):
+        """Doubles a full LRU that missed more than it hit since the last check."""
+        self._misses_until_check = _CACHE_CHECK_INTERVAL
+        info = self.lookup.cache_info()
+        hits, misses = info.hits - self._checked_at[0], info.misses - self._checked_at[1]
+        self._checked_at = (info.hits, info.misses)
+        if not info.maxsize or info.currsize < info.maxsize or hits >= misses or info.maxsize >= self.max_cache_size:
+            return
+        size = min(self.max_cache_size, info.maxsize * 2)
+        logger.info(f"Authority cache hit rate {hits / (hits + misses):.0%} with {info.maxsize} entries; growing to {size}")
+        # The entries are rebuilt on demand; the old cache is dropped once in-flight calls finish
+        self._checked_at = (0, 0)
+        self.lookup = functools.lru_cache(maxsize=size)(self._lookup)
+
+    def _lookup(self, raw_domain: str) -> AuthorityMatch:
+        self._misses_until_check -= 1
+        if self._misses_until_check <= 0:
+            self._adapt_cache()
+        domain = normalize_domain_name(raw_domain)
+        node = self._root
+        rank = None
+        labels = domain.split(".")[::-1]
+        for label in labels:
+            node = node.get(label) if label else node
+            if node is None:
+                break
+            rank = node.get("", rank)
+        registry_rank = self._registry_rank
+        if registry_rank is not None and (rank is None or registry_rank < rank) and self._is_verified(labels):
+            rank = registry_rank
+        return self._default if rank is None else self.tiers[rank]
+
+    def _is_verified(self, labels: List[str]) -> bool:
+        """Whether the host or one of its parents is listed; a listed bare zone ("com.au") never matches."""
+        # Registry keys are label-reversed, the order `labels` is already in
+        n = self.verified.first_listed(labels)
+        while n:
+            if self.public_suffixes.suffix_labels(labels[:n]) < n:
+                return True
+            n = self.verified.first_listed(labels, n + 1)
+        return False
+
+    def score(self, raw_domain: str) -> float:
+        return self.lookup(raw_domain).score
+
+    def cache_info(self):
+        return self.lookup.cache_info()
+
+
+def load_tier_table(path: str = AUTHORITY_TIERS_PATH) -> Dict[str, Any]:
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                table = json.load(f)
+            return {"default_score": table.get("default_score", DEFAULT_AUTHORITY_SCORE), "tiers": table["tiers"]}
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Authority tier table {path} unusable, using the defaults: {e}")
+    return {"default_score": DEFAULT_AUTHORITY_SCORE, "tiers": DEFAULT_AUTHORITY_TIERS}
+
+
+def build_authority_index(verified_domains: Any, tier_table: Optional[Dict[str, Any]] = None) -> AuthorityIndex:
+    table = tier_table or load_tier_table()
+    return AuthorityIndex(table["tiers"], verified_domains, table["default_score"])
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Claims of one batch analysed at the same time; Gemini calls are further capped by the gateway and rate limiter
+ANALYSIS_BATCH_CONCURRENCY = int(os.getenv("ANALYSIS_BATCH_CONCURRENCY", "8"))
+ANALYSIS_BATCH_MAX_ITEMS = int(os.getenv("ANALYSIS_BATCH_MAX_ITEMS", "500"))
+
+
+async def run_bounded(items: List[Any], worker: Callable[[int, Any], Awaitable[Any]],
+                      concurrency: int = ANALYSIS_BATCH_CONCURRENCY) -> AsyncIterator[Tuple[int, Any, Optional[BaseException]]]:
+    """
+    Runs `worker(index, item)` over `items` with at most `concurrency` running at once and
+    yields (index, result, error) in completion order. A failing item yields its exception
+    instead of stopping the batch. Closing the iterator early (client gone) cancels the
+    items still running.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def drain():
+        while True:
+            try:
+                index, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                done.put_nowait((index, await worker(index, item), None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Batch item {index} failed: {e}")
+                done.put_nowait((index, None, e))
+
+    workers = [asyncio.ensure_future(drain()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await done.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
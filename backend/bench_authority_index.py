@@ -0,0 +1,150 @@
+"""
+Lookup cost of logic.get_authority_multiplier: the previous linear checks against
+authority_index.AuthorityIndex.
+
+The workload is --domains distinct hosts (subdomains of verified fact-checkers, news,
+.gov/.org, social media, uploaded file names and random unknown sites), looked up once
+each and then --repeats more times in shuffled order, as segments cite the same sources
+over and over. "legacy" is the old function including its DEBUG print (sent to
+/dev/null). "index cold" disables the LRU so every call walks the trie, with the verified
+domains decoded into it; "cold mapped" instead searches the memory-mapped registry on every
+call, as for registries above AUTHORITY_INLINE_VERIFIED_MAX. The default 100k distinct hosts
+exceed AUTHORITY_CACHE_SIZE, so "index" includes the LRU growing to fit them.
+
+Usage: python bench_authority_index.py [--domains N] [--repeats N] [--verified N]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import string
+import tempfile
+import time
+import urllib.parse
+
+from authority_index import AuthorityIndex, DEFAULT_AUTHORITY_TIERS
+from domain_registry import DomainRegistry, write_registry
+
+VERIFIED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend", "assets", "data", "verified_domains.json")
+
+
+def legacy_normalize(domain):
+    if not domain:
+        return ""
+    domain = urllib.parse.unquote(domain).strip().lower()
+    if domain.startswith("http://") or domain.startswith("https://"):
+        try:
+            domain = urllib.parse.urlparse(domain).netloc
+        except Exception:
+            pass
+    if domain.startswith("www."):
+        domain = domain[4:]
+    return domain
+
+
+def legacy_multiplier(domain, verified):
+    """get_authority_multiplier as it was before the compiled index."""
+    domain = legacy_normalize(domain)
+    is_verified_signatory = domain in verified
+    print(f"DEBUG: Domain {domain} verified status: {is_verified_signatory}")
+    if is_verified_signatory:
+        return 1.0
+    if domain.endswith('.gov') or domain.endswith('.edu') or domain.endswith('.int'):
+        return 1.0
+    if domain.endswith('.org') or domain in ['bbc.com', 'bbc.co.uk', 'reuters.com', 'apnews.com', 'npr.org']:
+        return 0.9
+    if domain in ['wikipedia.org', 'en.wikipedia.org']:
+        return 0.8
+    social_domains = ['twitter.com', 'x.com', 'facebook.com', 'instagram.com', 'tiktok.com', 'reddit.com', 'youtube.com']
+    if any(sd in domain for sd in social_domains):
+        return 0.4
+    if any(domain.lower().endswith(ext) for ext in ['.pdf', '.jpg', '.jpeg', '.png', '.txt', '.docx']):
+        return 1.0
+    return 0.7
+
+
+def load_verified(extra: int, rng: random.Random):
+    with open(VERIFIED_PATH, "r", encoding="utf-8") as f:
+        verified = set(json.load(f))
+    while len(verified) < extra:
+        verified.add(_word(rng) + "." + rng.choice(["com", "org", "net", "com.my", "co.uk", "in"]))
+    return verified
+
+
+def _word(rng: random.Random, n: int = 8) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(n))
+
+
+def make_domains(count: int, verified, rng: random.Random):
+    verified = sorted(verified)
+    shapes = [
+        lambda: rng.choice(verified),
+        lambda: "https://www." + rng.choice(verified) + "/" + _word(rng),
+        lambda: rng.choice(["www.", "news.", "uk.", ""]) + rng.choice(["reuters.com", "bbc.co.uk", "apnews.com", "npr.org"]),
+        lambda: _word(rng) + "." + rng.choice(["gov", "edu", "int", "org", "gov.my"]),
+        lambda: rng.choice(["m.", "", "www."]) + rng.choice(["twitter.com", "x.com", "facebook.com", "youtube.com"]),
+        lambda: _word(rng) + rng.choice([".pdf", ".png", ".docx"]),
+        lambda: _word(rng) + "." + _word(rng, 5) + rng.choice([".com", ".net", ".com.my", ".io"]),
+    ]
+    domains = set()
+    while len(domains) < count:
+        domains.add(rng.choice(shapes)())
+    return list(domains)
+
+
+def time_lookups(lookup, workload):
+    started = time.perf_counter()
+    for domain in workload:
+        lookup(domain)
+    return time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--domains", type=int, default=100_000, help="distinct hosts looked up")
+    arg_parser.add_argument("--repeats", type=int, default=4, help="extra shuffled passes over the same hosts")
+    arg_parser.add_argument("--verified", type=int, default=0, help="pad the verified list to this many entries")
+    args = arg_parser.parse_args()
+
+    rng = random.Random(7)
+    verified = load_verified(args.verified, rng)
+    domains = make_domains(args.domains, verified, rng)
+    workload = list(domains)
+    for _ in range(args.repeats):
+        workload.extend(rng.sample(domains, len(domains)))
+
+    # Verified fact-checkers come from a memory-mapped registry file, as in production
+    registry_dir = tempfile.TemporaryDirectory()
+    registry_path = os.path.join(registry_dir.name, "verified.vdr")
+    write_registry({domain: 1 for domain in verified if "." in domain}, registry_path)
+    registry = DomainRegistry(registry_path, json_path="")
+
+    started = time.perf_counter()
+    index = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, registry)
+    build_ms = (time.perf_counter() - started) * 1000
+    cold = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, registry, cache_size=0)
+    # The path registries above AUTHORITY_INLINE_VERIFIED_MAX take: probes into the mapped file
+    mapped = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, registry, cache_size=0, inline_verified_max=0)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = {
+            "legacy": time_lookups(lambda d: legacy_multiplier(d, verified), workload),
+            "index cold": time_lookups(cold.score, workload),
+            "cold mapped": time_lookups(mapped.score, workload),
+            "index": time_lookups(index.score, workload),
+        }
+        # Label-aware matching rates subdomains of listed sites and hosts like fox.com differently
+        changed = sum(1 for d in domains if legacy_multiplier(d, verified) != cold.score(d))
+
+    print(f"{len(domains)} distinct domains, {len(workload)} lookups, {len(verified)} verified, index built in {build_ms:.1f}ms ({index.entries} entries)")
+    for name, seconds in results.items():
+        print(f"{name:>11}: {seconds * 1000:8.1f}ms total  {seconds / len(workload) * 1e9:7.0f}ns/lookup  {results['legacy'] / seconds:6.1f}x")
+    info = index.cache_info()
+    print(f"LRU: {info.currsize} of {info.maxsize} entries, {info.hits / max(1, info.hits + info.misses):.0%} hits since it last grew")
+    print(f"scores that differ from legacy: {changed} of {len(domains)}")
+    registry_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Warm-invocation latency of the Firebase analyze function: the previous wrapper against
+asgi_bridge.AsgiFunctionBridge.
+
+"before" reproduces the old invocation shape: a new event loop and a new HTTP client per
+call, closed again before returning. "after" serves a FastAPI app through the bridge,
+whose loop and pooled client survive between invocations. Each invocation makes
+--calls upstream requests, standing in for URL fetches and the Gemini round trip.
+
+The default upstream is a local HTTP server, which measures loop and client setup only.
+Point --upstream at a real HTTPS endpoint to include TLS handshakes, which dominate in
+production.
+
+Usage: python bench_function_bridge.py [--invocations N] [--calls N] [--upstream URL]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from fastapi import FastAPI
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request as WsgiRequest
+
+from asgi_bridge import AsgiFunctionBridge
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # One write per response; otherwise Nagle and delayed ACKs add ~40ms per keep-alive request
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_local_upstream() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def make_app(upstream: str, calls: int) -> FastAPI:
+    clients = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        clients["http"] = httpx.AsyncClient(timeout=10.0)
+        yield
+        await clients["http"].aclose()
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/analyze")
+    async def analyze():
+        for _ in range(calls):
+            (await clients["http"].get(upstream)).raise_for_status()
+        return {"ok": True}
+
+    return app
+
+
+def before_invocation(upstream: str, calls: int):
+    """The old wrapper: fresh loop, fresh client, both torn down before returning."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def run():
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            for _ in range(calls):
+                (await client.get(upstream)).raise_for_status()
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+
+def time_invocations(invoke, invocations: int):
+    invoke()  # first call pays for imports and lifespan; only warm calls are compared
+    samples = []
+    for _ in range(invocations):
+        started = time.perf_counter()
+        invoke()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(name: str, samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:>7}: mean {statistics.mean(samples) * 1000:7.2f}ms  p50 {statistics.median(samples) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms")
+    return statistics.mean(samples)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--invocations", type=int, default=200, help="warm invocations per variant")
+    arg_parser.add_argument("--calls", type=int, default=3, help="upstream requests per invocation")
+    arg_parser.add_argument("--upstream", default="", help="upstream URL (default: local HTTP server)")
+    args = arg_parser.parse_args()
+
+    upstream = args.upstream or start_local_upstream()
+    bridge = AsgiFunctionBridge(make_app(upstream, args.calls))
+
+    def after_invocation():
+        response = bridge.handle(WsgiRequest(EnvironBuilder(path="/analyze", method="POST").get_environ()))
+        assert response.status_code == 200, response.status_code
+
+    print(f"{args.invocations} warm invocations, {args.calls} upstream call(s) each, upstream {upstream}")
+    before = summarize("before", time_invocations(lambda: before_invocation(upstream, args.calls), args.invocations))
+    after = summarize("after", time_invocations(after_invocation, args.invocations))
+    print(f"speedup: {before / after:.2f}x mean")
+    bridge.stop()
+
+
+if __name__ == "__main__":
+    main()
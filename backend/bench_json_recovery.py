@@ -0,0 +1,154 @@
+"""
+Corpus benchmark for json_recovery.recover_json against the previous regex repair.
+
+The corpus is every captured parse failure (failed_json_dump*.txt here, plus
+*failed_json* files in FORENSIC_CAPTURE_DIR) and synthetic defects applied to the
+clean model outputs in this directory: unescaped quotes, truncation, fences,
+double-escaped newlines and restarted answers.
+
+Usage: python bench_json_recovery.py [--repeat N] [--capture-dir DIR]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import time
+
+from json_recovery import JsonRecoveryError, recover_json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DUMP_SEPARATOR = "=" * 50 + "\n"
+CLEAN_OUTPUTS = ["model_output_dump.json", "demo_lemon_analysis.json"]
+
+
+def legacy_repair(raw_text: str) -> dict:
+    """The repair_and_parse_json implementation this benchmark replaces."""
+    json_match = re.search(r'\{.*\}', raw_text, re.DOTALL)
+    if not json_match:
+        raise ValueError("No JSON object found in text")
+    cleaned = re.sub(r',\s*([\]}])', r'\1', json_match.group(0))
+    try:
+        return json.loads(cleaned, strict=False)
+    except json.JSONDecodeError:
+        match = re.search(r'("analysis"\s*:\s*")(.*?)("\s*,\s*"multimodal_cross_check")', cleaned, re.DOTALL)
+        if match:
+            cleaned = cleaned[:match.start(2)] + match.group(2).replace('"', '\\"') + cleaned[match.end(2):]
+        return json.loads(cleaned, strict=False)
+
+
+def load_captured(capture_dir: str):
+    paths = sorted(glob.glob(os.path.join(BASE_DIR, "failed_json_dump*.txt")))
+    if capture_dir and os.path.isdir(capture_dir):
+        paths += sorted(glob.glob(os.path.join(capture_dir, "*failed_json*")))
+    corpus = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        # Dumps start with "ERROR: ...\n=====\n" ahead of the raw model text
+        if DUMP_SEPARATOR in text:
+            text = text.split(DUMP_SEPARATOR, 1)[1]
+        corpus.append((f"captured:{os.path.basename(path)}", text, None))
+    return corpus
+
+
+def load_synthetic():
+    corpus = []
+    for name in CLEAN_OUTPUTS:
+        path = os.path.join(BASE_DIR, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            clean = json.load(f)
+        if "analysis" not in clean:
+            continue
+        pretty = json.dumps(clean, indent=2, ensure_ascii=False)
+        fenced = f"```json\n{pretty}\n```"
+        analysis_end = pretty.index('"analysis"') + len(json.dumps(clean["analysis"], ensure_ascii=False)) + len('"analysis": ')
+
+        quoted = dict(clean, analysis=clean["analysis"] + ' Officials called it "a hoax", "baseless" and "false".')
+        unescaped = json.dumps(quoted, indent=2, ensure_ascii=False)
+        unescaped = unescaped.replace('\\"a hoax\\", \\"baseless\\" and \\"false\\"', '"a hoax", "baseless" and "false"')
+        for field in ("title", "snippet"):
+            unescaped = re.sub(r'("%s": ")' % field, r'\1The "quoted" ', unescaped, count=1)
+
+        variants = {
+            "fenced": (fenced, clean),
+            "unescaped_quotes": (unescaped, quoted),
+            "double_escaped_newlines": (pretty.replace("\\n", "\\\\n"), clean),
+            "trailing_commas": (re.sub(r'(\n\s*[\]}])', r',\1', pretty), clean),
+            "truncated_after_analysis": (fenced[:analysis_end + 200], clean),
+            "truncated_mid_citations": (pretty[:int(len(pretty) * 0.8)], clean),
+            "restarted_answer": (fenced[:len(fenced) // 2] + "\n" + fenced, clean),
+        }
+        for variant, (text, expected) in variants.items():
+            corpus.append((f"synthetic:{name}:{variant}", text, expected))
+    return corpus
+
+
+def attempt(parse, text):
+    try:
+        value = parse(text)
+        return value if isinstance(value, dict) else None
+    except (ValueError, JsonRecoveryError, RecursionError):
+        return None
+
+
+def fidelity(value, expected) -> str:
+    if value is None:
+        return "failed"
+    if expected is None:
+        return "parsed" if value.get("verdict") and value.get("analysis") else "partial"
+    same_verdict = value.get("verdict") == expected.get("verdict")
+    same_analysis = (value.get("analysis") or "").strip() == expected.get("analysis", "").strip()
+    return "exact" if same_verdict and same_analysis else ("parsed" if same_verdict else "partial")
+
+
+def time_parse(parse, text, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        attempt(parse, text)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=50, help="timing repetitions per document")
+    arg_parser.add_argument("--capture-dir", default=os.getenv("FORENSIC_CAPTURE_DIR", ""), help="extra forensic capture directory")
+    args = arg_parser.parse_args()
+
+    corpus = load_captured(args.capture_dir) + load_synthetic()
+    parsers = {"legacy": legacy_repair, "tolerant": lambda text: recover_json(text).value}
+    totals = {name: {"exact": 0, "parsed": 0, "partial": 0, "failed": 0, "seconds": 0.0} for name in parsers}
+
+    print(f"{'document':<58} {'bytes':>7} {'legacy':>9} {'tolerant':>9} {'legacy us':>10} {'tolerant us':>12}")
+    for label, text, expected in corpus:
+        row = []
+        for name, parse in parsers.items():
+            outcome = fidelity(attempt(parse, text), expected)
+            seconds = time_parse(parse, text, args.repeat)
+            totals[name][outcome] += 1
+            totals[name]["seconds"] += seconds
+            row.append((outcome, seconds))
+        print(f"{label[:58]:<58} {len(text):>7} {row[0][0]:>9} {row[1][0]:>9} {row[0][1] * 1e6:>10.0f} {row[1][1] * 1e6:>12.0f}")
+
+    total_bytes = sum(len(text) for _, text, _ in corpus)
+    print(f"\n{len(corpus)} documents, {total_bytes} bytes")
+    for name, stats in totals.items():
+        usable = stats["exact"] + stats["parsed"]
+        throughput = total_bytes / stats["seconds"] / 1e6 if stats["seconds"] else 0.0
+        print(f"{name:>9}: usable {usable}/{len(corpus)} (exact {stats['exact']}, partial {stats['partial']}, failed {stats['failed']}), {throughput:.1f} MB/s")
+
+    # Linear-time check: quote-heavy, truncated output 8x the size should take about 8x as long
+    def defective(units):
+        return '{"verdict": "FALSE", "analysis": "' + 'He said "no", then "yes". ' * units + '", "grounding_citations": [{"title": "x'
+    small = time_parse(parsers["tolerant"], defective(1000), args.repeat)
+    large = time_parse(parsers["tolerant"], defective(8000), args.repeat)
+    print(f"scaling: {len(defective(1000))} bytes {small * 1e6:.0f}us, {len(defective(8000))} bytes {large * 1e6:.0f}us ({large / small:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
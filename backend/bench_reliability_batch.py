@@ -0,0 +1,84 @@
+"""
+Re-scoring cost of logic.calculate_reliability called per response against
+reliability_batch.calculate_reliability_batch.
+
+The workload is --responses synthetic analyses shaped like stored ones (4-12 segments citing
+1-4 of up to 10 web chunks). The per-response loop prints its audit lines, which go to
+/dev/null here as they go to the log in production. Every batch result is checked against
+the per-response result.
+
+Usage: python bench_reliability_batch.py [--responses N] [--workers N] [--shard-size N]
+"""
+import argparse
+import contextlib
+import os
+import random
+import time
+
+from logic import calculate_reliability, get_authority_index
+from reliability_batch import NUMPY_AVAILABLE, SUMMARY_FIELDS, _score_shard, calculate_reliability_batch
+
+DOMAINS = ["afp.com", "reuters.com", "apnews.com", "cdc.gov", "who.int", "en.wikipedia.org", "x.com",
+           "youtube.com", "example.com", "news.example.co.uk", "blog.example.net", "snopes.com"]
+
+
+def make_responses(count, seed=1):
+    rng = random.Random(seed)
+    responses = []
+    for _ in range(count):
+        chunks = [{"domain": rng.choice(DOMAINS), "uri": f"https://{rng.choice(DOMAINS)}/{i}", "title": f"t{i}"}
+                  for i in range(rng.randint(3, 10))]
+        supports = []
+        for s in range(rng.randint(4, 12)):
+            indices = rng.sample(range(len(chunks)), rng.randint(1, min(4, len(chunks))))
+            supports.append({"segment": {"text": f"segment {s}"}, "groundingChunkIndices": indices,
+                             "confidenceScores": [round(rng.uniform(0.2, 1.0), 3) for _ in indices]})
+        responses.append({"grounding_supports": supports, "grounding_chunks": chunks, "grounding_citations": [],
+                          "is_multimodal_verified": rng.random() < 0.2, "ai_confidence": rng.random()})
+    return responses
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:7.2f}s  {count / elapsed:>10,.0f} responses/s")
+    return result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--responses", type=int, default=20000)
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument("--shard-size", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    responses = make_responses(args.responses)
+    get_authority_index()
+    print(f"{args.responses} responses, numpy {'available' if NUMPY_AVAILABLE else 'missing'}, {args.workers} workers\n")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        expected = [calculate_reliability(r["grounding_supports"], r["grounding_chunks"], r["grounding_citations"],
+                                          r["is_multimodal_verified"], ai_confidence=r["ai_confidence"]) for r in responses]
+        elapsed = time.perf_counter() - start
+    print(f"{'per-response loop':<28} {elapsed:7.2f}s  {args.responses / elapsed:>10,.0f} responses/s")
+    summaries = [{field: result[field] for field in SUMMARY_FIELDS} for result in expected]
+
+    runs = [
+        ("batch, python, detail", lambda: _score_shard(responses, True, use_numpy=False), expected),
+        ("batch, python, summary", lambda: _score_shard(responses, False, use_numpy=False), summaries),
+    ]
+    if NUMPY_AVAILABLE:
+        runs += [
+            ("batch, numpy, detail", lambda: _score_shard(responses, True, use_numpy=True), expected),
+            ("batch, numpy, summary", lambda: _score_shard(responses, False, use_numpy=True), summaries),
+        ]
+    runs.append(("batch, pool, summary", lambda: calculate_reliability_batch(
+        responses, detail=False, workers=args.workers, shard_size=args.shard_size), summaries))
+    for label, fn, want in runs:
+        assert timed(label, args.responses, fn) == want, f"{label} differs from calculate_reliability"
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,14 @@ from community_database import CommunityDatabase
 
 logger = logging.getLogger(__name__)
 
-# Initialize database
-community_db = CommunityDatabase()
+_community_db = None
+
+def get_community_db() -> CommunityDatabase:
+    """Opens (and migrates) the community database on first use rather than at import."""
+    global _community_db
+    if _community_db is None:
+        _community_db = CommunityDatabase()
+    return _community_db
 
 # Create router
 router = APIRouter(prefix="/community", tags=["community"])
@@ -35,7 +41,7 @@ class SearchRequest(BaseModel):
 async def get_claim_data(request: ClaimRequest):
     """Get community data for a specific claim."""
     try:
-        claim = community_db.get_claim_by_text(request.claim_text)
+        claim = get_community_db().get_claim_by_text(request.claim_text)
         
         if not claim:
             return {
@@ -44,7 +50,7 @@ async def get_claim_data(request: ClaimRequest):
                 "message": "Claim not found in community database"
             }
         
-        trust_score, vote_count = community_db.calculate_weighted_trust_score(claim['claim_id'])
+        trust_score, vote_count = get_community_db().calculate_weighted_trust_score(claim['claim_id'])
         
         return {
             "exists": True,
@@ -63,7 +69,7 @@ async def get_claim_data(request: ClaimRequest):
 async def post_claim(request: PostClaimRequest):
     """Post a new claim to the community."""
     try:
-        claim_id = community_db.post_claim(request.claim_text, request.ai_verdict)
+        claim_id = get_community_db().post_claim(request.claim_text, request.ai_verdict)
         
         return {
             "success": True,
@@ -96,7 +102,7 @@ async def submit_vote(request: VoteRequest):
         if not normalized_verdict:
             normalized_verdict = 'LEGIT' if resolved_vote else 'FAKE'
 
-        success = community_db.submit_vote(
+        success = get_community_db().submit_vote(
             claim_id=request.claim_id,
             user_id=request.user_id,
             vote=resolved_vote,
@@ -111,7 +117,7 @@ async def submit_vote(request: VoteRequest):
             }
         
         # Get updated trust score
-        trust_score, vote_count = community_db.calculate_weighted_trust_score(request.claim_id)
+        trust_score, vote_count = get_community_db().calculate_weighted_trust_score(request.claim_id)
         
         return {
             "success": True,
@@ -127,7 +133,7 @@ async def submit_vote(request: VoteRequest):
 async def get_top_claims(limit: int = 5):
     """Get top voted claims."""
     try:
-        claims = community_db.get_top_claims(limit)
+        claims = get_community_db().get_top_claims(limit)
         
         return {
             "success": True,
@@ -151,7 +157,7 @@ async def get_top_claims(limit: int = 5):
 async def search_claims(request: SearchRequest):
     """Search community claims by text."""
     try:
-        claims = community_db.search_claims(request.query)
+        claims = get_community_db().search_claims(request.query)
         
         return {
             "success": True,
@@ -176,7 +182,7 @@ async def search_claims(request: SearchRequest):
 async def get_user_reputation(user_id: str):
     """Get user reputation statistics."""
     try:
-        reputation = community_db.get_user_reputation(user_id)
+        reputation = get_community_db().get_user_reputation(user_id)
         
         return {
             "success": True,
@@ -200,7 +206,7 @@ async def get_claim_discussion(claim_id: str):
     """Get claim discussion with all votes and notes."""
     try:
         logger.info(f"Fetching discussion for claim_id: {claim_id}")
-        discussion = community_db.get_claim_discussion(claim_id)
+        discussion = get_community_db().get_claim_discussion(claim_id)
         
         if not discussion:
             logger.warning(f"Claim not found: {claim_id}")
@@ -1,71 +1,330 @@
+"""
+Builds the verified fact-checker domain list from the IFCN signatory list and the
+FactCheckInsights claim-review dump, and writes both the JSON list and the memory-mapped
+registry (verified_domains.vdr) the backend reads.
+
+The dump is parsed incrementally, one claim review at a time, so memory stays flat however
+large it is. URLs are normalized in parallel batches and deduplicated as they arrive; each
+domain keeps its provenance (sources, URL count, where it was first seen).
+
+Usage:
+    python merge_datasets.py --ifcn ifcn_list.txt --factcheckinsights factcheckinsights_data.json \\
+        [--curated ../../frontend/assets/data/verified_domains.json] [--output-dir .] [--workers N]
+"""
+import argparse
 import json
-import urllib.parse
+import logging
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from authority_index import PublicSuffixes, normalize_domain_name
+from domain_registry import SOURCE_FLAGS, write_registry
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CHUNK_CHARS = 1 << 20
+NORMALIZE_BATCH = 5000
+CLAIM_REVIEW_KEYS = ("claimReviews", "claim_reviews", "items")
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+class _Reader:
+    """Character buffer over a text stream for incremental JSON decoding."""
+
+    def __init__(self, stream: TextIO, chunk_chars: int = CHUNK_CHARS):
+        self.stream = stream
+        self.chunk_chars = chunk_chars
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.chars_read = 0
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_chars)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has been consumed so the buffer only ever holds the current value
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.chars_read += len(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it; "" at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.chars_read - len(self.buf) + self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodes the next complete JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal cut at the buffer edge decodes "successfully" too short
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _array_items(reader: _Reader) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("]")
+        return
+
+
+def iter_claim_reviews(stream: TextIO, chunk_chars: int = CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the claim reviews of a dump that is either a bare JSON list or an object with a
+    "claimReviews" list, one at a time. Other top-level values are decoded and skipped.
+    """
+    reader = _Reader(stream, chunk_chars)
+    first = reader.peek()
+    if first == "[":
+        yield from _array_items(reader)
+        return
+    reader.expect("{")
+    while reader.peek() not in ("}", ""):
+        key = reader.value()
+        reader.expect(":")
+        if key in CLAIM_REVIEW_KEYS and reader.peek() == "[":
+            yield from _array_items(reader)
+        else:
+            reader.value()
+        if reader.peek() == ",":
+            reader.pos += 1
+    reader.expect("}")
+
+
+def review_urls(item: Any) -> List[str]:
+    """Publisher URLs of one claim review: the author's site and the review itself."""
+    if not isinstance(item, dict):
+        return []
+    urls = []
+    authors = item.get("author")
+    for author in authors if isinstance(authors, list) else [authors]:
+        if isinstance(author, dict) and isinstance(author.get("url"), str):
+            urls.append(author["url"])
+    if isinstance(item.get("url"), str):
+        urls.append(item["url"])
+    return urls
+
+
+_public_suffixes: Optional[PublicSuffixes] = None
+
 
-list_txt_path = r"C:\Users\User\Downloads\list.txt"
-factcheckinsights_json_path = r"C:\Users\User\Documents\Gemini3Pro\backend\data\factcheckinsights_data.json"
-output_path = r"C:\Users\User\Documents\Gemini3Pro\backend\data\verified_domains.json"
-
-def normalize_domain(url_or_domain: str) -> str:
-    """Strips scheme, www., and paths from a URL or domain string."""
-    if not url_or_domain:
-        return ""
-    
-    # URL Decode first
-    url_or_domain = urllib.parse.unquote(url_or_domain)
-    url_or_domain = url_or_domain.strip().lower()
-    
-    # Handle pure domains (e.g. bbc.com)
-    if not url_or_domain.startswith("http://") and not url_or_domain.startswith("https://"):
-        url_or_domain = "http://" + url_or_domain
-        
+def summarize_batch(urls: List[str]) -> Tuple[Dict[str, List[int]], int]:
+    """
+    Normalizes a batch of URLs and deduplicates it: {domain: [count, offset of first URL]}
+    plus how many URLs were dropped for being empty or a bare public suffix. Runs in the
+    worker processes, so the parent only merges each batch's distinct domains.
+    """
+    global _public_suffixes
+    if _public_suffixes is None:
+        _public_suffixes = PublicSuffixes.load()
+    seen: Dict[str, List[int]] = {}
+    skipped = 0
+    for offset, url in enumerate(urls):
+        domain = normalize_domain_name(url)
+        record = seen.get(domain)
+        if record is not None:
+            record[0] += 1
+        elif not domain or "." not in domain or _public_suffixes.is_public_suffix(domain):
+            skipped += 1
+        else:
+            seen[domain] = [1, offset]
+    return seen, skipped
+
+
+class DomainCollector:
+    """Merged domains with per-domain provenance: sources, URL count and where each was first seen."""
+
+    def __init__(self):
+        self.domains: Dict[str, Dict[str, Any]] = {}
+        self.skipped = 0
+
+    def add(self, domain: str, source: str, where: str, count: int = 1):
+        record = self.domains.get(domain)
+        if record is None:
+            self.domains[domain] = {"flags": SOURCE_FLAGS[source], "sources": [source], "urls": count, "first_seen": where}
+            return
+        record["urls"] += count
+        if source not in record["sources"]:
+            record["sources"].append(source)
+            record["flags"] |= SOURCE_FLAGS[source]
+
+
+class _Normalizer:
+    """
+    Feeds URL batches to summarize_batch on a process pool, keeping a bounded number of
+    batches in flight and merging results in submission order, so provenance is deterministic.
+    """
+
+    def __init__(self, collector: DomainCollector, workers: int, batch_size: int = NORMALIZE_BATCH):
+        self.collector = collector
+        self.batch_size = batch_size
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        self.max_in_flight = max(1, workers) * 2
+        self.in_flight: List[Tuple[Any, str, str, List[int]]] = []
+        self.pending_urls: List[str] = []
+        self.pending_positions: List[int] = []
+        # Batches never mix sources or files: one source and one "where" format per batch
+        self.source = ""
+        self.where = ""
+        self.urls = 0
+
+    def add(self, url: str, source: str, where: str, position: int):
+        """`where` is a format string for the URL's position, e.g. "ifcn_list.txt:{}"."""
+        if source != self.source or where != self.where:
+            self.flush()
+            self.source, self.where = source, where
+        self.pending_urls.append(url)
+        self.pending_positions.append(position)
+        self.urls += 1
+        if len(self.pending_urls) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_urls:
+            return
+        urls, positions, self.pending_urls, self.pending_positions = self.pending_urls, self.pending_positions, [], []
+        if self.executor is None:
+            self._merge(summarize_batch(urls), self.source, self.where, positions)
+            return
+        self.in_flight.append((self.executor.submit(summarize_batch, urls), self.source, self.where, positions))
+        while len(self.in_flight) >= self.max_in_flight:
+            self._drain_one()
+
+    def _drain_one(self):
+        future, source, where, positions = self.in_flight.pop(0)
+        self._merge(future.result(), source, where, positions)
+
+    def _merge(self, summary: Tuple[Dict[str, List[int]], int], source: str, where: str, positions: List[int]):
+        seen, skipped = summary
+        self.collector.skipped += skipped
+        for domain, (count, offset) in seen.items():
+            self.collector.add(domain, source, where.format(positions[offset]), count)
+
+    def close(self):
+        self.flush()
+        while self.in_flight:
+            self._drain_one()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def build(ifcn_paths: List[str], factcheckinsights_paths: List[str], curated_paths: List[str],
+          workers: int = 0, batch_size: int = NORMALIZE_BATCH) -> Tuple[DomainCollector, Dict[str, Any]]:
+    """Runs every source through the normalizer and returns the collected domains and run stats."""
+    collector = DomainCollector()
+    normalizer = _Normalizer(collector, workers, batch_size)
+    stats: Dict[str, Any] = {"claim_reviews": 0, "input_bytes": 0}
+    started = time.perf_counter()
     try:
-        parsed = urllib.parse.urlparse(url_or_domain)
-        domain = parsed.netloc
-        if domain.startswith("www."):
-            domain = domain[4:]
-        return domain
-    except Exception:
-        return ""
-
-verified_domains = set()
-
-# 1. Parse list.txt (IFCN List)
-print("Parsing list.txt...")
-if os.path.exists(list_txt_path):
-    with open(list_txt_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            domain = normalize_domain(line.strip())
-            if domain:
-                verified_domains.add(domain)
-
-# 2. Parse FactCheckInsights JSON
-print("Parsing FactCheckInsights JSON...")
-if os.path.exists(factcheckinsights_json_path):
-    with open(factcheckinsights_json_path, 'r', encoding='utf-8') as f:
-        try:
-            duke_data = json.load(f)
-            claim_reviews = duke_data.get('claimReviews', []) if isinstance(duke_data, dict) else duke_data
-            for item in claim_reviews:
-                if isinstance(item, dict):
-                    # Extract from author.url or url
-                    author_url = item.get("author", {}).get("url")
-                    if author_url:
-                        domain = normalize_domain(author_url)
-                        if domain:
-                            verified_domains.add(domain)
-                        
-                    # Assuming 'url' might also be present at the top level of 'item' if it's not an author URL
-                    review_url = item.get('url', '') 
-                    domain2 = normalize_domain(review_url)
-                    if domain2:
-                        verified_domains.add(domain2)
-        except Exception as e:
-            print(f"Error parsing Duke JSON: {e}")
-
-# 3. Save combined set
-print(f"Total Unique Verified Domains: {len(verified_domains)}")
-with open(output_path, 'w', encoding='utf-8') as f:
-    json.dump(sorted(list(verified_domains)), f, indent=2)
-
-print(f"Successfully saved to {output_path}")
+        for path in ifcn_paths:
+            stats["input_bytes"] += os.path.getsize(path)
+            where = os.path.basename(path) + ":{}"
+            with open(path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        normalizer.add(line, "ifcn", where, line_no)
+        for path in curated_paths:
+            stats["input_bytes"] += os.path.getsize(path)
+            where = os.path.basename(path) + "[{}]"
+            with open(path, "r", encoding="utf-8") as f:
+                for i, domain in enumerate(json.load(f)):
+                    normalizer.add(domain, "curated", where, i)
+        for path in factcheckinsights_paths:
+            stats["input_bytes"] += os.path.getsize(path)
+            where = os.path.basename(path) + "[{}]"
+            with open(path, "r", encoding="utf-8") as f:
+                for i, item in enumerate(iter_claim_reviews(f)):
+                    stats["claim_reviews"] += 1
+                    for url in review_urls(item):
+                        normalizer.add(url, "factcheckinsights", where, i)
+    finally:
+        normalizer.close()
+    stats["seconds"] = time.perf_counter() - started
+    stats["urls"] = normalizer.urls
+    stats["domains"] = len(collector.domains)
+    stats["skipped"] = collector.skipped
+    return collector, stats
+
+
+def write_outputs(collector: DomainCollector, output_dir: str) -> Dict[str, str]:
+    domains = sorted(collector.domains)
+    paths = {
+        "json": os.path.join(output_dir, "verified_domains.json"),
+        "registry": os.path.join(output_dir, "verified_domains.vdr"),
+        "provenance": os.path.join(output_dir, "verified_domains.provenance.json"),
+    }
+    with open(paths["json"], "w", encoding="utf-8") as f:
+        json.dump(domains, f, indent=2)
+    with open(paths["provenance"], "w", encoding="utf-8") as f:
+        json.dump({d: {k: v for k, v in collector.domains[d].items() if k != "flags"} for d in domains}, f, indent=1)
+    # Last, and by rename: running backends pick the new registry up on their next check
+    write_registry({d: collector.domains[d]["flags"] for d in domains}, paths["registry"])
+    return paths
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--ifcn", action="append", default=[], help="IFCN signatory list, one domain or URL per line")
+    arg_parser.add_argument("--factcheckinsights", action="append", default=[], help="FactCheckInsights claim-review JSON dump")
+    arg_parser.add_argument("--curated", action="append", default=[], help="JSON list of hand-picked domains")
+    arg_parser.add_argument("--output-dir", default=_DATA_DIR)
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="normalization processes (0 or 1: in-process)")
+    arg_parser.add_argument("--batch-size", type=int, default=NORMALIZE_BATCH)
+    args = arg_parser.parse_args()
+    if not (args.ifcn or args.factcheckinsights or args.curated):
+        arg_parser.error("give at least one of --ifcn, --factcheckinsights, --curated")
+
+    collector, stats = build(args.ifcn, args.factcheckinsights, args.curated, args.workers, args.batch_size)
+    paths = write_outputs(collector, args.output_dir)
+
+    seconds = max(stats["seconds"], 1e-9)
+    print(f"{stats['claim_reviews']} claim reviews, {stats['urls']} URLs, {stats['input_bytes'] / 1e6:.1f} MB in {seconds:.2f}s "
+          f"({stats['claim_reviews'] / seconds:,.0f} reviews/s, {stats['urls'] / seconds:,.0f} URLs/s, "
+          f"{stats['input_bytes'] / 1e6 / seconds:.1f} MB/s)")
+    by_source = {source: sum(1 for r in collector.domains.values() if source in r["sources"]) for source in SOURCE_FLAGS}
+    print(f"{stats['domains']} unique domains ({', '.join(f'{s}: {n}' for s, n in by_source.items())}), {stats['skipped']} entries skipped")
+    for kind, path in paths.items():
+        print(f"  {kind:>10}: {path}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
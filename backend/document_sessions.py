@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_SESSION_TTL_SEC = int(os.getenv("DOCUMENT_SESSION_TTL_SEC", "3600"))
+DOCUMENT_SESSION_MAX = int(os.getenv("DOCUMENT_SESSION_MAX", "32"))
+DOCUMENT_SESSION_DIR = os.getenv("DOCUMENT_SESSION_DIR", os.path.join(tempfile.gettempdir(), "veriscan_sessions"))
+# Ask Vertex AI to hold the document tokens server-side; falls back to local re-attachment when refused
+DOCUMENT_SESSION_CONTEXT_CACHE = os.getenv("DOCUMENT_SESSION_CONTEXT_CACHE", "true").lower() == "true"
+# The model-side cache outlives the local session slightly so an in-flight claim never finds it gone
+_REMOTE_TTL_MARGIN_SEC = 120
+
+
+class SessionNotFound(KeyError):
+    """Raised for unknown or expired document session ids."""
+
+
+class DocumentFile:
+    __slots__ = ("name", "mime_type", "size", "sha256", "path")
+
+    def __init__(self, name: str, mime_type: str, size: int, sha256: str, path: str):
+        self.name = name
+        self.mime_type = mime_type
+        self.size = size
+        self.sha256 = sha256
+        self.path = path
+
+
+class DocumentSession:
+    """One uploaded document set that several claims are checked against."""
+
+    def __init__(self, session_id: str, files: List[DocumentFile], ttl_sec: int):
+        self.session_id = session_id
+        self.files = files
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl_sec
+        self.cache_name: Optional[str] = None
+        self.document_tokens: Optional[int] = None
+        self.ingest_seconds = 0.0
+        self.claims = 0
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+
+    @property
+    def mode(self) -> str:
+        return "context_cache" if self.cache_name else "local"
+
+    @property
+    def file_names(self) -> List[str]:
+        return [f.name for f in self.files]
+
+    @property
+    def file_digests(self) -> List[str]:
+        return [f.sha256 for f in self.files]
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "files": [{"name": f.name, "mime_type": f.mime_type, "size": f.size} for f in self.files],
+            "document_tokens": self.document_tokens,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "claims": self.claims,
+            "tokens_saved": self.tokens_saved,
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+class ContextCacheBackend:
+    """
+    Vertex AI context caching: the document, system instruction and tools are tokenized
+    once into a CachedContent and later requests reference it by name.
+    """
+
+    def __init__(self, get_client: Callable[[], Any], model: str, system_instruction: str, tools: List[Any]):
+        self.get_client = get_client
+        self.model = model
+        self.system_instruction = system_instruction
+        self.tools = tools
+
+    async def create(self, parts: List[Any], display_name: str, ttl_sec: int) -> Tuple[str, Optional[int]]:
+        from google.genai import types
+        cache = await self.get_client().aio.caches.create(
+            model=self.model,
+            config=types.CreateCachedContentConfig(
+                contents=[types.Content(role="user", parts=parts)],
+                system_instruction=self.system_instruction,
+                tools=self.tools,
+                ttl=f"{ttl_sec}s",
+                display_name=display_name,
+            ),
+        )
+        usage = getattr(cache, "usage_metadata", None)
+        return cache.name, getattr(usage, "total_token_count", None)
+
+    async def delete(self, name: str):
+        await self.get_client().aio.caches.delete(name=name)
+
+
+class LocalDocumentBackend:
+    """Stand-in without model-side state: every claim re-attaches the stored document bytes."""
+
+    async def create(self, parts: List[Any], display_name: str, ttl_sec: int) -> Tuple[Optional[str], Optional[int]]:
+        return None, None
+
+    async def delete(self, name: str):
+        return None
+
+
+class DocumentSessionStore:
+    """
+    Keeps uploaded documents on local disk for DOCUMENT_SESSION_TTL_SEC so that several
+    claims can reference them. Expired sessions are swept on access; when the store is
+    full the oldest session is evicted.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        session_dir: str = DOCUMENT_SESSION_DIR,
+        ttl_sec: int = DOCUMENT_SESSION_TTL_SEC,
+        max_sessions: int = DOCUMENT_SESSION_MAX,
+    ):
+        self.backend = backend
+        self.session_dir = session_dir
+        self.ttl_sec = ttl_sec
+        self.max_sessions = max(1, max_sessions)
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "deleted": 0, "cache_fallbacks": 0,
+                      "claims": 0, "tokens_saved": 0, "seconds_saved": 0.0}
+        self._sessions: "OrderedDict[str, DocumentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def create(self, documents: List[Tuple[str, str, bytes, str]], ingest_seconds: float = 0.0) -> DocumentSession:
+        """
+        Stores (name, mime_type, data, sha256) documents and registers them with the backend.
+        `ingest_seconds` is how long receiving the upload took, i.e. what each later claim saves.
+        """
+        started = time.perf_counter()
+        session_id = uuid.uuid4().hex
+        directory = os.path.join(self.session_dir, session_id)
+        files = await asyncio.to_thread(self._write_files, directory, documents)
+        session = DocumentSession(session_id, files, self.ttl_sec)
+
+        from google.genai import types
+        parts = [types.Part.from_bytes(data=data, mime_type=mime_type) for _, mime_type, data, _ in documents]
+        try:
+            session.cache_name, session.document_tokens = await self.backend.create(
+                parts, f"veriscan-session-{session_id[:12]}", self.ttl_sec + _REMOTE_TTL_MARGIN_SEC
+            )
+        except Exception as e:
+            # Documents below the model's minimum cacheable size, or no caching on this project
+            self.stats["cache_fallbacks"] += 1
+            logger.warning(f"Context cache unavailable for session {session_id}, re-attaching locally: {e}")
+        session.ingest_seconds = ingest_seconds + (time.perf_counter() - started)
+
+        evicted = []
+        with self._lock:
+            self._sessions[session_id] = session
+            self.stats["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                evicted.append(self._sessions.popitem(last=False)[1])
+                self.stats["evicted"] += 1
+        for old in evicted:
+            await self._discard(old)
+        return session
+
+    @staticmethod
+    def _write_files(directory: str, documents: List[Tuple[str, str, bytes, str]]) -> List[DocumentFile]:
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for index, (name, mime_type, data, sha256) in enumerate(documents):
+            path = os.path.join(directory, f"{index:02d}.bin")
+            with open(path, "wb") as f:
+                f.write(data)
+            files.append(DocumentFile(name, mime_type, len(data), sha256, path))
+        return files
+
+    async def get(self, session_id: str) -> DocumentSession:
+        await self.sweep()
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+
+    async def load_parts(self, session: DocumentSession) -> List[Any]:
+        """Document parts for the local mode; context-cached sessions need none."""
+        if session.cache_name:
+            return []
+
+        from google.genai import types
+
+        def _read():
+            parts = []
+            for f in session.files:
+                with open(f.path, "rb") as fh:
+                    parts.append(types.Part.from_bytes(data=fh.read(), mime_type=f.mime_type))
+            return parts
+
+        return await asyncio.to_thread(_read)
+
+    def record_claim(self, session: DocumentSession):
+        """Credits a claim run by reference with the upload time and document tokens it avoided."""
+        tokens = (session.document_tokens or 0) if session.cache_name else 0
+        with self._lock:
+            session.claims += 1
+            session.tokens_saved += tokens
+            session.seconds_saved += session.ingest_seconds
+            self.stats["claims"] += 1
+            self.stats["tokens_saved"] += tokens
+            self.stats["seconds_saved"] += session.ingest_seconds
+        return tokens, session.ingest_seconds
+
+    async def delete(self, session_id: str):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self.stats["deleted"] += 1
+        if session is None:
+            raise SessionNotFound(session_id)
+        await self._discard(session)
+
+    async def sweep(self):
+        now = time.time()
+        with self._lock:
+            expired = [s for s in self._sessions.values() if s.is_expired(now)]
+            for session in expired:
+                del self._sessions[session.session_id]
+                self.stats["expired"] += 1
+        for session in expired:
+            await self._discard(session)
+
+    async def _discard(self, session: DocumentSession):
+        if session.cache_name:
+            try:
+                await self.backend.delete(session.cache_name)
+            except Exception as e:
+                # The remote TTL reclaims it anyway
+                logger.warning(f"Could not delete context cache {session.cache_name}: {e}")
+        await asyncio.to_thread(shutil.rmtree, os.path.join(self.session_dir, session.session_id), True)
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._sessions)
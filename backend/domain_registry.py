@@ -0,0 +1,356 @@
+"""
+Verified fact-checker domain registry: a compact, memory-mapped file of sorted domain keys
+searched in place, shared by every process on the host through the page cache and
+swapped atomically when the file changes.
+
+File layout (little-endian):
+
+    b"VDR1" | u32 count | u32 blob_offset | u32 blob_length | u32 table_offset | u32 table_size
+    u32 offsets[count + 1]     byte offsets of each key inside the blob
+    u8  flags[count]           source bitmask per domain (SOURCE_FLAGS)
+    u32 table[table_size]      open-addressing hash table: entry index + 1, 0 = empty
+    blob                       keys, sorted, UTF-8, no separators
+
+Keys are domains with their labels reversed ("afp.com" -> "com.afp"). Lookups take one
+CRC32 and, at the table's load factor of at most 1/2, about one probe; the sorted keys
+keep iteration ordered and allow binary search.
+
+Build: python domain_registry.py build --ifcn data/ifcn_list.txt --json ../frontend/assets/data/verified_domains.json
+"""
+import argparse
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+VERIFIED_REGISTRY_PATH = os.getenv("VERIFIED_REGISTRY_PATH", os.path.join(_DATA_DIR, "verified_domains.vdr"))
+# How often a lookup may stat the registry file for changes
+VERIFIED_REGISTRY_CHECK_SEC = float(os.getenv("VERIFIED_REGISTRY_CHECK_SEC", "5"))
+# Used when no registry file exists yet
+VERIFIED_DOMAINS_JSON_PATH = os.getenv("VERIFIED_DOMAINS_JSON_PATH", os.path.join(_DATA_DIR, "verified_domains.json"))
+
+MAGIC = b"VDR1"
+_HEADER = struct.Struct("<4sIIIII")
+SOURCE_FLAGS = {"ifcn": 1, "factcheckinsights": 2, "curated": 4}
+
+
+class RegistryFormatError(ValueError):
+    """Raised for files that are not a readable registry."""
+
+
+def domain_key(domain: str) -> str:
+    return ".".join(reversed(domain.split(".")))
+
+
+def key_domain(key: str) -> str:
+    return ".".join(reversed(key.split(".")))
+
+
+def _table_size(count: int) -> int:
+    size = 8
+    while size < 2 * count:
+        size *= 2
+    return size
+
+
+def encode_registry(domains: Dict[str, int]) -> bytes:
+    """Serializes {domain: source flags} into the registry layout."""
+    keys = sorted((domain_key(d).encode("utf-8"), flags) for d, flags in domains.items() if d)
+    offsets = [0]
+    for key, _ in keys:
+        offsets.append(offsets[-1] + len(key))
+    count = len(keys)
+    table_size = _table_size(count)
+    mask = table_size - 1
+    table = [0] * table_size
+    for i, (key, _) in enumerate(keys):
+        slot = zlib.crc32(key) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = i + 1
+    table_offset = _HEADER.size + 4 * (count + 1) + count
+    blob_offset = table_offset + 4 * table_size
+    return b"".join((
+        _HEADER.pack(MAGIC, count, blob_offset, offsets[-1], table_offset, table_size),
+        struct.pack(f"<{count + 1}I", *offsets),
+        bytes(flags & 0xFF for _, flags in keys),
+        struct.pack(f"<{table_size}I", *table),
+        b"".join(key for key, _ in keys),
+    ))
+
+
+def write_registry(domains: Dict[str, int], path: str = VERIFIED_REGISTRY_PATH):
+    """Writes the registry next to `path` and renames it into place, so readers never see a partial file."""
+    data = encode_registry(domains)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".verified-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file owner-only; the service may run as another user than the build
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class MappedRegistry:
+    """One registry file, memory-mapped read-only and searched in place."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if stat.st_size < _HEADER.size:
+                raise RegistryFormatError(f"{path} is too short to be a registry")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, blob_offset, blob_length, table_offset, self._table_size = _HEADER.unpack_from(self._map, 0)
+        if (magic != MAGIC or blob_offset + blob_length > len(self._map)
+                or self._table_size & (self._table_size - 1) or self._table_size <= self.count):
+            raise RegistryFormatError(f"{path} is not a verified domain registry")
+        self.path = path
+        offsets_end = _HEADER.size + 4 * (self.count + 1)
+        view = memoryview(self._map)
+        if sys.byteorder == "little":
+            self._offsets = view[_HEADER.size:offsets_end].cast("I")
+            self._table = view[table_offset:table_offset + 4 * self._table_size].cast("I")
+        else:
+            self._offsets = struct.unpack_from(f"<{self.count + 1}I", self._map, _HEADER.size)
+            self._table = struct.unpack_from(f"<{self._table_size}I", self._map, table_offset)
+        self._flags = view[offsets_end:offsets_end + self.count]
+        self._blob_offset = blob_offset
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key(self, i: int) -> bytes:
+        base = self._blob_offset
+        return self._map[base + self._offsets[i]:base + self._offsets[i + 1]]
+
+    def _find(self, key: bytes) -> int:
+        mask = self._table_size - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            entry = self._table[slot]
+            if not entry:
+                return -1
+            if self._key(entry - 1) == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def flags(self, domain: str) -> int:
+        """Source flags of an exactly listed domain, 0 if it is not listed."""
+        i = self._find(domain_key(domain).encode("utf-8"))
+        return self._flags[i] if i >= 0 else 0
+
+    def has_key(self, key: str) -> bool:
+        return self._find(key.encode("utf-8")) >= 0
+
+    def first_listed(self, labels: List[str], start: int = 2) -> int:
+        """Smallest n >= start such that the host with label-reversed `labels[:n]` is listed, else 0."""
+        for n in range(start, len(labels) + 1):
+            if self._find(".".join(labels[:n]).encode("utf-8")) >= 0:
+                return n
+        return 0
+
+    def __contains__(self, domain: str) -> bool:
+        return self.has_key(domain_key(domain))
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self.count):
+            yield key_domain(self._key(i).decode("utf-8"))
+
+
+class MemoryRegistry:
+    """The registry interface over an in-memory list, for JSON fallbacks and tests."""
+
+    def __init__(self, domains: Iterable[str]):
+        self._keys = sorted({domain_key(d) for d in domains if d})
+        self.identity = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def flags(self, domain: str) -> int:
+        return SOURCE_FLAGS["curated"] if domain in self else 0
+
+    def has_key(self, key: str) -> bool:
+        i = bisect.bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def first_listed(self, labels: List[str], start: int = 2) -> int:
+        for n in range(start, len(labels) + 1):
+            if self.has_key(".".join(labels[:n])):
+                return n
+        return 0
+
+    def __contains__(self, domain: str) -> bool:
+        return self.has_key(domain_key(domain))
+
+    def __iter__(self) -> Iterator[str]:
+        return (key_domain(k) for k in self._keys)
+
+
+def load_registry(path: str = VERIFIED_REGISTRY_PATH, json_path: str = VERIFIED_DOMAINS_JSON_PATH):
+    if os.path.exists(path):
+        return MappedRegistry(path)
+    domains: List[str] = []
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            domains = json.load(f)
+    else:
+        logger.warning(f"No verified domain registry at {path}; verified fact-checkers get no boost")
+    return MemoryRegistry(domains)
+
+
+class DomainRegistry:
+    """
+    The live registry. Lookups go to the current snapshot; at most every `check_interval`
+    seconds a lookup stats the file and, if it was replaced, maps the new one and swaps it
+    in with a single reference assignment. In-flight lookups finish on the old mapping,
+    which is released once nothing references it.
+    """
+
+    def __init__(self, path: str = VERIFIED_REGISTRY_PATH, json_path: str = VERIFIED_DOMAINS_JSON_PATH,
+                 check_interval: float = VERIFIED_REGISTRY_CHECK_SEC):
+        self.path = path
+        self.json_path = json_path
+        self.check_interval = check_interval
+        self.generation = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._snapshot = self._load()
+        self._next_check = time.monotonic() + check_interval
+
+    def _load(self):
+        try:
+            return load_registry(self.path, self.json_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Verified domain registry unreadable: {e}")
+            return MemoryRegistry(())
+
+    def _file_identity(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Swaps in the registry file if it changed since it was mapped. Returns True on a swap."""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        with self._lock:
+            self._next_check = now + self.check_interval
+            identity = self._file_identity()
+            if identity is None or identity == self._snapshot.identity:
+                return False
+            try:
+                snapshot = MappedRegistry(self.path)
+            except (OSError, ValueError) as e:
+                # Keep serving the previous registry until a readable file appears
+                logger.error(f"Verified domain registry reload failed: {e}")
+                return False
+            self._snapshot = snapshot
+            self.generation += 1
+            self.reloads += 1
+        logger.info(f"Verified domain registry reloaded: {len(snapshot)} domains")
+        return True
+
+    @property
+    def snapshot(self):
+        self.refresh()
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self.snapshot
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.snapshot)
+
+    def has_key(self, key: str) -> bool:
+        return self.snapshot.has_key(key)
+
+    def first_listed(self, labels: List[str], start: int = 2) -> int:
+        return self.snapshot.first_listed(labels, start)
+
+    def flags(self, domain: str) -> int:
+        return self.snapshot.flags(domain)
+
+    def describe(self) -> Dict[str, object]:
+        snapshot = self._snapshot
+        return {
+            "domains": len(snapshot),
+            "path": self.path if isinstance(snapshot, MappedRegistry) else None,
+            "mapped": isinstance(snapshot, MappedRegistry),
+            "generation": self.generation,
+            "reloads": self.reloads,
+        }
+
+
+def read_domain_lines(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def main():
+    from authority_index import PublicSuffixes, normalize_domain_name
+
+    arg_parser = argparse.ArgumentParser(description="Builds the verified domain registry file.")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build a registry from domain lists")
+    build.add_argument("--ifcn", action="append", default=[], help="text file, one IFCN signatory domain or URL per line")
+    build.add_argument("--json", action="append", default=[], help="JSON list of curated domains")
+    build.add_argument("-o", "--output", default=VERIFIED_REGISTRY_PATH)
+    show = sub.add_parser("show", help="print a registry's domains")
+    show.add_argument("path", nargs="?", default=VERIFIED_REGISTRY_PATH)
+    args = arg_parser.parse_args()
+
+    if args.command == "show":
+        registry = MappedRegistry(args.path)
+        for domain in registry:
+            print(f"{domain}\t{registry.flags(domain)}")
+        return
+
+    suffixes = PublicSuffixes.load()
+    domains: Dict[str, int] = {}
+    sources = [(p, SOURCE_FLAGS["ifcn"], read_domain_lines(p)) for p in args.ifcn]
+    for path in args.json:
+        with open(path, "r", encoding="utf-8") as f:
+            sources.append((path, SOURCE_FLAGS["curated"], iter(json.load(f))))
+    for path, flag, entries in sources:
+        for entry in entries:
+            domain = normalize_domain_name(entry)
+            if not domain or suffixes.is_public_suffix(domain):
+                logger.warning(f"Skipping {entry!r} from {path}: not a registrable domain")
+                continue
+            domains[domain] = domains.get(domain, 0) | flag
+    write_registry(domains, args.output)
+    print(f"Wrote {len(domains)} domains to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,82 @@
+import os
+from typing import Dict, Optional
+
+from models import AnalysisSettings
+
+# "high" is the original single profile: the full model, Google Search grounding and the whole output budget
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_FAST_MODEL = os.getenv("GEMINI_FAST_MODEL", "gemini-2.0-flash-lite")
+GEMINI_REQUEST_DEADLINE_SEC = float(os.getenv("GEMINI_REQUEST_DEADLINE_SEC", "50"))
+
+
+class ExecutionProfile:
+    """How one forensic depth is executed: which model, how much output, how long and how often to try."""
+
+    __slots__ = ("name", "model", "max_output_tokens", "grounding", "deadline_sec", "max_attempts")
+
+    def __init__(self, name: str, model: str, max_output_tokens: int, grounding: bool = True,
+                 deadline_sec: float = GEMINI_REQUEST_DEADLINE_SEC, max_attempts: int = 3):
+        self.name = name
+        self.model = model
+        self.max_output_tokens = max_output_tokens
+        self.grounding = grounding
+        self.deadline_sec = deadline_sec
+        self.max_attempts = max(1, max_attempts)
+
+    def with_grounding(self, grounding: bool) -> "ExecutionProfile":
+        if grounding == self.grounding:
+            return self
+        return ExecutionProfile(self.name, self.model, self.max_output_tokens, grounding,
+                                self.deadline_sec, self.max_attempts)
+
+    def with_model(self, model: str) -> "ExecutionProfile":
+        if model == self.model:
+            return self
+        return ExecutionProfile(self.name, model, self.max_output_tokens, self.grounding,
+                                self.deadline_sec, self.max_attempts)
+
+    @property
+    def fingerprint(self) -> str:
+        """Everything about the profile that changes the answer, for cache keys."""
+        return f"{self.model}/{self.max_output_tokens}/{'grounded' if self.grounding else 'ungrounded'}"
+
+    def describe(self) -> Dict[str, object]:
+        return {
+            "profile": self.name,
+            "model": self.model,
+            "max_output_tokens": self.max_output_tokens,
+            "grounding": self.grounding,
+            "deadline_sec": self.deadline_sec,
+            "max_attempts": self.max_attempts,
+        }
+
+
+def _env_profile(name: str, model: str, max_output_tokens: int, deadline_sec: float, max_attempts: int) -> ExecutionProfile:
+    prefix = f"GEMINI_PROFILE_{name.upper()}_"
+    return ExecutionProfile(
+        name,
+        os.getenv(prefix + "MODEL", model),
+        int(os.getenv(prefix + "MAX_OUTPUT_TOKENS", str(max_output_tokens))),
+        deadline_sec=float(os.getenv(prefix + "DEADLINE_SEC", str(deadline_sec))),
+        max_attempts=int(os.getenv(prefix + "MAX_ATTEMPTS", str(max_attempts))),
+    )
+
+
+EXECUTION_PROFILES: Dict[str, ExecutionProfile] = {
+    # Quick triage: the lite model, a short answer and one retry, well inside the function timeout
+    "low": _env_profile("low", GEMINI_FAST_MODEL, 3072, min(25.0, GEMINI_REQUEST_DEADLINE_SEC), 2),
+    "medium": _env_profile("medium", GEMINI_MODEL, 6144, GEMINI_REQUEST_DEADLINE_SEC, 3),
+    "high": _env_profile("high", GEMINI_MODEL, 8192, GEMINI_REQUEST_DEADLINE_SEC, 3),
+}
+
+
+# Depth for clients that never choose one (the app does not send `forensic_depth`), so they keep the original behaviour
+DEFAULT_FORENSIC_DEPTH = os.getenv("GEMINI_DEFAULT_FORENSIC_DEPTH", "high")
+
+
+def resolve_profile(settings: Optional[AnalysisSettings] = None) -> ExecutionProfile:
+    """Picks the profile for `settings.forensic_depth` and applies `settings.enable_grounding`."""
+    settings = settings or AnalysisSettings()
+    # The model's "medium" default only applies when a client sets the field; an unset depth means DEFAULT_FORENSIC_DEPTH
+    depth = settings.forensic_depth if "forensic_depth" in settings.model_fields_set else DEFAULT_FORENSIC_DEPTH
+    return EXECUTION_PROFILES[depth].with_grounding(settings.enable_grounding)
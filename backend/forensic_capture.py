@@ -0,0 +1,162 @@
+import hashlib
+import itertools
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Captures are a debugging aid: on by default locally, off on Cloud Run unless asked for
+_IS_CLOUD_RUN = os.environ.get('K_SERVICE') is not None
+FORENSIC_CAPTURE_ENABLED = os.getenv("FORENSIC_CAPTURE_ENABLED", "false" if _IS_CLOUD_RUN else "true").lower() == "true"
+FORENSIC_CAPTURE_DIR = os.getenv("FORENSIC_CAPTURE_DIR", os.path.join(tempfile.gettempdir(), "veriscan_captures"))
+# Fraction of requests whose captures are kept (failures are always kept)
+FORENSIC_CAPTURE_SAMPLE_RATE = float(os.getenv("FORENSIC_CAPTURE_SAMPLE_RATE", "1.0"))
+FORENSIC_CAPTURE_QUEUE_SIZE = int(os.getenv("FORENSIC_CAPTURE_QUEUE_SIZE", "256"))
+FORENSIC_CAPTURE_MAX_FILES = int(os.getenv("FORENSIC_CAPTURE_MAX_FILES", "200"))
+FORENSIC_CAPTURE_MAX_BYTES = int(os.getenv("FORENSIC_CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+CaptureContent = Union[str, Callable[[], str]]
+
+
+class ForensicCapture:
+    """
+    Writes forensic dumps (grounding metadata, model output, broken JSON) off the
+    request path. Captures go onto a bounded queue drained by one background thread;
+    when the queue is full they are dropped rather than blocking the caller.
+    Files are named per request and rotated by count and total size.
+    """
+
+    def __init__(
+        self,
+        capture_dir: str = FORENSIC_CAPTURE_DIR,
+        enabled: bool = FORENSIC_CAPTURE_ENABLED,
+        sample_rate: float = FORENSIC_CAPTURE_SAMPLE_RATE,
+        queue_size: int = FORENSIC_CAPTURE_QUEUE_SIZE,
+        max_files: int = FORENSIC_CAPTURE_MAX_FILES,
+        max_bytes: int = FORENSIC_CAPTURE_MAX_BYTES,
+    ):
+        self.capture_dir = capture_dir
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_files = max(1, max_files)
+        self.max_bytes = max_bytes
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "sampled_out": 0, "rotated": 0, "errors": 0}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+        self._sequence = itertools.count(1)
+        self._files: deque = deque()
+        self._total_bytes = 0
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def is_sampled(self, request_id: str) -> bool:
+        """Deterministic per request, so a sampled request keeps all of its captures."""
+        if self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        bucket = int(hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.sample_rate
+
+    def capture(self, request_id: str, kind: str, content: CaptureContent, always: bool = False):
+        """
+        Queues `content` for writing as `<time>_<seq>_<request_id>_<kind>`.
+        `content` may be a callable so serialization happens on the writer thread.
+        """
+        if not self.enabled:
+            return
+        if not always and not self.is_sampled(request_id):
+            self.stats["sampled_out"] += 1
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((request_id, kind, content))
+            self.stats["enqueued"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until every queued capture has been written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_writer(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                os.makedirs(self.capture_dir, exist_ok=True)
+                self._load_existing()
+                self._writer = threading.Thread(target=self._drain, name="forensic-capture", daemon=True)
+                self._writer.start()
+
+    def _load_existing(self):
+        """Picks up files left by earlier processes so rotation covers them too."""
+        entries = []
+        for name in os.listdir(self.capture_dir):
+            path = os.path.join(self.capture_dir, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._files.append((path, size))
+            self._total_bytes += size
+
+    def _drain(self):
+        while True:
+            request_id, kind, content = self._queue.get()
+            try:
+                self._write(request_id, kind, content)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Forensic capture write failed for {request_id}/{kind}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, request_id: str, kind: str, content: CaptureContent):
+        text = content() if callable(content) else content
+        data = text.encode("utf-8")
+        name = "{}_{:06d}_{}_{}".format(
+            time.strftime("%Y%m%dT%H%M%S"), next(self._sequence),
+            _UNSAFE_CHARS.sub("_", request_id)[:64], _UNSAFE_CHARS.sub("_", kind)
+        )
+        path = os.path.join(self.capture_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._files.append((path, len(data)))
+        self._total_bytes += len(data)
+        self.stats["written"] += 1
+        self._rotate()
+
+    def _rotate(self):
+        while self._files and (len(self._files) > self.max_files or self._total_bytes > self.max_bytes):
+            path, size = self._files.popleft()
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.stats["rotated"] += 1
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "dir": self.capture_dir,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self._queue.qsize(),
+            "files": len(self._files),
+            "bytes": self._total_bytes,
+            **self.stats,
+        }
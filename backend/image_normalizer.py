@@ -0,0 +1,270 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow missing: images are forwarded untouched
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_NORMALIZE_ENABLED = os.getenv("IMAGE_NORMALIZE_ENABLED", "true").lower() == "true"
+# Longest edge sent to Gemini; larger photos are downsampled to it
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_NORMALIZE_WORKERS = int(os.getenv("IMAGE_NORMALIZE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Re-encoding these would lose animation
+_PASSTHROUGH_FORMATS = {"GIF"}
+_EXIF_ORIENTATION = 0x0112
+# APP1 (EXIF, XMP), APP13 (IPTC) and comments; JFIF, ICC (APP2) and Adobe (APP14) segments are kept
+_JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+_PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_WEBP_METADATA_CHUNKS = {b"EXIF", b"XMP "}
+# VP8X feature flags announcing the EXIF and XMP chunks
+_WEBP_METADATA_FLAGS = 0x08 | 0x04
+
+
+class NormalizedImage:
+    __slots__ = ("data", "mime_type", "original_size", "width", "height", "resized", "reencoded")
+
+    def __init__(self, data: bytes, mime_type: str, original_size: int, width: int = 0, height: int = 0,
+                 resized: bool = False, reencoded: bool = False):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.width = width
+        self.height = height
+        self.resized = resized
+        self.reencoded = reencoded
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - len(self.data)
+
+
+def _has_metadata(image) -> bool:
+    return bool(image.info.get("exif") or image.info.get("xmp") or image.info.get("comment") or image.getexif())
+
+
+def normalize_image(data: bytes, mime_type: str, max_dimension: int = IMAGE_MAX_DIMENSION,
+                    quality: int = IMAGE_JPEG_QUALITY) -> NormalizedImage:
+    """
+    Downsamples `data` so its longest edge is at most `max_dimension`, applies the EXIF
+    orientation and re-encodes (JPEG, or PNG when there is transparency). An image that only
+    carries EXIF/XMP metadata keeps its format and is re-encoded without it, losslessly where
+    the format allows. When re-encoding would not make it smaller, the metadata is cut out of
+    the original file instead, so the pixels are untouched. Anything Pillow cannot decode is
+    returned unchanged.
+    """
+    unchanged = NormalizedImage(data, mime_type, len(data))
+    if Image is None:
+        return unchanged
+    try:
+        image = Image.open(io.BytesIO(data))
+        source_format = image.format
+        if source_format in _PASSTHROUGH_FORMATS or getattr(image, "n_frames", 1) > 1:
+            return unchanged
+        had_metadata = _has_metadata(image)
+        rotated = image.getexif().get(_EXIF_ORIENTATION, 1) != 1
+        original_dims = image.size
+        # JPEG can decode straight at 1/2, 1/4 or 1/8 scale, which skips most of the IDCT work
+        image.draft("RGB", (max_dimension, max_dimension))
+        oriented = ImageOps.exif_transpose(image)
+        oriented.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        resized = max(oriented.size) < max(original_dims)
+        if not resized and not had_metadata:
+            # Already small and clean (e.g. a PNG screenshot of text): re-encoding would only cost legibility
+            return NormalizedImage(data, mime_type, len(data), oriented.size[0], oriented.size[1])
+        if resized:
+            encoded, out_mime = _encode_downsampled(oriented, quality)
+        else:
+            encoded, out_mime = _encode_stripped(image, oriented, source_format, quality)
+    except Exception as e:
+        # Undecodable (HEIC without a plugin, truncated file, decompression bomb...) goes through as is
+        logger.warning(f"Image normalization skipped ({mime_type}, {len(data)} bytes): {e}")
+        return unchanged
+
+    width, height = oriented.size
+    if encoded is not None and len(encoded) < len(data):
+        return NormalizedImage(encoded, out_mime, len(data), width, height, resized=resized, reencoded=True)
+    if not had_metadata:
+        # Re-encoding would not shrink the upload; the original bytes are at least as good
+        return NormalizedImage(data, mime_type, len(data), width, height)
+    # Dropping the orientation tag from unrotated pixels would turn the image on its side
+    stripped = None if rotated or resized else strip_metadata(data, source_format)
+    if stripped is not None and len(stripped) < len(data):
+        return NormalizedImage(stripped, mime_type, len(data), width, height)
+    # No container we can edit: a slightly larger upload beats forwarding the metadata
+    if encoded is None:
+        try:
+            encoded, out_mime = _encode_downsampled(oriented, quality)
+        except Exception as e:
+            logger.warning(f"Image metadata could not be stripped ({mime_type}, {len(data)} bytes): {e}")
+            return NormalizedImage(data, mime_type, len(data), width, height)
+    return NormalizedImage(encoded, out_mime, len(data), width, height, resized=resized, reencoded=True)
+
+
+def strip_metadata(data: bytes, source_format: Optional[str]) -> Optional[bytes]:
+    """
+    `data` with its metadata segments or chunks removed and the compressed image data copied
+    as is. None for other formats and for files whose structure is not as expected.
+    """
+    try:
+        if source_format == "JPEG":
+            return _strip_jpeg(data)
+        if source_format == "PNG":
+            return _strip_png(data)
+        if source_format == "WEBP":
+            return _strip_webp(data)
+    except (IndexError, ValueError):
+        pass
+    return None
+
+
+def _strip_jpeg(data: bytes) -> Optional[bytes]:
+    if data[:2] != b"\xff\xd8":
+        return None
+    out = [data[:2]]
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker in (0xDA, 0xD9):
+            # Start of scan: everything from here on is image data
+            out.append(data[i:])
+            return b"".join(out)
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            out.append(data[i:i + 2])
+            i += 2
+            continue
+        end = i + 2 + int.from_bytes(data[i + 2:i + 4], "big")
+        if end > len(data):
+            return None
+        if marker not in _JPEG_METADATA_MARKERS:
+            out.append(data[i:end])
+        i = end
+    return None
+
+
+def _strip_png(data: bytes) -> Optional[bytes]:
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+    out = [data[:8]]
+    i = 8
+    while i + 12 <= len(data):
+        chunk_type = data[i + 4:i + 8]
+        end = i + 12 + int.from_bytes(data[i:i + 4], "big")
+        if end > len(data):
+            return None
+        if chunk_type not in _PNG_METADATA_CHUNKS:
+            out.append(data[i:end])
+        i = end
+        if chunk_type == b"IEND":
+            return b"".join(out)
+    return None
+
+
+def _strip_webp(data: bytes) -> Optional[bytes]:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    out = []
+    i = 12
+    while i + 8 <= len(data):
+        chunk_type = data[i:i + 4]
+        size = int.from_bytes(data[i + 4:i + 8], "little")
+        # Chunks are padded to an even length
+        end = i + 8 + size + (size & 1)
+        if end > len(data):
+            return None
+        chunk = data[i:end]
+        if chunk_type == b"VP8X":
+            chunk = chunk[:8] + bytes([chunk[8] & ~_WEBP_METADATA_FLAGS & 0xFF]) + chunk[9:]
+        if chunk_type not in _WEBP_METADATA_CHUNKS:
+            out.append(chunk)
+        i = end
+    body = b"WEBP" + b"".join(out)
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+
+def _encode_downsampled(image, quality: int) -> Tuple[bytes, str]:
+    """JPEG, or PNG when there is transparency."""
+    out = io.BytesIO()
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        image.save(out, format="PNG", optimize=True)
+        return out.getvalue(), "image/png"
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue(), "image/jpeg"
+
+
+def _encode_stripped(source, oriented, source_format: Optional[str], quality: int) -> Tuple[Optional[bytes], str]:
+    """
+    The image in its own format without metadata: lossless for PNG, and for a JPEG that needed
+    no rotation its quantization tables are reused. None for formats without a safe encoder.
+    """
+    out = io.BytesIO()
+    if source_format == "PNG":
+        oriented.save(out, format="PNG", optimize=True)
+        return out.getvalue(), "image/png"
+    if source_format == "JPEG":
+        rotated = oriented.size != source.size or source.getexif().get(_EXIF_ORIENTATION, 1) != 1
+        target = oriented if rotated else source
+        target.save(out, format="JPEG", quality=quality if rotated else "keep", optimize=True,
+                    progressive=bool(source.info.get("progressive")), icc_profile=source.info.get("icc_profile"))
+        return out.getvalue(), "image/jpeg"
+    if source_format == "WEBP":
+        oriented.save(out, format="WEBP", lossless=True)
+        return out.getvalue(), "image/webp"
+    return None, ""
+
+
+class ImageNormalizer:
+    """
+    Runs normalize_image on a small thread pool. Pillow releases the GIL while decoding,
+    resizing and encoding, so several images of one request are processed in parallel
+    without blocking the event loop.
+    """
+
+    def __init__(self, max_dimension: int = IMAGE_MAX_DIMENSION, quality: int = IMAGE_JPEG_QUALITY,
+                 workers: int = IMAGE_NORMALIZE_WORKERS, enabled: bool = IMAGE_NORMALIZE_ENABLED):
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.workers = max(1, workers)
+        self.enabled = enabled and Image is not None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if enabled and Image is None:
+            logger.warning("Pillow is not installed; images are sent to Gemini without normalization")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-normalize")
+        return self._executor
+
+    async def normalize_all(self, images: List[Tuple[bytes, str]]) -> List[NormalizedImage]:
+        """Normalizes (data, mime_type) pairs concurrently, preserving order."""
+        if not self.enabled or not images:
+            return [NormalizedImage(data, mime_type, len(data)) for data, mime_type in images]
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(executor, normalize_image, data, mime_type, self.max_dimension, self.quality)
+            for data, mime_type in images
+        )))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,320 @@
+import abc
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps jobs in this process; "redis" shares them between API and worker nodes
+JOB_BROKER = os.getenv("JOB_BROKER", "memory").lower()
+JOB_REDIS_URL = os.getenv("JOB_REDIS_URL", "redis://localhost:6379/0")
+JOB_REDIS_PREFIX = os.getenv("JOB_REDIS_PREFIX", "veriscan:jobs")
+# Analyses run by this process; API-only nodes in front of remote workers set 0
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TIMEOUT_SEC = float(os.getenv("JOB_TIMEOUT_SEC", "300"))
+JOB_TTL_SEC = int(os.getenv("JOB_TTL_SEC", "3600"))
+JOB_MAX_RECORDS = int(os.getenv("JOB_MAX_RECORDS", "1000"))
+# Longest a GET /jobs/{id} long-poll is held open
+JOB_MAX_WAIT_SEC = float(os.getenv("JOB_MAX_WAIT_SEC", "25"))
+# How often brokers without change notifications re-read a job while long-polling
+JOB_POLL_INTERVAL_SEC = float(os.getenv("JOB_POLL_INTERVAL_SEC", "0.25"))
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobNotFound(KeyError):
+    """Raised for unknown or expired job ids."""
+
+
+def new_job_record(job_id: str) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+    }
+
+
+class JobBroker(abc.ABC):
+    """
+    Queue of pending jobs plus the status record of every job. Payloads are kept apart
+    from records so polling a job never transfers its uploaded files.
+    """
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Stores a queued record and hands the payload to the next free worker."""
+        record = new_job_record(uuid.uuid4().hex)
+        await self._save(record)
+        await self._push(record["job_id"], payload)
+        return record
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        record = await self._load(job_id)
+        if record is None:
+            raise JobNotFound(job_id)
+        return record
+
+    async def update(self, job_id: str, **fields: Any) -> Dict[str, Any]:
+        record = await self.get(job_id)
+        record.update(fields)
+        await self._save(record)
+        return record
+
+    async def wait(self, job_id: str, timeout: float) -> Dict[str, Any]:
+        """Returns the record once the job has finished or `timeout` seconds have passed."""
+        deadline = time.monotonic() + timeout
+        record = await self.get(job_id)
+        while record["status"] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(min(JOB_POLL_INTERVAL_SEC, max(0.0, deadline - time.monotonic())))
+            record = await self.get(job_id)
+        return record
+
+    @abc.abstractmethod
+    async def next_job(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Blocks up to `timeout` seconds for a pending job. Returns (job_id, payload) or None."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def pending(self) -> int:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    @abc.abstractmethod
+    async def _save(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _push(self, job_id: str, payload: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class InProcessBroker(JobBroker):
+    """
+    Default broker: jobs live in this process, served by its own workers. Long-polls
+    wake as soon as the job finishes. Jobs are lost on restart.
+    """
+
+    def __init__(self, ttl_sec: int = JOB_TTL_SEC, max_records: int = JOB_MAX_RECORDS):
+        self.ttl_sec = ttl_sec
+        self.max_records = max(1, max_records)
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+
+    def _get_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def _evict(self):
+        now = time.time()
+        while self._records:
+            job_id, record = next(iter(self._records.items()))
+            if len(self._records) <= self.max_records and now - record["created_at"] < self.ttl_sec:
+                break
+            self._records.popitem(last=False)
+            self._finished.pop(job_id, None)
+
+    async def _save(self, record: Dict[str, Any]):
+        job_id = record["job_id"]
+        self._records[job_id] = dict(record)
+        if record["status"] in TERMINAL_STATUSES:
+            event = self._finished.pop(job_id, None)
+            if event is not None:
+                event.set()
+        self._evict()
+
+    async def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(job_id)
+        if record is None or time.time() - record["created_at"] >= self.ttl_sec:
+            return None
+        return dict(record)
+
+    async def _push(self, job_id: str, payload: Dict[str, Any]):
+        self._get_queue().put_nowait((job_id, payload))
+
+    async def next_job(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        try:
+            return await asyncio.wait_for(self._get_queue().get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def pending(self) -> int:
+        return self._get_queue().qsize()
+
+    async def wait(self, job_id: str, timeout: float) -> Dict[str, Any]:
+        record = await self.get(job_id)
+        if record["status"] in TERMINAL_STATUSES:
+            return record
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+
+def encode_payload(payload: Dict[str, Any]) -> str:
+    """JSON for payloads that may carry raw file bytes."""
+    def default(value):
+        if isinstance(value, bytes):
+            return {"__b64__": base64.b64encode(value).decode("ascii")}
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+    return json.dumps(payload, default=default)
+
+
+def decode_payload(text: str) -> Dict[str, Any]:
+    def hook(obj):
+        if len(obj) == 1 and "__b64__" in obj:
+            return base64.b64decode(obj["__b64__"])
+        return obj
+    return json.loads(text, object_hook=hook)
+
+
+class RedisBroker(JobBroker):
+    """
+    Shares jobs between API and worker nodes through any server speaking the Redis
+    protocol (Redis, Valkey, Memorystore, or a local stand-in). `client` needs the async
+    get/set/lpush/brpop/llen/delete subset of redis.asyncio.Redis.
+    """
+
+    def __init__(self, client: Any, prefix: str = JOB_REDIS_PREFIX, ttl_sec: int = JOB_TTL_SEC):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_sec = ttl_sec
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    async def _save(self, record: Dict[str, Any]):
+        await self.client.set(self._key("job", record["job_id"]), json.dumps(record), ex=self.ttl_sec)
+
+    async def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._key("job", job_id))
+        return json.loads(raw) if raw is not None else None
+
+    async def _push(self, job_id: str, payload: Dict[str, Any]):
+        await self.client.set(self._key("payload", job_id), encode_payload(payload), ex=self.ttl_sec)
+        await self.client.lpush(self._key("queue"), job_id)
+
+    async def next_job(self, timeout: float) -> Optional[Tuple[str, Dict[str, Any]]]:
+        # BRPOP takes whole seconds (0 would block forever)
+        popped = await self.client.brpop([self._key("queue")], timeout=max(1, int(round(timeout))))
+        if popped is None:
+            return None
+        job_id = popped[1].decode() if isinstance(popped[1], bytes) else popped[1]
+        payload_key = self._key("payload", job_id)
+        raw = await self.client.get(payload_key)
+        await self.client.delete(payload_key)
+        if raw is None:
+            # Expired while queued
+            await self.update(job_id, status="failed", error="Job payload expired before a worker picked it up",
+                              finished_at=time.time())
+            return None
+        return job_id, decode_payload(raw.decode() if isinstance(raw, bytes) else raw)
+
+    async def pending(self) -> int:
+        return await self.client.llen(self._key("queue"))
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+def make_broker(kind: str = JOB_BROKER, redis_url: str = JOB_REDIS_URL, multi_instance: bool = False) -> JobBroker:
+    """`multi_instance`: requests are spread over instances that share no memory (the Firebase function)."""
+    if kind == "redis":
+        import redis.asyncio as redis_asyncio
+        return RedisBroker(redis_asyncio.from_url(redis_url))
+    if multi_instance:
+        logger.warning(
+            "JOB_BROKER=memory on a multi-instance deployment: a job is only visible to the instance that "
+            "accepted it, so /jobs/{id} polls served by other instances return 404. Set JOB_BROKER=redis and JOB_REDIS_URL."
+        )
+    return InProcessBroker()
+
+
+class JobWorkerPool:
+    """
+    Pulls jobs from a broker and runs `handler(payload)` on them, `concurrency` at a time,
+    recording the outcome on the job. The handler's return value becomes the job result.
+    """
+
+    def __init__(self, broker: JobBroker, handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                 concurrency: int = JOB_WORKERS, job_timeout: float = JOB_TIMEOUT_SEC):
+        self.broker = broker
+        self.handler = handler
+        self.concurrency = concurrency
+        self.job_timeout = job_timeout
+        self.running = 0
+        self.stats = {"succeeded": 0, "failed": 0}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(max(0, self.concurrency))]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self.broker.next_job(timeout=5.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job broker unavailable: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if job is not None:
+                await self.run_job(*job)
+
+    async def run_job(self, job_id: str, payload: Dict[str, Any]):
+        self.running += 1
+        try:
+            await self.broker.update(job_id, status="running", started_at=time.time())
+            try:
+                result = await asyncio.wait_for(self.handler(payload), timeout=self.job_timeout)
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Job exceeded {self.job_timeout:.0f}s")
+            await self.broker.update(job_id, status="succeeded", result=result, finished_at=time.time())
+            self.stats["succeeded"] += 1
+        except asyncio.CancelledError:
+            self.stats["failed"] += 1
+            try:
+                await asyncio.shield(self.broker.update(job_id, status="failed", error="Worker shut down", finished_at=time.time()))
+            except Exception:
+                pass
+            raise
+        except JobNotFound:
+            logger.warning(f"Job {job_id} expired while running")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.stats["failed"] += 1
+            try:
+                await self.broker.update(job_id, status="failed", error=str(e), finished_at=time.time())
+            except JobNotFound:
+                pass
+        finally:
+            self.running -= 1
@@ -0,0 +1,36 @@
+"""
+Standalone analysis worker for JOB_BROKER=redis deployments: pulls jobs queued by any API
+node and runs them with the same pipeline as /analyze.
+
+    JOB_BROKER=redis JOB_REDIS_URL=redis://10.0.0.5:6379/0 JOB_WORKERS=4 python job_worker.py
+"""
+import asyncio
+import logging
+import os
+
+# Workers never serve the Cloud Function, so skip importing its SDK
+os.environ.setdefault("FIREBASE_FUNCTION_WRAPPER", "false")
+
+import main
+
+logger = logging.getLogger(__name__)
+
+
+async def run():
+    workers = main.get_job_workers()
+    workers.start()
+    logger.info(f"Job worker started with {workers.concurrency} slot(s)")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await workers.stop()
+        await main.get_job_broker().close()
+        await main.get_url_fetcher().aclose()
+        main.get_forensic_capture().flush(timeout=2.0)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
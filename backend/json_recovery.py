@@ -0,0 +1,287 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# A fence that opens a fresh JSON document: the model restarted its answer mid-output
+_RESTART_FENCE = re.compile(r'```[A-Za-z]*\s*\{')
+# Plain string content: everything up to a quote, a backslash or a backtick
+_STRING_RUN = re.compile(r'[^"\\`]+')
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_BARE_TOKEN = re.compile(r'[^,}\]\n]+')
+# What a genuine closing quote of an object value is followed by: `, "key":` or `}`
+_NEXT_KEY = re.compile(r'\s*"[^"\\\n]{1,80}"\s*:')
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_WHITESPACE = " \t\r\n"
+
+_MISSING = object()
+
+
+class JsonRecoveryError(ValueError):
+    """Raised when model output holds no recoverable JSON object."""
+
+
+class RecoveredJson:
+    """Result of recover_json: the parsed value plus what had to be repaired to get it."""
+
+    __slots__ = ("value", "repairs", "truncated")
+
+    def __init__(self, value: Dict[str, Any], repairs: List[str], truncated: bool):
+        self.value = value
+        self.repairs = repairs
+        self.truncated = truncated
+
+
+class _TolerantParser:
+    """
+    Recursive-descent JSON parser that never backtracks. Where strict JSON would fail it
+    applies the least surprising local fix and records it in `repairs`:
+
+    - a quote inside a string only closes it when followed by what the enclosing
+      container allows next, otherwise it is kept as an escaped quote;
+    - `\\\\n` (a double-escaped newline) decodes to a newline;
+    - stray, doubled and trailing commas are skipped, bare words become strings;
+    - end of input closes every open string, array and object;
+    - a markdown fence that opens a new document ends this one (`restart_at` marks it).
+    """
+
+    def __init__(self, text: str, start: int):
+        self.text = text
+        self.pos = start
+        self.end = len(text)
+        self.repairs: List[str] = []
+        self.truncated = False
+        self.restart_at: Optional[int] = None
+
+    def _note(self, repair: str):
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def _skip_ws(self):
+        text, pos, end = self.text, self.pos, self.end
+        while pos < end and text[pos] in _WHITESPACE:
+            pos += 1
+        self.pos = pos
+
+    def _stop(self, at: int) -> bool:
+        """Checks for a restart fence at `at`; if present, parsing ends there."""
+        match = _RESTART_FENCE.match(self.text, at)
+        if match is None:
+            return False
+        self.truncated = True
+        self.restart_at = match.end() - 1
+        self._note("restarted_document")
+        return True
+
+    def parse_value(self, closer: str) -> Any:
+        self._skip_ws()
+        if self.pos >= self.end:
+            self.truncated = True
+            return _MISSING
+        char = self.text[self.pos]
+        if char == '{':
+            return self.parse_object()
+        if char == '[':
+            return self.parse_array()
+        if char == '"':
+            return self.parse_string(closer)
+        if char in ',}]':
+            self._note("missing_value")
+            return _MISSING
+        number = _NUMBER.match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            literal = number.group(0)
+            return float(literal) if any(c in literal for c in ".eE") else int(literal)
+        if char == '`' and self._stop(self.pos):
+            return _MISSING
+        token = _BARE_TOKEN.match(self.text, self.pos)
+        word = token.group(0).strip() if token else ""
+        self.pos = token.end() if token else self.pos + 1
+        if word in _LITERALS:
+            return _LITERALS[word]
+        self._note("bare_value")
+        return word
+
+    def parse_object(self) -> Dict[str, Any]:
+        text = self.text
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        while True:
+            self._skip_ws()
+            if self.pos >= self.end:
+                self.truncated = True
+                self._note("closed_object")
+                return result
+            char = text[self.pos]
+            if char == '}':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+            if char == '"':
+                key = self.parse_string(None)
+            elif char.isalpha() or char == '_':
+                token = re.match(r'[\w$]+', text[self.pos:self.pos + 128])
+                key = token.group(0)
+                self.pos += len(key)
+                self._note("bare_key")
+            else:
+                if char == '`' and self._stop(self.pos):
+                    return result
+                self.pos += 1
+                self._note("skipped_junk")
+                continue
+            if self.truncated:
+                return result
+            self._skip_ws()
+            if self.pos < self.end and text[self.pos] == ':':
+                self.pos += 1
+            else:
+                self._note("missing_colon")
+            value = self.parse_value('}')
+            if value is not _MISSING:
+                result[key] = value
+            if self.truncated:
+                self._note("closed_object")
+                return result
+
+    def parse_array(self) -> List[Any]:
+        text = self.text
+        self.pos += 1
+        result: List[Any] = []
+        while True:
+            self._skip_ws()
+            if self.pos >= self.end:
+                self.truncated = True
+                self._note("closed_array")
+                return result
+            char = text[self.pos]
+            if char == ']':
+                self.pos += 1
+                return result
+            if char == ',':
+                self.pos += 1
+                continue
+            if char == '}':
+                # Mismatched closer: treat it as the end of the array and leave it for the object
+                self._note("closed_array")
+                return result
+            value = self.parse_value(']')
+            if value is not _MISSING:
+                result.append(value)
+            if self.truncated:
+                self._note("closed_array")
+                return result
+
+    def _closes_string(self, after: int, closer: Optional[str]) -> bool:
+        """Decides whether the quote just before `after` ends the current string."""
+        if closer is None:
+            return True
+        text, end = self.text, self.end
+        pos = after
+        while pos < end and text[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= end:
+            return True
+        char = text[pos]
+        if char == closer or (char == '`' and text.startswith('```', pos)):
+            return True
+        if char != ',':
+            return False
+        if closer == '}' and _NEXT_KEY.match(text, pos + 1):
+            # A value is only over if the next member's key follows the comma
+            return True
+        pos += 1
+        while pos < end and text[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= end:
+            return True
+        return text[pos] == closer if closer == '}' else text[pos] in '"{[]-0123456789tfn'
+
+    def parse_string(self, closer: Optional[str]) -> str:
+        text, end = self.text, self.end
+        pos = self.pos + 1
+        out: List[str] = []
+        while pos < end:
+            run = _STRING_RUN.match(text, pos)
+            if run:
+                out.append(run.group(0))
+                pos = run.end()
+                if pos >= end:
+                    break
+            char = text[pos]
+            if char == '"':
+                if self._closes_string(pos + 1, closer):
+                    self.pos = pos + 1
+                    return "".join(out)
+                out.append('"')
+                self._note("escaped_quote")
+                pos += 1
+            elif char == '\\':
+                if pos + 1 >= end:
+                    pos += 1
+                    break
+                escape = text[pos + 1]
+                if escape == 'u' and pos + 6 <= end:
+                    try:
+                        out.append(chr(int(text[pos + 2:pos + 6], 16)))
+                        pos += 6
+                        continue
+                    except ValueError:
+                        pass
+                if escape == '\\' and text.startswith('n', pos + 2):
+                    # Double-escaped newline: the model meant a line break, not "\n" literally
+                    out.append('\n')
+                    self._note("literal_newline")
+                    pos += 3
+                    continue
+                out.append(_ESCAPES.get(escape, escape))
+                pos += 2
+            else:
+                if self._stop(pos):
+                    self.pos = pos
+                    return "".join(out)
+                out.append(char)
+                pos += 1
+        self.pos = end
+        self.truncated = True
+        self._note("closed_string")
+        return "".join(out)
+
+
+def recover_json(raw_text: str) -> RecoveredJson:
+    """
+    Extracts the JSON object from model output in one left-to-right pass.
+    Well-formed output takes the json.loads fast path; otherwise the tolerant parser
+    repairs it. If the model restarted its answer, the first complete document wins,
+    falling back to the first recovered one.
+    """
+    start = raw_text.find('{') if raw_text else -1
+    if start == -1:
+        raise JsonRecoveryError("No JSON object found in text")
+
+    end = raw_text.rfind('}')
+    if end > start:
+        try:
+            value = json.loads(raw_text[start:end + 1], strict=False)
+            if isinstance(value, dict):
+                return RecoveredJson(value, [], False)
+        except json.JSONDecodeError:
+            pass
+
+    fallback: Optional[RecoveredJson] = None
+    while start is not None:
+        parser = _TolerantParser(raw_text, start)
+        try:
+            value = parser.parse_object()
+        except RecursionError:
+            raise JsonRecoveryError("JSON nesting too deep to recover")
+        recovered = RecoveredJson(value, parser.repairs, parser.truncated)
+        if not parser.truncated:
+            return recovered
+        if fallback is None:
+            fallback = recovered
+        start = parser.restart_at
+    return fallback
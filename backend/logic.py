@@ -1,58 +1,33 @@
-import json
-import os
 import urllib.parse
 
-# Load verified signatories at module level
-VERIFIED_DOMAINS = set()
-try:
-    data_dir = os.path.join(os.path.dirname(__file__), 'data')
-    verified_path = os.path.join(data_dir, 'verified_domains.json')
-    if os.path.exists(verified_path):
-        with open(verified_path, 'r', encoding='utf-8') as f:
-            VERIFIED_DOMAINS = set(json.load(f))
-except Exception as e:
-    print(f"Warning: Could not load verified domains: {e}")
-
-# Helper for enforcing strict domain checks
-def normalize_domain_name(domain: str) -> str:
-    if not domain:
-        return ""
-    domain = urllib.parse.unquote(domain).strip().lower()
-    if domain.startswith("http://") or domain.startswith("https://"):
-        try:
-            domain = urllib.parse.urlparse(domain).netloc
-        except Exception:
-            pass
-    if domain.startswith("www."):
-        domain = domain[4:]
-    return domain
-
-# Domain Authority Multipliers (from V2 logic or similar heuristics)
+from authority_index import build_authority_index, normalize_domain_name
+from domain_registry import DomainRegistry
+
+_VERIFIED_REGISTRY = None
+_AUTHORITY_INDEX = None
+_AUTHORITY_GENERATION = -1
+
+def get_verified_registry() -> DomainRegistry:
+    """Verified fact-checker signatories: the memory-mapped registry, opened on first use and reloaded when its file changes."""
+    global _VERIFIED_REGISTRY
+    if _VERIFIED_REGISTRY is None:
+        _VERIFIED_REGISTRY = DomainRegistry()
+    return _VERIFIED_REGISTRY
+
+def get_authority_index():
+    """Compiled tier index over the authority tier table, rebuilt whenever the verified registry is swapped."""
+    global _AUTHORITY_INDEX, _AUTHORITY_GENERATION
+    registry = get_verified_registry()
+    registry.refresh()
+    if _AUTHORITY_INDEX is None or _AUTHORITY_GENERATION != registry.generation:
+        # Cached lookups may predate the swap, so the index and its LRU start over
+        _AUTHORITY_INDEX = build_authority_index(registry)
+        _AUTHORITY_GENERATION = registry.generation
+    return _AUTHORITY_INDEX
+
+# Domain Authority Multipliers: verified fact-checkers, .gov/.edu/.int, major news, social media, uploaded files
 def get_authority_multiplier(domain: str) -> float:
-    domain = normalize_domain_name(domain)
-    
-    # NEW: Tier 1 override for Verified Fact-Checkers
-    is_verified_signatory = domain in VERIFIED_DOMAINS
-    print(f"DEBUG: Domain {domain} verified status: {is_verified_signatory}")
-    if is_verified_signatory:
-        return 1.0
-        
-    if domain.endswith('.gov') or domain.endswith('.edu') or domain.endswith('.int'):
-        return 1.0  # Highest authority
-    if domain.endswith('.org') or domain in ['bbc.com', 'bbc.co.uk', 'reuters.com', 'apnews.com', 'npr.org']:
-        return 0.9  # High authority orgs/news
-    if domain in ['wikipedia.org', 'en.wikipedia.org']:
-        return 0.8  # Commendable but crowd-sourced
-    
-    social_domains = ['twitter.com', 'x.com', 'facebook.com', 'instagram.com', 'tiktok.com', 'reddit.com', 'youtube.com']
-    if any(sd in domain for sd in social_domains):
-        return 0.4  # Social media / UGC
-    
-    # Check for file extensions (indicates an uploaded file used as ground truth)
-    if any(domain.lower().endswith(ext) for ext in ['.pdf', '.jpg', '.jpeg', '.png', '.txt', '.docx']):
-        return 1.0 # Direct user-provided evidence
-        
-    return 0.7  # Default for unknown .com/.net/...
+    return get_authority_index().score(domain)
 
 def extract_domain(url: str) -> str:
     if not url:
@@ -73,29 +48,30 @@ def extract_domain(url: str) -> str:
     except Exception:
         return "unknown"
 
-def calculate_reliability(grounding_supports: list, grounding_chunks: list, grounding_citations: list, is_multimodal_verified: bool, ai_confidence: float = 0.0) -> dict:
-    """
-    Implements the V3 Strongest Link Math Engine.
-    """
-    # EARLY EXIT: If there are no sources used, return a safe zeroed payload
-    if not grounding_supports:
-        return {
-            "reliability_score": 0.0,
-            "ai_confidence": ai_confidence,
-            "base_grounding": 0.0,
-            "consistency_bonus": 0.0,
-            "multimodal_bonus": 0.0,
-            "verdict_label": "Unverified / No Data",
-            "explanation": "No reliable search results were found to verify this claim.",
-            "segments": [],
-            "unused_sources": [] # Ensure frontend doesn't crash trying to map this
-        }
+def get_field(obj, *fields):
+    """Robust field extraction from Pydantic objects or dicts (snake_case vs camelCase)."""
+    for f in fields:
+        if hasattr(obj, f):
+            return getattr(obj, f)
+        if isinstance(obj, dict) and f in obj:
+            return obj[f]
+    return None
 
-    segment_audits = []
-    used_domains = set()
-    used_chunk_indices = set()
+def chunk_source(chunk) -> tuple:
+    """(domain, uri, title) a grounding chunk is scored and cited under."""
+    # Handle Vertex AI chunk object vs local dict representation
+    if hasattr(chunk, 'web') and chunk.web:
+        raw_domain = getattr(chunk.web, 'domain', '') or getattr(chunk.web, 'title', 'unknown')
+        raw_uri = getattr(chunk.web, 'uri', '')
+        raw_title = getattr(chunk.web, 'title', 'No snippet available.')
+    else:
+        raw_domain = chunk.get('domain', '') or chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
+        raw_uri = chunk.get('uri', '') if isinstance(chunk, dict) else ''
+        raw_title = chunk.get('title', 'No snippet available.') if isinstance(chunk, dict) else 'No snippet available.'
+    return raw_domain, raw_uri, raw_title
 
-    # Pre-compute URI to Source Index mapping from Citations
+def citation_lookup(grounding_citations: list) -> tuple:
+    """URI -> source index and URI -> snippet maps over the response's citations."""
     uri_to_source_index = {}
     snippet_map = {}
     for idx, citation in enumerate(grounding_citations):
@@ -105,23 +81,82 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
         if uri:
             uri_to_source_index[uri] = idx
             snippet_map[uri] = snippet
+    return uri_to_source_index, snippet_map
+
+def collect_unused_sources(grounding_chunks: list, used_chunk_indices: set, used_domains: set) -> list:
+    """Retrieved chunks no segment cited, one entry per domain not already used."""
+    unused_sources = []
+    seen_unused_domains = set()
 
-    # Define a helper for robust field extraction (snake_case vs camelCase)
-    def github_get(obj, *fields):
-        for f in fields:
-            if hasattr(obj, f):
-                return getattr(obj, f)
-            if isinstance(obj, dict) and f in obj:
-                return obj[f]
-        return None
+    for chunk_idx, chunk in enumerate(grounding_chunks):
+        if chunk_idx not in used_chunk_indices:
+            if hasattr(chunk, 'web') and chunk.web:
+                domain = getattr(chunk.web, 'domain', None) or extract_domain(getattr(chunk.web, 'uri', '')) or getattr(chunk.web, 'title', 'unknown')
+                title = getattr(chunk.web, 'title', 'unknown')
+            else:
+                domain = chunk.get('domain', None) or extract_domain(chunk.get('uri', '')) or chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
+                title = chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
+
+            if domain and domain != "unknown" and domain not in used_domains and domain not in seen_unused_domains:
+                unused_sources.append({
+                    "domain": domain,
+                    "title": title
+                })
+                seen_unused_domains.add(domain)
+    return unused_sources
+
+def empty_reliability(ai_confidence: float = 0.0) -> dict:
+    return {
+        "reliability_score": 0.0,
+        "ai_confidence": ai_confidence,
+        "base_grounding": 0.0,
+        "consistency_bonus": 0.0,
+        "multimodal_bonus": 0.0,
+        "verdict_label": "Unverified / No Data",
+        "explanation": "No reliable search results were found to verify this claim.",
+        "segments": [],
+        "unused_sources": [] # Ensure frontend doesn't crash trying to map this
+    }
+
+def verdict_label_for(final_score: float) -> str:
+    if final_score > 0.85:
+        return "High (Verified Institutional)"
+    elif final_score > 0.70:
+        return "Medium-High (Verified News)"
+    elif final_score > 0.50:
+        return "Medium (Mixed/Uncertain)"
+    return "Low (Unverified)"
+
+def reliability_explanation(base_grounding: float, segment_count: int, domain_count: int, consistency_bonus: float, multimodal_bonus: float) -> str:
+    explanation = f"Base grounding evaluated at {base_grounding:.2f} across {segment_count} segments. "
+    if consistency_bonus > 0:
+        explanation += f"Consistency bonus (+0.05) applied for {domain_count} unique domains. "
+    if multimodal_bonus > 0:
+        explanation += "Multimodal cross-check bonus (+0.05) applied."
+    return explanation
+
+def calculate_reliability(grounding_supports: list, grounding_chunks: list, grounding_citations: list, is_multimodal_verified: bool, ai_confidence: float = 0.0) -> dict:
+    """
+    Implements the V3 Strongest Link Math Engine.
+    """
+    # EARLY EXIT: If there are no sources used, return a safe zeroed payload
+    if not grounding_supports:
+        return empty_reliability(ai_confidence)
+
+    segment_audits = []
+    used_domains = set()
+    used_chunk_indices = set()
+
+    # Pre-compute URI to Source Index mapping from Citations
+    uri_to_source_index, snippet_map = citation_lookup(grounding_citations)
 
     print("\n" + "="*50)
     print("[RAW_METADATA_AUDIT] Grounding Supports Structure")
     for i, support in enumerate(grounding_supports): # Audit all segments
-        segment = github_get(support, 'segment') or {}
-        segment_text = github_get(segment, 'text') or 'Unknown segment text'
-        indices = github_get(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
-        conf_scores = github_get(support, 'confidence_scores', 'confidenceScores') or 'NOT FOUND'
+        segment = get_field(support, 'segment') or {}
+        segment_text = get_field(segment, 'text') or 'Unknown segment text'
+        indices = get_field(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
+        conf_scores = get_field(support, 'confidence_scores', 'confidenceScores') or 'NOT FOUND'
         print(f"--- Segment {i} ---")
         print(f"  Text: '{segment_text[:50]}...'")
         print(f"  Chunk Indices: {indices}")
@@ -130,11 +165,11 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
 
     for seg_idx, support in enumerate(grounding_supports):
         # Determine attributes robustly
-        segment = github_get(support, 'segment') or {}
-        segment_text = github_get(segment, 'text') or 'Unknown segment text'
+        segment = get_field(support, 'segment') or {}
+        segment_text = get_field(segment, 'text') or 'Unknown segment text'
         
-        indices = github_get(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
-        conf_scores = github_get(support, 'confidence_scores', 'confidenceScores') or []
+        indices = get_field(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
+        conf_scores = get_field(support, 'confidence_scores', 'confidenceScores') or []
         
         evaluated_sources = []
         best_score = 0.0
@@ -146,16 +181,8 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
                 
             chunk = grounding_chunks[chunk_idx]
             
-            # Handle Vertex AI chunk object vs local dict representation
-            if hasattr(chunk, 'web') and chunk.web:
-                raw_domain = getattr(chunk.web, 'domain', '') or getattr(chunk.web, 'title', 'unknown')
-                raw_uri = getattr(chunk.web, 'uri', '')
-                raw_title = getattr(chunk.web, 'title', 'No snippet available.')
-            else:
-                 raw_domain = chunk.get('domain', '') or chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
-                 raw_uri = chunk.get('uri', '') if isinstance(chunk, dict) else ''
-                 raw_title = chunk.get('title', 'No snippet available.') if isinstance(chunk, dict) else 'No snippet available.'
-            
+            raw_domain, raw_uri, raw_title = chunk_source(chunk)
+
             source_index = uri_to_source_index.get(raw_uri, -1)
             quote_text = snippet_map.get(raw_uri, raw_title)
             
@@ -164,14 +191,14 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
             if raw_domain and raw_domain != "unknown":
                 used_domains.add(raw_domain)
 
-            auth = get_authority_multiplier(raw_domain)
+            authority = get_authority_index().lookup(raw_domain)
+            auth = authority.score
             
             # Default to 1.0 for files if API confidence is missing (it's user context)
             conf = conf_scores[i] if i < len(conf_scores) else (1.0 if raw_uri.startswith("file://") else 0.0)
             chunk_score = conf * auth
             
-            clean_domain_for_check = normalize_domain_name(raw_domain)
-            is_verified = clean_domain_for_check in VERIFIED_DOMAINS
+            is_verified = authority.verified
             
             evaluated_sources.append({
                 "id": chunk_idx + 1, # 1-indexed source ID
@@ -208,24 +235,7 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
         base_grounding = 0.0
 
     # Collect unused sources
-    unused_sources = []
-    seen_unused_domains = set()
-    
-    for chunk_idx, chunk in enumerate(grounding_chunks):
-        if chunk_idx not in used_chunk_indices:
-            if hasattr(chunk, 'web') and chunk.web:
-                domain = getattr(chunk.web, 'domain', None) or extract_domain(getattr(chunk.web, 'uri', '')) or getattr(chunk.web, 'title', 'unknown')
-                title = getattr(chunk.web, 'title', 'unknown')
-            else:
-                domain = chunk.get('domain', None) or extract_domain(chunk.get('uri', '')) or chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
-                title = chunk.get('title', 'unknown') if isinstance(chunk, dict) else 'unknown'
-                
-            if domain and domain != "unknown" and domain not in used_domains and domain not in seen_unused_domains:
-                unused_sources.append({
-                    "domain": domain,
-                    "title": title
-                })
-                seen_unused_domains.add(domain)
+    unused_sources = collect_unused_sources(grounding_chunks, used_chunk_indices, used_domains)
 
     # Additive Bonuses
     consistency_bonus = 0.05 if len(used_domains) > 1 else 0.0
@@ -233,21 +243,8 @@ def calculate_reliability(grounding_supports: list, grounding_chunks: list, grou
 
     final_score = min(1.0, base_grounding + consistency_bonus + multimodal_bonus)
 
-    # Verdict Labeling
-    if final_score > 0.85:
-        verdict_label = "High (Verified Institutional)"
-    elif final_score > 0.70:
-        verdict_label = "Medium-High (Verified News)"
-    elif final_score > 0.50:
-        verdict_label = "Medium (Mixed/Uncertain)"
-    else:
-        verdict_label = "Low (Unverified)"
-        
-    explanation = f"Base grounding evaluated at {base_grounding:.2f} across {len(segment_audits)} segments. "
-    if consistency_bonus > 0:
-        explanation += f"Consistency bonus (+0.05) applied for {len(used_domains)} unique domains. "
-    if multimodal_bonus > 0:
-         explanation += "Multimodal cross-check bonus (+0.05) applied."
+    verdict_label = verdict_label_for(final_score)
+    explanation = reliability_explanation(base_grounding, len(segment_audits), len(used_domains), consistency_bonus, multimodal_bonus)
 
     print("\n[FORENSIC_AUDIT] Segment Breakdown:")
     for idx, audit in enumerate(segment_audits):
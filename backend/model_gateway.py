@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import weakref
+from typing import Any, AsyncIterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Concurrency gate for outbound Gemini calls (per event loop)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+# Hard ceiling for a single generate_content round trip, in seconds
+GEMINI_CALL_TIMEOUT_SEC = float(os.getenv("GEMINI_CALL_TIMEOUT_SEC", "45"))
+
+
+class ModelCallTimeout(Exception):
+    """Raised when a single Gemini call exceeds its time budget."""
+
+
+class GeminiGateway:
+    """
+    Runs Gemini calls on the SDK's async client so the event loop stays free,
+    behind a semaphore that caps how many calls are in flight at once.
+    """
+
+    def __init__(self, max_concurrency: int = GEMINI_MAX_CONCURRENCY, call_timeout: float = GEMINI_CALL_TIMEOUT_SEC):
+        self.max_concurrency = max(1, max_concurrency)
+        self.call_timeout = call_timeout
+        self.in_flight = 0
+        # asyncio primitives are bound to the loop that first waits on them, and the
+        # Cloud Function wrapper may run each invocation on its own loop.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def generate_content(self, client: Any, model: str, contents: List[Any], config: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Awaits client.aio.models.generate_content under the concurrency gate.
+        Raises ModelCallTimeout if the call itself runs past `timeout` seconds.
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+
+        async with self._get_semaphore():
+            self.in_flight += 1
+            try:
+                return await asyncio.wait_for(
+                    client.aio.models.generate_content(model=model, contents=contents, config=config),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Gemini call timed out after {timeout:.1f}s")
+                raise ModelCallTimeout(f"Gemini call exceeded {timeout:.1f}s timeout")
+            finally:
+                self.in_flight -= 1
+
+    async def generate_content_stream(self, client: Any, model: str, contents: List[Any], config: Any, timeout: Optional[float] = None) -> AsyncIterator[Any]:
+        """
+        Yields chunks from client.aio.models.generate_content_stream under the concurrency gate.
+        `timeout` bounds the wait for each chunk rather than the whole stream.
+        """
+        timeout = self.call_timeout if timeout is None else timeout
+
+        async with self._get_semaphore():
+            self.in_flight += 1
+            try:
+                stream = await asyncio.wait_for(
+                    client.aio.models.generate_content_stream(model=model, contents=contents, config=config),
+                    timeout=timeout
+                )
+                iterator = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            except asyncio.TimeoutError:
+                logger.warning(f"Gemini stream stalled for {timeout:.1f}s")
+                raise ModelCallTimeout(f"Gemini stream exceeded {timeout:.1f}s between chunks")
+            finally:
+                self.in_flight -= 1
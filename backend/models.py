@@ -98,3 +98,24 @@ class AnalysisResponse(BaseModel):
     media_literacy: Optional[MediaLiteracy] = None
     reliability_metrics: Optional[ReliabilityMetrics] = None
     sources: List[Source] = []
+
+class SessionClaimRequest(BaseModel):
+    text_claim: str
+    url: Optional[str] = None
+    urls: List[str] = []
+    request_id: str = "session"
+    settings: AnalysisSettings = Field(default_factory=AnalysisSettings)
+
+class BatchClaim(BaseModel):
+    text_claim: str
+    url: Optional[str] = None
+    urls: List[str] = []
+    request_id: Optional[str] = None
+    # Overrides the batch-wide settings for this claim
+    settings: Optional[AnalysisSettings] = None
+
+class BatchAnalysisRequest(BaseModel):
+    claims: List[BatchClaim]
+    settings: AnalysisSettings = Field(default_factory=AnalysisSettings)
+    # Capped by ANALYSIS_BATCH_CONCURRENCY
+    concurrency: Optional[int] = Field(default=None, ge=1)
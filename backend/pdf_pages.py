@@ -0,0 +1,215 @@
+import asyncio
+import importlib.util
+import io
+import logging
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+# pypdf is imported by the worker processes that parse PDFs, not at startup; without it PDFs are always sent whole
+PYPDF_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+
+logger = logging.getLogger(__name__)
+
+# Off by default: page selection trades recall for tokens and should be opted into per deployment
+PDF_PAGE_SELECT_ENABLED = os.getenv("PDF_PAGE_SELECT_ENABLED", "false").lower() == "true"
+PDF_PAGE_SELECT_MAX_PAGES = int(os.getenv("PDF_PAGE_SELECT_MAX_PAGES", "6"))
+# Shorter documents are cheap enough to send whole
+PDF_PAGE_SELECT_MIN_PAGES = int(os.getenv("PDF_PAGE_SELECT_MIN_PAGES", "10"))
+# "pdf" keeps the selected pages as a trimmed PDF (layout, tables, figures); "text" sends their extracted text
+PDF_PAGE_SELECT_MODE = os.getenv("PDF_PAGE_SELECT_MODE", "pdf").lower()
+PDF_PAGE_SELECT_WORKERS = int(os.getenv("PDF_PAGE_SELECT_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Pages averaging fewer characters than this are treated as scanned images with no usable text layer
+_MIN_CHARS_PER_PAGE = 200
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'\-]+")
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had
+has have having he her here hers him his how i if in into is it its itself just me more most my
+no nor not now of off on once only or other our ours out over own same she should so some such
+than that the their theirs them then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours
+claim claims said says according report reported new
+""".split())
+
+
+class PdfSelection:
+    __slots__ = ("data", "mime_type", "original_size", "page_count", "pages", "reason")
+
+    def __init__(self, data: bytes, mime_type: str, original_size: int, page_count: int = 0,
+                 pages: Optional[List[int]] = None, reason: str = ""):
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.page_count = page_count
+        # 1-based numbers of the pages kept; None when the whole document is sent
+        self.pages = pages
+        self.reason = reason
+
+    @property
+    def trimmed(self) -> bool:
+        return self.pages is not None
+
+    @property
+    def pages_dropped(self) -> int:
+        return self.page_count - len(self.pages) if self.pages is not None else 0
+
+
+def claim_keywords(text_claim: str) -> List[str]:
+    """Distinct lower-cased words of the claim, minus stopwords and one-letter tokens."""
+    seen = []
+    for word in _WORD_RE.findall((text_claim or "").lower()):
+        word = word.strip("'-")
+        if len(word) > 1 and word not in _STOPWORDS and word not in seen:
+            seen.append(word)
+    return seen
+
+
+def score_pages(page_texts: List[str], keywords: List[str]) -> List[float]:
+    """
+    BM25-style relevance of each page to the keywords. Terms that appear on every page
+    (running headers, the company name) contribute almost nothing.
+    """
+    if not page_texts or not keywords:
+        return [0.0] * len(page_texts)
+    counts = [Counter(_WORD_RE.findall(text.lower())) for text in page_texts]
+    lengths = [sum(c.values()) for c in counts]
+    avg_length = (sum(lengths) / len(lengths)) or 1.0
+    n = len(page_texts)
+    scores = []
+    for page_counts, length in zip(counts, lengths):
+        score = 0.0
+        for word in keywords:
+            tf = page_counts.get(word, 0)
+            if not tf:
+                continue
+            df = sum(1 for c in counts if word in c)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+def select_pdf_pages(data: bytes, text_claim: str, max_pages: int = PDF_PAGE_SELECT_MAX_PAGES,
+                     min_pages: int = PDF_PAGE_SELECT_MIN_PAGES, mode: str = PDF_PAGE_SELECT_MODE) -> PdfSelection:
+    """
+    Keeps the `max_pages` pages of a PDF that best match the claim keywords, in document
+    order, as a trimmed PDF or as their extracted text. The whole document is returned
+    whenever selection would be a guess: short or encrypted PDFs, scans without a text
+    layer, or claims that match no page.
+    """
+    whole = PdfSelection(data, "application/pdf", len(data))
+    keywords = claim_keywords(text_claim)
+    if not PYPDF_AVAILABLE or not keywords:
+        whole.reason = "unavailable" if not PYPDF_AVAILABLE else "no_keywords"
+        return whole
+    try:
+        from pypdf import PdfReader, PdfWriter
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted:
+            whole.reason = "encrypted"
+            return whole
+        page_count = len(reader.pages)
+        whole.page_count = page_count
+        if page_count <= max(min_pages, max_pages):
+            whole.reason = "short"
+            return whole
+        page_texts = [page.extract_text() or "" for page in reader.pages]
+        if sum(len(text) for text in page_texts) < _MIN_CHARS_PER_PAGE * page_count / 2:
+            whole.reason = "no_text_layer"
+            return whole
+        scores = score_pages(page_texts, keywords)
+        ranked = sorted((i for i in range(page_count) if scores[i] > 0), key=lambda i: -scores[i])
+        if not ranked:
+            whole.reason = "no_match"
+            return whole
+        keep = sorted(ranked[:max_pages])
+        pages = [i + 1 for i in keep]
+
+        if mode == "text":
+            text = "\n\n".join(f"--- Page {i + 1} of {page_count} ---\n{page_texts[i].strip()}" for i in keep)
+            return PdfSelection(text.encode("utf-8"), "text/plain", len(data), page_count, pages, "selected")
+
+        writer = PdfWriter()
+        for i in keep:
+            writer.add_page(reader.pages[i])
+        out = io.BytesIO()
+        writer.write(out)
+        trimmed = out.getvalue()
+    except Exception as e:
+        # Malformed or exotic PDFs are Gemini's problem, not ours
+        logger.warning(f"PDF page selection skipped ({len(data)} bytes): {e}")
+        whole.reason = "error"
+        return whole
+
+    if len(trimmed) >= len(data):
+        # Shared resources (fonts, images) dominate the file; trimming saves nothing
+        whole.reason = "no_saving"
+        return whole
+    return PdfSelection(trimmed, "application/pdf", len(data), page_count, pages, "selected")
+
+
+def _warm_worker() -> int:
+    import pypdf  # noqa: F401
+    return os.getpid()
+
+
+class PdfPageSelector:
+    """
+    Runs select_pdf_pages on a process pool. Text extraction is pure Python and holds the
+    GIL, so threads would stall the event loop; separate processes keep it responsive and
+    let the PDFs of one request be processed in parallel.
+    """
+
+    def __init__(self, max_pages: int = PDF_PAGE_SELECT_MAX_PAGES, min_pages: int = PDF_PAGE_SELECT_MIN_PAGES,
+                 mode: str = PDF_PAGE_SELECT_MODE, workers: int = PDF_PAGE_SELECT_WORKERS,
+                 enabled: bool = PDF_PAGE_SELECT_ENABLED):
+        self.max_pages = max(1, max_pages)
+        self.min_pages = min_pages
+        self.mode = mode if mode in ("pdf", "text") else "pdf"
+        self.workers = max(1, workers)
+        self.enabled = enabled and PYPDF_AVAILABLE
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if enabled and not PYPDF_AVAILABLE:
+            logger.warning("pypdf is not installed; PDFs are sent to Gemini whole")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def select_all(self, documents: List[bytes], text_claim: str) -> List[PdfSelection]:
+        """Selects pages from each PDF concurrently, preserving order."""
+        if not self.enabled or not documents or not claim_keywords(text_claim):
+            return [PdfSelection(data, "application/pdf", len(data)) for data in documents]
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        return list(await asyncio.gather(*(
+            loop.run_in_executor(executor, select_pdf_pages, data, text_claim, self.max_pages, self.min_pages, self.mode)
+            for data in documents
+        )))
+
+    async def warm(self) -> int:
+        """Spawns the worker processes (and their pypdf import) ahead of the first PDF."""
+        if not self.enabled:
+            return 0
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        return len(set(await asyncio.gather(*(loop.run_in_executor(executor, _warm_worker) for _ in range(self.workers)))))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def describe_selection(selection: PdfSelection) -> str:
+    """Prompt note telling the model it is looking at an excerpt, e.g. 'pages 3, 7 of 40'."""
+    if not selection.trimmed:
+        return ""
+    return f"pages {', '.join(str(p) for p in selection.pages)} of {selection.page_count}, selected for relevance to the claim"
+
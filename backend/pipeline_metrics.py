@@ -0,0 +1,198 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) for the stage histograms: sub-millisecond parsing up to a full minute of Gemini
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "veriscan_"
+
+# Stage timings for the request currently being served, read back into the Server-Timing header.
+# Tasks copy the context on creation, so spans recorded in child tasks land in the same list.
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "veriscan_request_timings", default=None
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isfinite(value) and value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """Starts collecting stage timings for the current request and returns the collector."""
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Formats collected timings as a Server-Timing value; repeated stages are summed."""
+    merged: Dict[str, float] = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class PipelineMetrics:
+    """
+    In-process stage histograms and counters for the analysis pipeline, rendered in the
+    Prometheus text exposition format. Thread-safe, since the Cloud Function wrapper
+    serves invocations from worker threads.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # stage -> [per-bucket counts..., +Inf count], sum
+        self._stage_counts: Dict[str, List[int]] = {}
+        self._stage_sums: Dict[str, float] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        # name -> (help, buckets, per-bucket counts, sum)
+        self._histograms: Dict[str, Tuple[str, Tuple[float, ...], List[int], List[float]]] = {}
+
+    def describe_counter(self, name: str, help_text: str):
+        with self._lock:
+            self._help[name] = help_text
+            self._counters.setdefault(name, {})
+
+    def describe_histogram(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        """Declares a histogram with its own buckets (stage durations use observe/span instead)."""
+        buckets = tuple(sorted(buckets))
+        with self._lock:
+            self._histograms[name] = (help_text, buckets, [0] * (len(buckets) + 1), [0.0])
+
+    def observe_histogram(self, name: str, value: float):
+        with self._lock:
+            _, buckets, counts, total = self._histograms[name]
+            counts[bisect.bisect_left(buckets, value)] += 1
+            total[0] += value
+
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Registers a gauge whose value is read from `read()` at scrape time."""
+        with self._lock:
+            self._gauges[name] = (help_text, read)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, stage: str, seconds: float):
+        """Records one stage duration in the histogram and in the current request's timings."""
+        with self._lock:
+            counts = self._stage_counts.get(stage)
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+                self._stage_counts[stage] = counts
+                self._stage_sums[stage] = 0.0
+            counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self._stage_sums[stage] += seconds
+
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Times the enclosed block as `stage`, including when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            return self._counters.get(name, {}).get(key, 0)
+
+    def stage_count(self, stage: str) -> int:
+        with self._lock:
+            return sum(self._stage_counts.get(stage, ()))
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            stage_counts = {stage: list(counts) for stage, counts in self._stage_counts.items()}
+            stage_sums = dict(self._stage_sums)
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            help_texts = dict(self._help)
+            gauges = dict(self._gauges)
+            histograms = {
+                name: (help_text, buckets, list(counts), total[0])
+                for name, (help_text, buckets, counts, total) in self._histograms.items()
+            }
+
+        lines = []
+        name = METRIC_PREFIX + "stage_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in each analysis pipeline stage.")
+        lines.append(f"# TYPE {name} histogram")
+        for stage in sorted(stage_counts):
+            labels = (("stage", stage),)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), stage_counts[stage]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(stage_sums[stage])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        for histogram in sorted(histograms):
+            help_text, buckets, counts, total = histograms[histogram]
+            name = METRIC_PREFIX + histogram
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels((('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum {_format_value(total)}")
+            lines.append(f"{name}_count {cumulative}")
+
+        for counter in sorted(counters):
+            name = METRIC_PREFIX + counter
+            if counter in help_texts:
+                lines.append(f"# HELP {name} {help_texts[counter]}")
+            lines.append(f"# TYPE {name} counter")
+            series = counters[counter] or {(): 0}
+            for labels in sorted(series):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series[labels])}")
+
+        for gauge in sorted(gauges):
+            help_text, read = gauges[gauge]
+            try:
+                value = float(read())
+            except Exception:
+                continue
+            name = METRIC_PREFIX + gauge
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,94 @@
+"""
+Cold-start import profile of the backend: imports a module in a fresh interpreter under
+`python -X importtime`, reports where the time goes, and enforces the import budget.
+
+Heavy SDKs (google-genai, firebase-functions, firebase-admin, pypdf) are loaded on first
+use, not at import; the report fails if one of them shows up at startup again or if the
+total import time exceeds --budget-ms.
+
+Usage: python profile_startup.py [--module main] [--top 15] [--budget-ms 1200] [--runs 3] [--with-function-wrapper]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+# Top-level packages that must not be imported by `import main`
+DEFERRED_MODULES = ("google.genai", "google.oauth2", "firebase_functions", "firebase_admin", "pypdf")
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1200"))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = [f.strip() for f in line[len("import time:"):].split("|")]
+        if len(fields) != 3 or not fields[0].isdigit():
+            continue  # the header line
+        rows.append((fields[2], int(fields[0]), int(fields[1])))
+    return rows
+
+
+def by_package(rows: Iterable[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package, in microseconds."""
+    totals: Dict[str, int] = {}
+    for module, self_us, _ in rows:
+        package = module.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def deferred_violations(rows: Iterable[Tuple[str, int, int]], deferred: Iterable[str] = DEFERRED_MODULES) -> List[str]:
+    loaded = {module for module, _, _ in rows}
+    return [name for name in deferred if name in loaded]
+
+
+def profile_import(module: str, function_wrapper: bool = False) -> List[Tuple[str, int, int]]:
+    env = dict(os.environ, FIREBASE_FUNCTION_WRAPPER="true" if function_wrapper else "false")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--module", default="main")
+    arg_parser.add_argument("--top", type=int, default=15, help="packages to list")
+    arg_parser.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    arg_parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to time; the median is reported")
+    arg_parser.add_argument("--with-function-wrapper", action="store_true",
+                            help="profile the Cloud Function entrypoint (imports firebase-functions)")
+    args = arg_parser.parse_args()
+
+    runs = [profile_import(args.module, args.with_function_wrapper) for _ in range(max(1, args.runs))]
+    totals_ms = [next(c for m, _, c in rows if m == args.module) / 1000 for rows in runs]
+    rows = runs[totals_ms.index(sorted(totals_ms)[len(totals_ms) // 2])]
+    total_ms = statistics.median(totals_ms)
+
+    print(f"import {args.module}: median {total_ms:.0f}ms over {len(runs)} run(s), {len(rows)} modules")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f}ms  {package}")
+
+    failed = False
+    deferred = () if args.with_function_wrapper else DEFERRED_MODULES
+    for name in deferred_violations(rows, deferred):
+        print(f"FAIL: {name} is imported at startup; import it where it is first used")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.0f}ms exceeds the {args.budget_ms:.0f}ms budget")
+        failed = True
+    if not failed:
+        print(f"OK: within the {args.budget_ms:.0f}ms budget")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Starting request rate towards Vertex AI, adapted up/down from observed 429s
+GEMINI_RATE_LIMIT_QPS = float(os.getenv("GEMINI_RATE_LIMIT_QPS", "5"))
+GEMINI_RATE_LIMIT_MIN_QPS = float(os.getenv("GEMINI_RATE_LIMIT_MIN_QPS", "0.5"))
+GEMINI_RATE_LIMIT_MAX_QPS = float(os.getenv("GEMINI_RATE_LIMIT_MAX_QPS", "20"))
+GEMINI_RATE_LIMIT_BURST = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "5"))
+# Jittered exponential backoff between retries of one request
+GEMINI_BACKOFF_BASE_SEC = float(os.getenv("GEMINI_BACKOFF_BASE_SEC", "1"))
+GEMINI_BACKOFF_MAX_SEC = float(os.getenv("GEMINI_BACKOFF_MAX_SEC", "8"))
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller's turn at the limiter would come after its deadline."""
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for Vertex AI quota rejections (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    text = str(error)
+    return "429" in text or "ResourceExhausted" in text or "RESOURCE_EXHAUSTED" in text or "Quota" in text
+
+
+def backoff_delay(attempt: int, base: float = GEMINI_BACKOFF_BASE_SEC, cap: float = GEMINI_BACKOFF_MAX_SEC) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^(attempt-1))]."""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide token bucket in front of Gemini calls.
+
+    Each caller reserves the next token under a lock and sleeps until it is due, so
+    callers are served in arrival order across every event loop and thread. The rate
+    backs off multiplicatively on 429s and recovers additively on successful calls.
+    """
+
+    def __init__(
+        self,
+        rate: float = GEMINI_RATE_LIMIT_QPS,
+        burst: float = GEMINI_RATE_LIMIT_BURST,
+        min_rate: float = GEMINI_RATE_LIMIT_MIN_QPS,
+        max_rate: float = GEMINI_RATE_LIMIT_MAX_QPS,
+        increase_step: float = 0.1,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 2.0,
+    ):
+        self.min_rate = max(0.01, min_rate)
+        self.max_rate = max(self.min_rate, max_rate)
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        self.burst = max(1.0, burst)
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        # In-flight calls that all hit the same quota wall should only cut the rate once
+        self.decrease_cooldown = decrease_cooldown
+        self.queue_depth = 0
+        self.stats = {"acquired": 0, "waited": 0, "rejected": 0, "throttled": 0, "wait_seconds": 0.0}
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, deadline: Optional[float] = None) -> float:
+        """
+        Waits for a token and returns the time spent waiting.
+        `deadline` is a time.monotonic() value; raises RateLimitTimeout instead of
+        queueing when the reserved slot would land after it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                self.stats["rejected"] += 1
+                raise RateLimitTimeout(f"Rate limiter slot is {wait:.1f}s away, past the request deadline")
+            self._tokens -= 1
+            self.stats["acquired"] += 1
+            if wait > 0:
+                self.queue_depth += 1
+                self.stats["waited"] += 1
+
+        if wait <= 0:
+            return 0.0
+        try:
+            await asyncio.sleep(wait)
+        except BaseException:
+            # Hand the reserved token back so the callers behind us move up
+            with self._lock:
+                self._tokens += 1
+            raise
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+                self.stats["wait_seconds"] += wait
+        return wait
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Drop any saved-up burst so the next callers start at the reduced rate
+            self._tokens = min(self._tokens, 0.0)
+            self.stats["throttled"] += 1
+        logger.warning(f"Vertex AI throttled us; limiter rate lowered to {self.rate:.2f} req/s")
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"rate": round(self.rate, 3), "burst": self.burst, "queue_depth": self.queue_depth, **self.stats}
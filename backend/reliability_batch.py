@@ -0,0 +1,333 @@
+"""
+Batch form of logic.calculate_reliability for re-scoring many stored analyses at once.
+
+A shard of responses is flattened into arrays: one entry per (segment, cited chunk) pair
+with its confidence and its chunk's authority, the sparse form of a segment x chunk matrix.
+Chunk scores, each segment's strongest link, base grounding, bonuses and final scores are
+then computed for the whole shard with NumPy. Shards run on a process pool.
+
+Results are identical to calculate_reliability, float for float: the segment max keeps the
+first chunk reaching it, and segment scores are summed left to right per response (a
+row-wise cumulative sum, not NumPy's pairwise sum). Without NumPy the same arrays are
+reduced in plain Python.
+"""
+import array
+import importlib.util
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import logic
+
+# NumPy is imported when a shard is scored, never at startup; without it shards are reduced in Python
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+logger = logging.getLogger(__name__)
+
+RELIABILITY_BATCH_WORKERS = int(os.getenv("RELIABILITY_BATCH_WORKERS", str(os.cpu_count() or 1)))
+# Responses per task: large enough to amortize process hand-off, small enough to keep the padded segment matrix modest
+RELIABILITY_BATCH_SHARD_SIZE = int(os.getenv("RELIABILITY_BATCH_SHARD_SIZE", "2000"))
+
+# The scalar part of a calculate_reliability result, all a re-scoring run usually needs
+SUMMARY_FIELDS = ("reliability_score", "ai_confidence", "base_grounding", "consistency_bonus", "multimodal_bonus", "verdict_label")
+
+# Tier tables -> index, per process, so a pool worker compiles each table once
+_TIER_TABLE_INDEXES: Dict[str, Any] = {}
+
+
+def resolve_authority(authority: Any = None):
+    """
+    None: the live authority index (logic.get_authority_index). A tier table dict, as read by
+    authority_index.load_tier_table: an index compiled from it over the verified registry.
+    Anything else is used as is and must provide lookup(domain) -> AuthorityMatch.
+    """
+    if authority is None:
+        return logic.get_authority_index()
+    if isinstance(authority, Mapping):
+        key = json.dumps(authority, sort_keys=True)
+        index = _TIER_TABLE_INDEXES.get(key)
+        if index is None:
+            from authority_index import build_authority_index
+            index = build_authority_index(logic.get_verified_registry(), dict(authority))
+            _TIER_TABLE_INDEXES[key] = index
+        return index
+    return authority
+
+
+class _Shard:
+    """A shard of responses flattened into parallel columns, ready to become arrays."""
+
+    def __init__(self, responses: Sequence[Mapping[str, Any]], index: Any, detail: bool):
+        self.detail = detail
+        self.segment_counts: List[int] = []
+        self.domain_counts: List[int] = []
+        # Numeric columns are typed buffers NumPy wraps without copying.
+        # Per chunk of every response, in order:
+        self.chunk_auth = array.array("d")
+        self.chunk_domains: List[str] = []
+        # Per segment:
+        self.segment_response = array.array("q")
+        self.segment_position = array.array("q")
+        # Per (segment, cited chunk) entry:
+        self.entry_segment = array.array("q")
+        self.entry_chunk = array.array("q")
+        self.entry_conf = array.array("d")
+        # Only kept for detailed results; raw_conf keeps confidences as given (1 stays an int)
+        self.raw_conf: List[Any] = []
+        self.matches: List[Any] = []
+        self.sources: List[tuple] = []
+        self.segment_text: List[str] = []
+        self.entry_citation: List[tuple] = []
+        self.context: List[Optional[tuple]] = []
+        for response_idx, response in enumerate(responses):
+            self._add(response_idx, response, index)
+
+    def _add(self, response_idx: int, response: Mapping[str, Any], index: Any):
+        supports = response.get("grounding_supports") or []
+        if not supports:
+            self.segment_counts.append(0)
+            self.domain_counts.append(0)
+            self.context.append(None)
+            return
+        detail = self.detail
+        chunks = response.get("grounding_chunks") or []
+        chunk_count = len(chunks)
+        chunk_offset = len(self.chunk_auth)
+        sources = [logic.chunk_source(chunk) for chunk in chunks]
+        for domain, _, _ in sources:
+            match = index.lookup(domain)
+            self.chunk_auth.append(match.score)
+            self.chunk_domains.append(domain)
+            if detail:
+                self.matches.append(match)
+        if detail:
+            self.sources.extend(sources)
+            uri_to_source_index, snippet_map = logic.citation_lookup(response.get("grounding_citations") or [])
+        used_domains = set()
+        used_chunk_indices = set()
+        # This loop is most of a batch's cost; bind the appends once
+        entry_segment, entry_chunk, entry_conf = self.entry_segment.append, self.entry_chunk.append, self.entry_conf.append
+        segment_idx = len(self.segment_response)
+        for position, support in enumerate(supports):
+            self.segment_response.append(response_idx)
+            self.segment_position.append(position)
+            indices = support_field(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
+            conf_scores = support_field(support, 'confidence_scores', 'confidenceScores') or []
+            conf_count = len(conf_scores)
+            if detail:
+                segment = logic.get_field(support, 'segment') or {}
+                self.segment_text.append(logic.get_field(segment, 'text') or 'Unknown segment text')
+            for i, chunk_idx in enumerate(indices):
+                if chunk_idx < 0 or chunk_idx >= chunk_count:
+                    continue
+                raw_domain, raw_uri, raw_title = sources[chunk_idx]
+                if raw_domain and raw_domain != "unknown":
+                    used_domains.add(raw_domain)
+                entry_segment(segment_idx)
+                entry_chunk(chunk_offset + chunk_idx)
+                conf = conf_scores[i] if i < conf_count else (1.0 if raw_uri.startswith("file://") else 0.0)
+                entry_conf(conf)
+                if detail:
+                    self.raw_conf.append(conf)
+                    used_chunk_indices.add(chunk_idx)
+                    self.entry_citation.append((chunk_idx, uri_to_source_index.get(raw_uri, -1), snippet_map.get(raw_uri, raw_title)))
+            segment_idx += 1
+        self.segment_counts.append(len(supports))
+        self.domain_counts.append(len(used_domains))
+        self.context.append((chunks, used_chunk_indices, used_domains) if detail else None)
+
+    def reweigh(self, index: Any):
+        """Re-reads every chunk's authority from another index; nothing else in a shard depends on it."""
+        lookup = index.lookup
+        self.chunk_auth = array.array("d", [lookup(domain).score for domain in self.chunk_domains])
+
+
+def support_field(obj: Any, snake: str, camel: str) -> Any:
+    """logic.get_field for the two spellings of a support field, with a fast path for dicts."""
+    if type(obj) is dict:
+        return obj[snake] if snake in obj else obj.get(camel)
+    return logic.get_field(obj, snake, camel)
+
+
+def _reduce_numpy(shard: _Shard, multimodal: List[bool]) -> Dict[str, List[Any]]:
+    import numpy as np
+
+    entry_segment = np.frombuffer(shard.entry_segment, dtype=np.int64)
+    scores = np.frombuffer(shard.entry_conf, dtype=np.float64) * np.frombuffer(shard.chunk_auth, dtype=np.float64)[
+        np.frombuffer(shard.entry_chunk, dtype=np.int64)]
+
+    # Entries are grouped by segment in order, so each segment is one contiguous run
+    best = np.zeros(len(shard.segment_response), dtype=np.float64)
+    best_entry = np.full(len(best), -1, dtype=np.int64)
+    if len(scores):
+        starts = np.flatnonzero(np.r_[True, entry_segment[1:] != entry_segment[:-1]])
+        # Strongest link per segment: starts at 0.0 like the scalar loop; fmax skips NaN as `>` does
+        best[entry_segment[starts]] = np.fmax(np.fmax.reduceat(scores, starts), 0.0)
+        # The scalar loop keeps the first chunk that reaches the max, and only a strictly positive one
+        winners = np.flatnonzero((scores > 0.0) & (scores == best[entry_segment]))
+        if len(winners):
+            won = entry_segment[winners]
+            first = np.r_[True, won[1:] != won[:-1]]
+            best_entry[won[first]] = winners[first]
+
+    # Left-to-right sum per response: segments laid out on padded rows, then a running sum
+    segment_counts = np.asarray(shard.segment_counts, dtype=np.int64)
+    rows = np.zeros((len(segment_counts), max(1, int(segment_counts.max(initial=0)))), dtype=np.float64)
+    rows[np.frombuffer(shard.segment_response, dtype=np.int64), np.frombuffer(shard.segment_position, dtype=np.int64)] = best
+    totals = np.cumsum(rows, axis=1)[:, -1]
+    base = np.divide(totals, segment_counts, out=np.zeros_like(totals), where=segment_counts > 0)
+
+    consistency = np.where(np.asarray(shard.domain_counts) > 1, 0.05, 0.0)
+    multimodal_bonus = np.where(np.asarray(multimodal, dtype=bool), 0.05, 0.0)
+    final = np.minimum(1.0, base + consistency + multimodal_bonus)
+    reduced = {"base": base.tolist(), "consistency": consistency.tolist(), "multimodal": multimodal_bonus.tolist(), "final": final.tolist()}
+    if shard.detail:
+        reduced.update(scores=scores.tolist(), best=best.tolist(), best_entry=best_entry.tolist())
+    return reduced
+
+
+def _reduce_python(shard: _Shard, multimodal: List[bool]) -> Dict[str, List[Any]]:
+    scores = [conf * shard.chunk_auth[chunk] for conf, chunk in zip(shard.entry_conf, shard.entry_chunk)]
+    best = [0.0] * len(shard.segment_response)
+    best_entry = [-1] * len(best)
+    for entry, (segment, score) in enumerate(zip(shard.entry_segment, scores)):
+        if score > best[segment]:
+            best[segment] = score
+            best_entry[segment] = entry
+    totals = [0] * len(shard.segment_counts)
+    for segment, response in enumerate(shard.segment_response):
+        totals[response] += best[segment]
+    base = [total / count if count else 0.0 for total, count in zip(totals, shard.segment_counts)]
+    consistency = [0.05 if count > 1 else 0.0 for count in shard.domain_counts]
+    multimodal_bonus = [0.05 if flag else 0.0 for flag in multimodal]
+    final = [min(1.0, b + c + m) for b, c, m in zip(base, consistency, multimodal_bonus)]
+    return {"scores": scores, "best": best, "best_entry": best_entry, "base": base,
+            "consistency": consistency, "multimodal": multimodal_bonus, "final": final}
+
+
+def _segments(shard: _Shard, reduced: Dict[str, List[Any]], first_segment: int, count: int, first_entry: int) -> tuple:
+    """Segment audits of one response, exactly as calculate_reliability builds them."""
+    scores, best, best_entry = reduced["scores"], reduced["best"], reduced["best_entry"]
+    audits = []
+    entry = first_entry
+    for segment in range(first_segment, first_segment + count):
+        evaluated_sources = []
+        while entry < len(shard.entry_segment) and shard.entry_segment[entry] == segment:
+            chunk = shard.entry_chunk[entry]
+            chunk_idx, source_index, quote_text = shard.entry_citation[entry]
+            match = shard.matches[chunk]
+            evaluated_sources.append({
+                "id": chunk_idx + 1,
+                "chunk_index": chunk_idx,
+                "source_index": source_index,
+                "domain": shard.sources[chunk][0],
+                "score": scores[entry],
+                "quote_text": quote_text,
+                "confidence": shard.raw_conf[entry],
+                "authority": match.score,
+                "is_verified": match.verified
+            })
+            entry += 1
+        evaluated_sources.sort(key=lambda x: x['score'], reverse=True)
+        winner = best_entry[segment]
+        audits.append({
+            "text": shard.segment_text[segment],
+            "top_source_domain": shard.sources[shard.entry_chunk[winner]][0] if winner >= 0 else "unknown",
+            "top_source_score": best[segment],
+            "sources": evaluated_sources
+        })
+    return audits, entry
+
+
+def _score_shard(responses: Sequence[Mapping[str, Any]], detail: bool, authority: Any = None,
+                 use_numpy: bool = NUMPY_AVAILABLE) -> List[Dict[str, Any]]:
+    shard = _Shard(responses, resolve_authority(authority), detail)
+    multimodal = [bool(response.get("is_multimodal_verified", False)) for response in responses]
+    reduced = (_reduce_numpy if use_numpy else _reduce_python)(shard, multimodal)
+    return _results(responses, shard, reduced)
+
+
+def _results(responses: Sequence[Mapping[str, Any]], shard: _Shard, reduced: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    detail = shard.detail
+    results = []
+    segment = entry = 0
+    for response_idx, response in enumerate(responses):
+        ai_confidence = response.get("ai_confidence", 0.0)
+        count = shard.segment_counts[response_idx]
+        if not count:
+            empty = logic.empty_reliability(ai_confidence)
+            results.append(empty if detail else {field: empty[field] for field in SUMMARY_FIELDS})
+            continue
+        base, consistency_bonus, multimodal_bonus, final_score = (
+            reduced["base"][response_idx], reduced["consistency"][response_idx],
+            reduced["multimodal"][response_idx], reduced["final"][response_idx])
+        result = {
+            "reliability_score": final_score,
+            "ai_confidence": ai_confidence,
+            "base_grounding": base,
+            "consistency_bonus": consistency_bonus,
+            "multimodal_bonus": multimodal_bonus,
+            "verdict_label": logic.verdict_label_for(final_score),
+        }
+        if detail:
+            chunks, used_chunk_indices, used_domains = shard.context[response_idx]
+            result["explanation"] = logic.reliability_explanation(
+                base, count, shard.domain_counts[response_idx], consistency_bonus, multimodal_bonus)
+            result["segments"], entry = _segments(shard, reduced, segment, count, entry)
+            result["unused_sources"] = logic.collect_unused_sources(chunks, used_chunk_indices, used_domains)
+        segment += count
+        results.append(result)
+    return results
+
+
+def calculate_reliability_batch(responses: Sequence[Mapping[str, Any]], detail: bool = True, authority: Any = None,
+                                workers: int = RELIABILITY_BATCH_WORKERS,
+                                shard_size: int = RELIABILITY_BATCH_SHARD_SIZE) -> List[Dict[str, Any]]:
+    """
+    Scores many responses; each is a mapping of calculate_reliability's arguments
+    (grounding_supports, grounding_chunks, grounding_citations, is_multimodal_verified,
+    ai_confidence). Returns one result per response, in order, equal to what
+    calculate_reliability returns for it, without the audit printing.
+
+    detail=False returns only SUMMARY_FIELDS and skips building per-source audits, which is
+    most of the remaining per-item cost. `authority` is passed to resolve_authority; to score
+    on a process pool it must be None or a tier table.
+    """
+    if not responses:
+        return []
+    shard_size = max(1, shard_size)
+    shards = [responses[start:start + shard_size] for start in range(0, len(responses), shard_size)]
+    if workers <= 1 or len(shards) == 1:
+        return [result for shard in shards for result in _score_shard(shard, detail, authority)]
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        for shard_results in executor.map(_score_shard, shards, [detail] * len(shards), [authority] * len(shards)):
+            results.extend(shard_results)
+    return results
+
+
+def calculate_reliability_strategies(responses: Sequence[Mapping[str, Any]], authorities: Mapping[str, Any],
+                                     use_numpy: bool = NUMPY_AVAILABLE) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Summary results (SUMMARY_FIELDS) of the same responses under several authorities, as
+    {name: results}; each authority is anything resolve_authority accepts. The responses are
+    flattened once and only the chunk authorities are re-read per authority, so comparing
+    strategies costs little more than scoring once. Runs in the calling process; callers
+    shard the input and parallelize.
+    """
+    if not responses or not authorities:
+        return {name: [] for name in authorities}
+    multimodal = [bool(response.get("is_multimodal_verified", False)) for response in responses]
+    reduce = _reduce_numpy if use_numpy else _reduce_python
+    shard = None
+    results = {}
+    for name, authority in authorities.items():
+        index = resolve_authority(authority)
+        if shard is None:
+            shard = _Shard(responses, index, detail=False)
+        else:
+            shard.reweigh(index)
+        results[name] = _results(responses, shard, reduce(shard, multimodal))
+    return results
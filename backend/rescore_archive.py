@@ -0,0 +1,481 @@
+"""
+Offline re-scoring of stored analyses under alternative authority strategies.
+
+Replays the grounding supports, chunks and citations of an archive through the reliability
+engine once per strategy in a single pass, and reports how each strategy shifts
+reliability_score and verdict_label relative to the baseline (the live tier table unless
+--baseline says otherwise).
+
+Archives can be:
+    *.jsonl / *.ndjson   one stored record per line
+    *.json               one record or a list of them (forensic grounding_metadata.json captures)
+    *.db / *.sqlite      the analysis cache (analysis_cache table)
+    directories          searched recursively for the above
+
+A record is either an AnalysisResponse payload (chunks are rebuilt from its reliability
+audits and citations), a job record wrapping one under "result", or raw grounding metadata
+with grounding_chunks. Anything else is counted as skipped.
+
+A strategy is NAME=SPEC, where SPEC is a tier table JSON file in the format of
+AUTHORITY_TIERS_PATH ({"default_score": 0.7, "tiers": [...]}), "current" for the live table,
+or module:attribute naming a tier table dict, an object with lookup(domain) -> AuthorityMatch,
+or a callable returning either.
+
+Files are split into byte ranges and cache databases into rowid ranges; each worker process
+reads and scores its own shards, and only the per-strategy tallies travel back.
+
+Usage:
+    python rescore_archive.py analysis_cache.db captures/ --strategy strict=strict_tiers.json \\
+        --strategy flat=flat_tiers.json [--baseline current] [--workers N] [--json report.json]
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from authority_index import DEFAULT_AUTHORITY_SCORE
+from reliability_batch import calculate_reliability_strategies, support_field
+
+logger = logging.getLogger(__name__)
+
+BASELINE = "baseline"
+CACHE_TABLE = "analysis_cache"
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+JSON_SUFFIXES = (".json",)
+DB_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+SHARD_BYTES = 32 * 1024 * 1024
+SHARD_ROWS = 20000
+BATCH_SIZE = 2000
+# Shift and score tallies are kept at this resolution, which bounds percentile error
+RESOLUTION = 3
+SHIFT_BINS = (-0.2, -0.1, -0.05, -0.01, 0.01, 0.05, 0.1, 0.2)
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class Shard(NamedTuple):
+    kind: str  # "jsonl", "json" or "db"
+    path: str
+    start: int
+    end: int
+
+
+def plan_shards(paths: Sequence[str], shard_bytes: int = SHARD_BYTES, shard_rows: int = SHARD_ROWS) -> List[Shard]:
+    shards = []
+    for path in _archive_files(paths):
+        lower = path.lower()
+        if lower.endswith(JSONL_SUFFIXES):
+            size = os.path.getsize(path)
+            shards.extend(Shard("jsonl", path, start, min(start + shard_bytes, size)) for start in range(0, size, max(1, shard_bytes)))
+        elif lower.endswith(DB_SUFFIXES):
+            with sqlite3.connect(_readonly_uri(path), uri=True) as conn:
+                try:
+                    low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {CACHE_TABLE}").fetchone()
+                except sqlite3.DatabaseError as e:
+                    logger.warning(f"Skipping {path}: {e}")
+                    continue
+            if low is not None:
+                shards.extend(Shard("db", path, start, min(start + shard_rows - 1, high)) for start in range(low, high + 1, max(1, shard_rows)))
+        else:
+            shards.append(Shard("json", path, 0, os.path.getsize(path)))
+    return shards
+
+
+def _archive_files(paths: Sequence[str]) -> Iterator[str]:
+    suffixes = JSONL_SUFFIXES + JSON_SUFFIXES + DB_SUFFIXES
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if name.lower().endswith(suffixes):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _readonly_uri(path: str) -> str:
+    return pathlib.Path(path).absolute().as_uri() + "?mode=ro"
+
+
+def read_shard(shard: Shard) -> Iterator[Any]:
+    """Records of one shard; a line or row that is not valid JSON yields None."""
+    if shard.kind == "jsonl":
+        with open(shard.path, "rb") as f:
+            # A line belongs to the shard it starts in: skip the one straddling `start`
+            if shard.start:
+                f.seek(shard.start - 1)
+                f.readline()
+            position = f.tell()
+            while position < shard.end:
+                line = f.readline()
+                if not line:
+                    return
+                position += len(line)
+                if line.strip():
+                    yield _loads(line)
+    elif shard.kind == "db":
+        with sqlite3.connect(_readonly_uri(shard.path), uri=True) as conn:
+            rows = conn.execute(f"SELECT payload FROM {CACHE_TABLE} WHERE rowid BETWEEN ? AND ?", (shard.start, shard.end))
+            for (payload,) in rows:
+                yield _loads(payload)
+    else:
+        with open(shard.path, "rb") as f:
+            document = _loads(f.read())
+        yield from document if isinstance(document, list) else [document]
+
+
+def _loads(raw: Any) -> Any:
+    try:
+        return json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def replay_input(record: Any) -> Optional[Dict[str, Any]]:
+    """
+    calculate_reliability arguments recovered from a stored record, plus the score it was
+    stored with under "stored_score" (None for raw metadata), or None if it cannot be replayed.
+    """
+    if not isinstance(record, dict):
+        return None
+    if isinstance(record.get("result"), dict):
+        record = record["result"]
+    if isinstance(record.get("grounding_chunks"), list):
+        return {
+            "grounding_supports": record.get("grounding_supports") or [],
+            "grounding_chunks": [_flat_chunk(chunk) for chunk in record["grounding_chunks"]],
+            "grounding_citations": record.get("grounding_citations") or [],
+            "is_multimodal_verified": bool(record.get("is_multimodal_verified", record.get("multimodal_cross_check", False))),
+            "ai_confidence": record.get("ai_confidence", record.get("confidence_score", 0.0)),
+            "stored_score": None,
+        }
+    metrics = record.get("reliability_metrics")
+    if not isinstance(metrics, dict):
+        return None
+    supports = record.get("grounding_supports") or []
+    citations = record.get("grounding_citations") or []
+    audits = metrics.get("segments") or []
+    # Stored payloads drop the raw chunks, but every cited chunk left an audit entry with its
+    # domain and citation index, and uncited chunks never affect the score
+    chunks: List[Dict[str, Any]] = []
+    for audit in audits:
+        for source in audit.get("sources") or []:
+            chunk_idx = source.get("chunk_index", -1)
+            if not isinstance(chunk_idx, int) or chunk_idx < 0:
+                continue
+            if chunk_idx >= len(chunks):
+                chunks.extend({} for _ in range(chunk_idx + 1 - len(chunks)))
+            if chunks[chunk_idx]:
+                continue
+            source_index = source.get("source_index", -1)
+            citation = citations[source_index] if isinstance(source_index, int) and 0 <= source_index < len(citations) else None
+            uri = (citation.get("url") or "") if isinstance(citation, dict) else ""
+            domain = source.get("domain", "")
+            chunks[chunk_idx] = {"domain": domain, "title": domain, "uri": uri}
+    # A missing confidence defaults to 1.0 only for file:// chunks; restore that where the
+    # audit shows the default was applied but the chunk's URI was not among the citations
+    for support, audit in zip(supports, audits):
+        indices = support_field(support, 'grounding_chunk_indices', 'groundingChunkIndices') or []
+        confidences = support_field(support, 'confidence_scores', 'confidenceScores') or []
+        if len(confidences) >= len(indices):
+            continue
+        unscored = {chunk_idx for chunk_idx in indices[len(confidences):] if isinstance(chunk_idx, int) and 0 <= chunk_idx < len(chunks)}
+        if not unscored:
+            continue
+        # The audit's confidences for a chunk, minus those the support gave, are the defaults applied
+        applied = Counter((source.get("chunk_index"), source.get("confidence")) for source in audit.get("sources") or [])
+        applied.subtract((chunk_idx, conf) for chunk_idx, conf in zip(indices, confidences))
+        for chunk_idx in unscored:
+            if applied[(chunk_idx, 1.0)] > 0 and not chunks[chunk_idx]["uri"].startswith("file://"):
+                chunks[chunk_idx]["uri"] = "file://" + chunks[chunk_idx]["domain"]
+    return {
+        "grounding_supports": supports,
+        "grounding_chunks": chunks,
+        "grounding_citations": citations,
+        "is_multimodal_verified": (metrics.get("multimodal_bonus") or 0.0) > 0,
+        "ai_confidence": metrics.get("ai_confidence", record.get("confidence_score", 0.0)),
+        "stored_score": metrics.get("reliability_score"),
+    }
+
+
+def _flat_chunk(chunk: Any) -> Any:
+    """A dumped GroundingChunk ({"web": {...}}) in the flat dict form logic.chunk_source reads."""
+    if isinstance(chunk, dict) and isinstance(chunk.get("web"), dict):
+        web = chunk["web"]
+        return {"domain": web.get("domain", ""), "uri": web.get("uri") or "", "title": web.get("title", "No snippet available.")}
+    return chunk
+
+
+def resolve_strategy(spec: str) -> Any:
+    """A strategy spec as something reliability_batch.resolve_authority accepts."""
+    if spec == "current":
+        return None
+    if spec.lower().endswith(".json"):
+        with open(spec, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        if not isinstance(table, dict) or not isinstance(table.get("tiers"), list):
+            raise ValueError(f"{spec}: expected {{\"default_score\": ..., \"tiers\": [...]}}")
+        return {"default_score": table.get("default_score", DEFAULT_AUTHORITY_SCORE), "tiers": table["tiers"]}
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"{spec}: expected \"current\", a .json tier table or module:attribute")
+    target = getattr(importlib.import_module(module_name), attribute)
+    if callable(target) and not hasattr(target, "lookup"):
+        target = target()
+    if not isinstance(target, Mapping) and not hasattr(target, "lookup"):
+        raise ValueError(f"{spec}: not a tier table or an object with lookup()")
+    return target
+
+
+# Strategy specs -> resolved authorities, per worker process
+_RESOLVED: Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]] = {}
+
+
+def _authorities(strategies: Mapping[str, str]) -> Dict[str, Any]:
+    key = tuple(strategies.items())
+    if key not in _RESOLVED:
+        _RESOLVED[key] = {name: resolve_strategy(spec) for name, spec in strategies.items()}
+    return _RESOLVED[key]
+
+
+class StrategyStats:
+    """Mergeable tallies of one strategy's results against the baseline."""
+
+    def __init__(self):
+        self.records = 0
+        self.score_total = 0.0
+        self.shift_total = 0.0
+        self.raised = 0
+        self.lowered = 0
+        self.scores: Counter = Counter()
+        self.shifts: Counter = Counter()
+        self.labels: Counter = Counter()
+        self.transitions: Counter = Counter()
+
+    def add(self, result: Dict[str, Any], baseline: Dict[str, Any]):
+        score = result["reliability_score"]
+        shift = score - baseline["reliability_score"]
+        self.records += 1
+        self.score_total += score
+        self.shift_total += shift
+        if shift > 0:
+            self.raised += 1
+        elif shift < 0:
+            self.lowered += 1
+        self.scores[round(score, RESOLUTION)] += 1
+        self.shifts[round(shift, RESOLUTION)] += 1
+        self.labels[result["verdict_label"]] += 1
+        self.transitions[(baseline["verdict_label"], result["verdict_label"])] += 1
+
+    def merge(self, other: "StrategyStats"):
+        self.records += other.records
+        self.score_total += other.score_total
+        self.shift_total += other.shift_total
+        self.raised += other.raised
+        self.lowered += other.lowered
+        self.scores.update(other.scores)
+        self.shifts.update(other.shifts)
+        self.labels.update(other.labels)
+        self.transitions.update(other.transitions)
+
+    def summary(self) -> Dict[str, Any]:
+        records = max(self.records, 1)
+        edges = (float("-inf"),) + SHIFT_BINS + (float("inf"),)
+        histogram = Counter()
+        for shift, count in self.shifts.items():
+            for low, high in zip(edges, edges[1:]):
+                if low <= shift < high:
+                    histogram[_bin_label(low, high)] += count
+                    break
+        return {
+            "records": self.records,
+            "mean_score": self.score_total / records,
+            "mean_shift": self.shift_total / records,
+            "raised": self.raised,
+            "lowered": self.lowered,
+            "unchanged": self.records - self.raised - self.lowered,
+            "score_percentiles": _percentiles(self.scores),
+            "shift_percentiles": _percentiles(self.shifts),
+            "shift_histogram": {_bin_label(low, high): histogram[_bin_label(low, high)] for low, high in zip(edges, edges[1:])},
+            "verdict_labels": dict(self.labels.most_common()),
+            "verdict_changed": sum(count for (before, after), count in self.transitions.items() if before != after),
+            "verdict_transitions": {f"{before} -> {after}": count for (before, after), count in self.transitions.most_common() if before != after},
+        }
+
+
+def _bin_label(low: float, high: float) -> str:
+    if low == float("-inf"):
+        return f"< {high:+.2f}"
+    if high == float("inf"):
+        return f">= {low:+.2f}"
+    return f"[{low:+.2f}, {high:+.2f})"
+
+
+def _percentiles(counter: Counter) -> Dict[str, float]:
+    total = sum(counter.values())
+    if not total:
+        return {}
+    values = sorted(counter.items())
+    result = {}
+    seen = 0
+    position = 0
+    for p in PERCENTILES:
+        rank = max(1, -(-p * total // 100))
+        while seen + values[position][1] < rank:
+            seen += values[position][1]
+            position += 1
+        result[f"p{p}"] = values[position][0]
+    return result
+
+
+class ArchiveReport:
+    """Per-strategy tallies plus replay bookkeeping for a shard or a whole run."""
+
+    def __init__(self, names: Sequence[str]):
+        self.read = 0
+        self.skipped = 0
+        self.stored_compared = 0
+        self.stored_matched = 0
+        self.stats = {name: StrategyStats() for name in names}
+
+    def add_batch(self, batch: List[Dict[str, Any]], results: Dict[str, List[Dict[str, Any]]]):
+        baseline = results[BASELINE]
+        for name, strategy_results in results.items():
+            stats = self.stats[name]
+            for result, base in zip(strategy_results, baseline):
+                stats.add(result, base)
+        # Replay fidelity: the baseline should reproduce stored scores while the tier table is unchanged
+        for inputs, base in zip(batch, baseline):
+            stored = inputs.get("stored_score")
+            if isinstance(stored, (int, float)):
+                self.stored_compared += 1
+                self.stored_matched += abs(stored - base["reliability_score"]) <= 1e-9
+
+    def merge(self, other: "ArchiveReport"):
+        self.read += other.read
+        self.skipped += other.skipped
+        self.stored_compared += other.stored_compared
+        self.stored_matched += other.stored_matched
+        for name, stats in other.stats.items():
+            self.stats[name].merge(stats)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "records_read": self.read,
+            "records_skipped": self.skipped,
+            "stored_scores_compared": self.stored_compared,
+            "stored_scores_reproduced": self.stored_matched,
+            "strategies": {name: stats.summary() for name, stats in self.stats.items()},
+        }
+
+
+def rescore_shard(shard: Shard, strategies: Mapping[str, str], batch_size: int = BATCH_SIZE) -> ArchiveReport:
+    """Scores one shard under every strategy; `strategies` maps names to specs and includes BASELINE."""
+    authorities = _authorities(strategies)
+    report = ArchiveReport(list(strategies))
+    batch: List[Dict[str, Any]] = []
+    for record in read_shard(shard):
+        report.read += 1
+        inputs = replay_input(record)
+        if inputs is None:
+            report.skipped += 1
+            continue
+        batch.append(inputs)
+        if len(batch) >= batch_size:
+            report.add_batch(batch, calculate_reliability_strategies(batch, authorities))
+            batch = []
+    if batch:
+        report.add_batch(batch, calculate_reliability_strategies(batch, authorities))
+    return report
+
+
+def rescore(paths: Sequence[str], strategies: Mapping[str, str], workers: int = 0, batch_size: int = BATCH_SIZE,
+            shard_bytes: int = SHARD_BYTES, shard_rows: int = SHARD_ROWS, progress: bool = False) -> ArchiveReport:
+    """Re-scores every record under every strategy; `strategies` must include BASELINE."""
+    for spec in strategies.values():
+        resolve_strategy(spec)  # fail on a bad spec before any worker starts
+    shards = plan_shards(paths, shard_bytes, shard_rows)
+    report = ArchiveReport(list(strategies))
+    started = time.perf_counter()
+
+    def collect(shard_report: ArchiveReport, done: int):
+        report.merge(shard_report)
+        if progress:
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(f"  shard {done}/{len(shards)}: {report.read:,} records, {report.read / elapsed:,.0f}/s", file=sys.stderr)
+
+    if workers <= 1 or len(shards) <= 1:
+        for done, shard in enumerate(shards, 1):
+            collect(rescore_shard(shard, strategies, batch_size), done)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            for done, shard_report in enumerate(executor.map(
+                    rescore_shard, shards, [dict(strategies)] * len(shards), [batch_size] * len(shards)), 1):
+                collect(shard_report, done)
+    return report
+
+
+def print_report(summary: Dict[str, Any], seconds: float):
+    read = summary["records_read"]
+    print(f"\n{read:,} records in {seconds:.1f}s ({read / max(seconds, 1e-9):,.0f}/s), {summary['records_skipped']:,} not replayable")
+    if summary["stored_scores_compared"]:
+        print(f"Baseline reproduces {summary['stored_scores_reproduced']:,} of {summary['stored_scores_compared']:,} stored scores")
+    for name, stats in summary["strategies"].items():
+        print(f"\n== {name} ==")
+        print(f"  mean score {stats['mean_score']:.4f}, mean shift {stats['mean_shift']:+.4f} | "
+              f"raised {stats['raised']:,}, lowered {stats['lowered']:,}, unchanged {stats['unchanged']:,}")
+        if name == BASELINE:
+            print("  score " + "  ".join(f"{p} {v:.3f}" for p, v in stats["score_percentiles"].items()))
+            continue
+        print("  shift " + "  ".join(f"{p} {v:+.3f}" for p, v in stats["shift_percentiles"].items()))
+        records = max(stats["records"], 1)
+        for label, count in stats["shift_histogram"].items():
+            print(f"    {label:>16} {count:>10,} {100 * count / records:6.2f}% {'#' * round(40 * count / records)}")
+        print(f"  verdict changed for {stats['verdict_changed']:,} records")
+        for transition, count in list(stats["verdict_transitions"].items())[:10]:
+            print(f"    {transition}: {count:,}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    arg_parser.add_argument("archives", nargs="+", help=".jsonl/.json files, analysis cache databases or directories")
+    arg_parser.add_argument("--strategy", action="append", default=[], metavar="NAME=SPEC", help="tier table .json, 'current' or module:attribute")
+    arg_parser.add_argument("--baseline", default="current", metavar="SPEC", help="strategy the others are compared against (default: live tier table)")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    arg_parser.add_argument("--shard-mb", type=float, default=SHARD_BYTES / 1024 / 1024)
+    arg_parser.add_argument("--shard-rows", type=int, default=SHARD_ROWS)
+    arg_parser.add_argument("--json", dest="json_path", help="also write the full report here")
+    args = arg_parser.parse_args()
+
+    strategies = {BASELINE: args.baseline}
+    for item in args.strategy:
+        name, sep, spec = item.partition("=")
+        if not sep or not name or not spec:
+            arg_parser.error(f"--strategy {item!r}: expected NAME=SPEC")
+        if name in strategies:
+            arg_parser.error(f"--strategy {name!r} given twice")
+        strategies[name] = spec
+    try:
+        started = time.perf_counter()
+        report = rescore(args.archives, strategies, args.workers, args.batch_size,
+                         int(args.shard_mb * 1024 * 1024), args.shard_rows, progress=True)
+    except (OSError, ValueError, ImportError, AttributeError) as e:
+        arg_parser.error(str(e))
+    summary = report.summary()
+    print_report(summary, time.perf_counter() - started)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# On Cloud Run, the filesystem is read-only except for /tmp
+_IS_CLOUD_RUN = os.environ.get('K_SERVICE') is not None
+_DEFAULT_CACHE_PATH = '/tmp/analysis_cache.db' if _IS_CLOUD_RUN else 'analysis_cache.db'
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() != "false"
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", _DEFAULT_CACHE_PATH)
+ANALYSIS_CACHE_TTL_SEC = float(os.getenv("ANALYSIS_CACHE_TTL_SEC", str(6 * 3600)))
+ANALYSIS_CACHE_MEMORY_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "256"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Disk hits only queue their last_access update; queued touches are written in one transaction
+# once this many are pending or the oldest is this old (and always before LRU eviction)
+ANALYSIS_CACHE_TOUCH_BATCH = int(os.getenv("ANALYSIS_CACHE_TOUCH_BATCH", "256"))
+ANALYSIS_CACHE_TOUCH_FLUSH_SEC = float(os.getenv("ANALYSIS_CACHE_TOUCH_FLUSH_SEC", "30"))
+
+
+def normalize_claim_text(text: Optional[str]) -> str:
+    """Lowercases and collapses whitespace so trivially different submissions share a key."""
+    return " ".join((text or "").lower().split())
+
+
+def make_cache_key(text_claim: Optional[str], file_digests: List[str], urls: List[str], model: str, system_prompt_hash: str) -> str:
+    """
+    Content-addressed key for an analysis input.
+    File digests are SHA-256 hex strings of the raw upload bytes; their order does not matter.
+    """
+    material = json.dumps({
+        "claim": normalize_claim_text(text_claim),
+        "files": sorted(file_digests),
+        "urls": [u.strip() for u in urls if u and u.strip()],
+        "model": model,
+        "prompt": system_prompt_hash,
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier cache for serialized AnalysisResponse payloads:
+    an in-memory LRU in front of a SQLite table that survives restarts.
+
+    get/set are blocking; request handlers use get_async/set_async, which answer memory hits
+    inline and run the SQLite work on a worker thread so a slow disk never stalls the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: str = ANALYSIS_CACHE_PATH,
+        ttl_sec: float = ANALYSIS_CACHE_TTL_SEC,
+        max_memory_entries: int = ANALYSIS_CACHE_MEMORY_ENTRIES,
+        max_disk_bytes: int = ANALYSIS_CACHE_MAX_BYTES,
+        touch_batch: int = ANALYSIS_CACHE_TOUCH_BATCH,
+        touch_flush_sec: float = ANALYSIS_CACHE_TOUCH_FLUSH_SEC,
+    ):
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self.max_memory_entries = max(1, max_memory_entries)
+        self.max_disk_bytes = max_disk_bytes
+        self.touch_batch = max(1, touch_batch)
+        self.touch_flush_sec = touch_flush_sec
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # Memory tier and counters; never held across SQLite calls
+        self._lock = threading.Lock()
+        # The connection and everything only it touches
+        self._db_lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expired": 0}
+        self._pending_touches: Dict[str, float] = {}
+        self._touches_since = time.monotonic()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the cache table."""
+        with self._db_lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache(last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_expires ON analysis_cache(expires_at)")
+            self._conn.commit()
+            # Kept up to date on every write, so storing never scans the table
+            self._disk_bytes = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM analysis_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached payload for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        found, payload = self._memory_get(key, now)
+        return payload if found else self._disk_get(key, now)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        found, payload = self._memory_get(key, now)
+        return payload if found else await asyncio.to_thread(self._disk_get, key, now)
+
+    def _memory_get(self, key: str, now: float):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            payload, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return True, payload
+            del self._memory[key]
+            self._counters["expired"] += 1
+            return False, None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT payload, size_bytes, expires_at FROM analysis_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[2] <= now:
+                self._conn.execute("DELETE FROM analysis_cache WHERE cache_key = ?", (key,))
+                self._conn.commit()
+                self._disk_bytes -= row[1]
+                self._pending_touches.pop(key, None)
+                with self._lock:
+                    self._counters["expired"] += 1
+                row = None
+            if row is None:
+                with self._lock:
+                    self._counters["misses"] += 1
+                return None
+            self._pending_touches[key] = now
+            self._flush_touches(force=False)
+
+        raw_payload, _, expires_at = row
+        payload = json.loads(raw_payload)
+        with self._lock:
+            self._remember(key, payload, expires_at)
+            self._counters["disk_hits"] += 1
+        return payload
+
+    def _flush_touches(self, force: bool = True):
+        """Writes queued last_access updates in one transaction. Caller holds _db_lock."""
+        if not self._pending_touches:
+            self._touches_since = time.monotonic()
+            return
+        if not force and len(self._pending_touches) < self.touch_batch and time.monotonic() - self._touches_since < self.touch_flush_sec:
+            return
+        self._conn.executemany(
+            "UPDATE analysis_cache SET last_access = ? WHERE cache_key = ?",
+            [(accessed, key) for key, accessed in self._pending_touches.items()],
+        )
+        self._conn.commit()
+        self._pending_touches.clear()
+        self._touches_since = time.monotonic()
+
+    def set(self, key: str, payload: Dict[str, Any]):
+        """Stores a JSON-serializable payload in both tiers."""
+        expires_at = time.time() + self.ttl_sec
+        with self._lock:
+            self._remember(key, payload, expires_at)
+            self._counters["sets"] += 1
+        self._disk_set(key, payload, expires_at)
+
+    async def set_async(self, key: str, payload: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_sec
+        with self._lock:
+            self._remember(key, payload, expires_at)
+            self._counters["sets"] += 1
+        await asyncio.to_thread(self._disk_set, key, payload, expires_at)
+
+    def _disk_set(self, key: str, payload: Dict[str, Any], expires_at: float):
+        raw_payload = json.dumps(payload)
+        size_bytes = len(raw_payload.encode("utf-8"))
+        if size_bytes > self.max_disk_bytes:
+            return
+        now = time.time()
+        with self._db_lock:
+            replaced = self._conn.execute("SELECT size_bytes FROM analysis_cache WHERE cache_key = ?", (key,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO analysis_cache (cache_key, payload, size_bytes, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, raw_payload, size_bytes, now, expires_at, now))
+            self._pending_touches.pop(key, None)
+            self._disk_bytes += size_bytes - (replaced[0] if replaced else 0)
+            self._evict_disk(now)
+            self._conn.commit()
+
+    def _remember(self, key: str, payload: Dict[str, Any], expires_at: float):
+        """Caller holds _lock."""
+        self._memory[key] = (payload, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Drops expired rows, then least-recently-used rows until under the byte budget. Caller holds _db_lock."""
+        expired_count, expired_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM analysis_cache WHERE expires_at <= ?", (now,)
+        ).fetchone()
+        if expired_count:
+            self._conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,))
+            self._disk_bytes -= expired_bytes
+        evicted = 0
+        if self._disk_bytes > self.max_disk_bytes:
+            # LRU order needs the access times of recent hits
+            self._flush_touches()
+            for cache_key, size_bytes in self._conn.execute(
+                "SELECT cache_key, size_bytes FROM analysis_cache ORDER BY last_access ASC"
+            ).fetchall():
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                self._conn.execute("DELETE FROM analysis_cache WHERE cache_key = ?", (cache_key,))
+                self._disk_bytes -= size_bytes
+                evicted += 1
+        with self._lock:
+            self._counters["expired"] += expired_count
+            self._counters["evictions"] += evicted
+
+    def flush(self):
+        """Writes any queued access times."""
+        with self._db_lock:
+            self._flush_touches()
+
+    def close(self):
+        with self._db_lock:
+            self._flush_touches()
+            self._conn.close()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            self._pending_touches.clear()
+            self._conn.execute("DELETE FROM analysis_cache")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+            disk_bytes = self._disk_bytes
+            pending_touches = len(self._pending_touches)
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hits": hits,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "disk_bytes": disk_bytes,
+                "pending_touches": pending_touches,
+            }
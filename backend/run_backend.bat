@@ -6,4 +6,6 @@ if not exist .venv (
   .venv\Scripts\pip install --upgrade pip
   .venv\Scripts\pip install -r requirements.txt
 )
+REM Local servers do not need the Cloud Functions wrapper (skips the functions SDK import)
+set FIREBASE_FUNCTION_WRAPPER=false
 .venv\Scripts\python -m uvicorn main:app --reload --host 0.0.0.0 --port 8000
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "merged")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.merged = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the work,
+    later callers await the same task instead of repeating it.
+
+    The work runs in its own task, so one caller disconnecting does not cancel it
+    for the others; it is only cancelled once every caller has gone away.
+    """
+
+    def __init__(self):
+        # Tasks belong to the loop that created them, so flights are tracked per loop
+        self._flights = weakref.WeakKeyDictionary()
+        self.stats = {"leaders": 0, "merged": 0, "errors": 0, "cancelled": 0}
+
+    def _get_flights(self) -> Dict[str, _Flight]:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            flights = {}
+            self._flights[loop] = flights
+        return flights
+
+    def in_flight(self) -> int:
+        try:
+            return len(self._get_flights())
+        except RuntimeError:
+            return 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, int]:
+        """
+        Runs `fn` once per in-flight `key`.
+        Returns (result, merged) where `merged` is how many duplicate callers shared the result.
+        If the work raises, every waiting caller receives the same exception.
+        """
+        flights = self._get_flights()
+        flight = flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(flights, key, flight))
+            self.stats["leaders"] += 1
+        else:
+            flight.merged += 1
+            self.stats["merged"] += 1
+            logger.info(f"Coalesced duplicate analysis onto in-flight key {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result
+                if flights.get(key) is flight:
+                    del flights[key]
+                flight.task.cancel()
+                self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            flight.waiters -= 1
+            raise
+        flight.waiters -= 1
+        return result, flight.merged
+
+    def _finish(self, flights: Dict[str, _Flight], key: str, flight: _Flight):
+        if flights.get(key) is flight:
+            del flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.stats["errors"] += 1
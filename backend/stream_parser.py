@@ -0,0 +1,99 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_VERDICT_RE = re.compile(r'"verdict"\s*:\s*"([^"]*)"')
+# The number only counts as complete once a delimiter follows it
+_CONFIDENCE_RE = re.compile(r'"confidence_score"\s*:\s*(-?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)\s*[,}\n]')
+_ANALYSIS_START_RE = re.compile(r'"analysis"\s*:\s*"')
+
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+
+
+class StreamingAnalysisParser:
+    """
+    Incrementally extracts fields from the model's JSON output while it streams.
+
+    feed() returns events as soon as they can be parsed:
+      ("verdict", {"verdict": ..., "confidence_score": ...}) once, then
+      ("analysis", {"delta": ...}) for each newly decoded slice of the analysis string.
+    The final, authoritative response is still built from the complete text.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.verdict: Optional[str] = None
+        self.confidence: Optional[float] = None
+        self.verdict_sent = False
+        self.analysis_text = ""
+        self._analysis_pos: Optional[int] = None
+        self._analysis_done = False
+
+    @property
+    def has_output(self) -> bool:
+        return self.verdict_sent or bool(self.analysis_text)
+
+    def feed(self, delta: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self.buffer += delta
+        events = []
+
+        if self.verdict is None:
+            match = _VERDICT_RE.search(self.buffer)
+            if match:
+                self.verdict = match.group(1).upper().strip()
+        if self.confidence is None:
+            match = _CONFIDENCE_RE.search(self.buffer)
+            if match:
+                try:
+                    self.confidence = float(match.group(1))
+                except ValueError:
+                    pass
+
+        if self._analysis_pos is None:
+            match = _ANALYSIS_START_RE.search(self.buffer)
+            if match:
+                self._analysis_pos = match.end()
+
+        # Send the verdict once both header fields are known, or as soon as the analysis starts
+        if not self.verdict_sent and self.verdict is not None and (self.confidence is not None or self._analysis_pos is not None):
+            self.verdict_sent = True
+            events.append(("verdict", {"verdict": self.verdict, "confidence_score": self.confidence}))
+
+        if self._analysis_pos is not None and not self._analysis_done:
+            decoded = self._decode_available()
+            if decoded:
+                self.analysis_text += decoded
+                events.append(("analysis", {"delta": decoded}))
+
+        return events
+
+    def _decode_available(self) -> str:
+        """Decodes the analysis string up to the last complete escape sequence."""
+        out = []
+        i = self._analysis_pos
+        buf = self.buffer
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._analysis_done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break
+            esc = buf[i + 1]
+            if esc == 'u':
+                if i + 6 > len(buf):
+                    break
+                try:
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                except ValueError:
+                    out.append(buf[i:i + 6])
+                i += 6
+            else:
+                out.append(_SIMPLE_ESCAPES.get(esc, esc))
+                i += 2
+        self._analysis_pos = i
+        return "".join(out)
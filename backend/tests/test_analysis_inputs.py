@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+
+import main
+from models import AnalysisResponse
+from upload_ingest import IngestedUpload
+
+
+def _uploads():
+    return [IngestedUpload.from_bytes("photo.png", "image/png", b"\x89PNG not really"),
+            IngestedUpload.from_bytes("report.pdf", "application/pdf", b"%PDF-1.4 not really")]
+
+
+class TestAnalysisInputs(unittest.IsolatedAsyncioTestCase):
+    def test_cache_key_needs_no_preprocessing(self):
+        uploads = _uploads()
+        with mock.patch.object(main, "normalize_images", side_effect=AssertionError("normalized")), \
+                mock.patch.object(main, "select_pdf_pages_for_claim", side_effect=AssertionError("selected")):
+            inputs = main.prepare_analysis_inputs(uploads, json.dumps({"text_claim": "The sky is green"}))
+        expected = main.analysis_cache_key("The sky is green", [u.sha256 for u in uploads], [], inputs["profile"])
+        self.assertEqual(inputs["cache_key"], expected)
+        self.assertEqual(inputs["gemini_parts"], [])
+        self.assertEqual(inputs["file_names"], ["photo.png", "report.pdf"])
+
+    async def test_files_are_prepared_on_a_miss(self):
+        uploads = _uploads()
+        inputs = main.prepare_analysis_inputs(uploads, "legacy claim text")
+        normalize = mock.AsyncMock(side_effect=lambda files: (files, 0))
+        select = mock.AsyncMock(side_effect=lambda files, claim: (files, [""] * len(files)))
+        with mock.patch.object(main, "normalize_images", normalize), mock.patch.object(main, "select_pdf_pages_for_claim", select):
+            await main.attach_analysis_files(inputs, uploads)
+        select.assert_awaited_once()
+        self.assertEqual(select.await_args.args[1], "legacy claim text")
+        self.assertEqual(len(inputs["gemini_parts"]), 2)
+        self.assertIn("[Image Attached: photo.png (image/png)]", inputs["file_prompt"])
+        self.assertIn("[PDF Document Attached (Medium Resolution): report.pdf]", inputs["file_prompt"])
+
+
+class TestAnalyzeCacheFirst(unittest.TestCase):
+    def test_cache_hit_skips_pdf_selection(self):
+        cached = AnalysisResponse(verdict="FALSE", confidence_score=0.9, analysis="Cached")
+        client = TestClient(main.app)
+        with mock.patch.object(main, "get_cached_analysis", return_value=cached) as lookup, \
+                mock.patch.object(main, "get_pdf_page_selector", side_effect=AssertionError("PDF parsed on a cache hit")), \
+                mock.patch.object(main, "normalize_images", side_effect=AssertionError("normalized on a cache hit")):
+            response = client.post("/analyze", data={"metadata": json.dumps({"text_claim": "Page 40 says so"})},
+                                   files={"files": ("report.pdf", b"%PDF-1.4 " + b"x" * 4096, "application/pdf")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["analysis"], "Cached")
+        self.assertNotIn("X-Image-Bytes-Saved", response.headers)
+        lookup.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
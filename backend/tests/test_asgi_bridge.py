@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+from contextlib import asynccontextmanager
+from unittest import mock
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request as WsgiRequest
+
+import asgi_bridge
+from asgi_bridge import AsgiFunctionBridge
+
+
+def _make_app():
+    state = {"startups": 0, "shutdowns": 0, "loops": set()}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state["startups"] += 1
+        yield
+        state["shutdowns"] += 1
+
+    app = FastAPI(lifespan=lifespan)
+
+    @app.post("/analyze")
+    async def analyze(request: Request):
+        state["loops"].add(id(asyncio.get_running_loop()))
+        body = await request.body()
+        return {"bytes": len(body), "query": request.query_params.get("q"), "agent": request.headers.get("x-agent")}
+
+    @app.get("/stuck")
+    async def stuck():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield json.dumps({"index": i}) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app, state
+
+
+def _request(path, method="GET", **kwargs):
+    return WsgiRequest(EnvironBuilder(path=path, method=method, **kwargs).get_environ())
+
+
+class TestAsgiFunctionBridge(unittest.TestCase):
+    def setUp(self):
+        self.app, self.state = _make_app()
+        self.bridge = AsgiFunctionBridge(self.app, root_path_aliases={"/": "/analyze"}, chunk_bytes=1024)
+        self.addCleanup(self.bridge.stop)
+
+    def test_invocations_share_one_loop_and_lifespan(self):
+        for _ in range(3):
+            response = self.bridge.handle(_request("/analyze?q=x", "POST", data=b"a" * 5000, headers={"X-Agent": "t"}))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {"bytes": 5000, "query": "x", "agent": "t"})
+        self.assertEqual(self.state["startups"], 1)
+        self.assertEqual(len(self.state["loops"]), 1)
+        self.assertEqual(self.bridge.invocations, 3)
+
+    def test_root_path_alias(self):
+        response = self.bridge.handle(_request("/", "POST", data=b"xy"))
+        self.assertEqual(response.get_json()["bytes"], 2)
+
+    def test_ndjson_is_streamed(self):
+        response = self.bridge.handle(_request("/stream"))
+        self.assertTrue(response.is_streamed)
+        lines = b"".join(response.response).decode().splitlines()
+        self.assertEqual([json.loads(line)["index"] for line in lines], [0, 1, 2])
+
+    def test_unknown_route_and_concurrent_invocations(self):
+        self.assertEqual(self.bridge.handle(_request("/missing")).status_code, 404)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.bridge.handle(_request("/analyze", "POST", data=b"abc")).status_code)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [200] * 8)
+
+    def test_stuck_route_times_out(self):
+        with mock.patch.object(asgi_bridge, "ASGI_BRIDGE_START_TIMEOUT_SEC", 0.2):
+            response = self.bridge.handle(_request("/stuck"))
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(response.get_json(), {"detail": "Request timed out"})
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), self.bridge.loop).result(1)
+        self.assertTrue(self.state.get("cancelled"))
+        self.assertEqual(self.bridge.handle(_request("/analyze", "POST")).status_code, 200)
+
+    def test_app_error_before_headers(self):
+        self.assertEqual(self.bridge.handle(_request("/broken")).status_code, 500)
+
+    def test_stop_runs_lifespan_shutdown(self):
+        self.bridge.handle(_request("/analyze", "POST"))
+        self.bridge.stop()
+        self.assertEqual(self.state["shutdowns"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import authority_index
+from authority_index import AuthorityIndex, DEFAULT_AUTHORITY_TIERS, PublicSuffixes, build_authority_index, normalize_domain_name
+
+VERIFIED = ["afp.com", "bbc.com", "afghanistan.factcrescendo.com", "mysinchew.com.my"]
+
+
+class TestAuthorityIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, VERIFIED)
+
+    def test_matches_previous_tiers(self):
+        cases = {
+            "afp.com": 1.0,
+            "https://www.bbc.com/news/world": 1.0,  # verified outranks the 0.9 news tier
+            "cdc.gov": 1.0,
+            "mit.edu": 1.0,
+            "who.int": 1.0,
+            "reuters.com": 0.9,
+            "bbc.co.uk": 0.9,
+            "factcheck.org": 0.9,
+            "en.wikipedia.org": 0.9,  # the .org tier has always come first
+            "twitter.com": 0.4,
+            "x.com": 0.4,
+            "report.pdf": 1.0,
+            "scan.JPEG": 1.0,
+            "thestar.com.my": 0.7,
+            "": 0.7,
+        }
+        for domain, expected in cases.items():
+            with self.subTest(domain=domain):
+                self.assertEqual(self.index.score(domain), expected)
+
+    def test_social_match_is_label_aware(self):
+        # The old substring scan rated these as social media
+        self.assertEqual(self.index.score("fox.com"), 0.7)
+        self.assertEqual(self.index.score("dropbox.com"), 0.7)
+        self.assertEqual(self.index.score("m.facebook.com"), 0.4)
+
+    def test_entries_cover_subdomains_only(self):
+        self.assertEqual(self.index.lookup("uk.reuters.com").tier, "high_authority")
+        self.assertTrue(self.index.lookup("afghanistan.factcrescendo.com").verified)
+        self.assertFalse(self.index.lookup("factcrescendo.com").verified)
+        self.assertFalse(self.index.lookup("notafp.com").verified)
+
+    def test_normalization(self):
+        self.assertEqual(normalize_domain_name("https://WWW.Reuters.com:443/path?q=1"), "reuters.com")
+        self.assertEqual(normalize_domain_name("afp.com."), "afp.com")
+        self.assertEqual(normalize_domain_name("https%3A%2F%2Fwww.afp.com%2Fx"), "afp.com")
+        self.assertEqual(normalize_domain_name("snopes.com/fact-check/x?y=1#z"), "snopes.com")
+        self.assertTrue(self.index.lookup("https://www.afp.com/en/").verified)
+
+    def test_public_suffix_entries_are_not_verified(self):
+        index = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, ["com.my", "com", "afp.com"])
+        self.assertFalse(index.lookup("anything.com.my").verified)
+        self.assertTrue(index.lookup("afp.com").verified)
+
+    def test_registrable_domain(self):
+        suffixes = PublicSuffixes(["co.uk", "*.ck", "!www.ck"])
+        self.assertEqual(suffixes.registrable_domain("news.bbc.co.uk"), "bbc.co.uk")
+        self.assertEqual(suffixes.registrable_domain("a.b.example.com"), "example.com")
+        self.assertEqual(suffixes.registrable_domain("shop.example.ck"), "shop.example.ck")
+        self.assertEqual(suffixes.registrable_domain("www.ck"), "www.ck")
+        self.assertTrue(suffixes.is_public_suffix("co.uk"))
+
+    def test_custom_tier_table(self):
+        table = {"default_score": 0.5, "tiers": [
+            {"name": "verified_fact_checker", "score": 1.0, "source": "verified_domains"},
+            {"name": "malaysian_government", "score": 0.95, "domains": ["gov.my"]},
+        ]}
+        index = build_authority_index(["afp.com"], table)
+        self.assertEqual(index.score("moh.gov.my"), 0.95)
+        self.assertEqual(index.score("reuters.com"), 0.5)
+        self.assertEqual(index.score("afp.com"), 1.0)
+
+    def test_lookups_are_memoized(self):
+        self.index.lookup("reuters.com")
+        self.index.lookup("reuters.com")
+        self.assertEqual(self.index.cache_info().hits, 1)
+
+    def test_thrashing_cache_grows_to_the_working_set(self):
+        with mock.patch.object(authority_index, "_CACHE_CHECK_INTERVAL", 32):
+            index = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, ["afp.com"], cache_size=16, max_cache_size=64)
+            hosts = [f"site{i}.example.com" for i in range(40)]
+            for _ in range(10):
+                for host in hosts:
+                    index.lookup(host)
+        self.assertEqual(index.cache_info().maxsize, 64)
+        hits_before = index.cache_info().hits
+        for host in hosts:
+            index.lookup(host)
+        self.assertEqual(index.cache_info().hits - hits_before, 40)
+
+    def test_cache_that_hits_does_not_grow(self):
+        with mock.patch.object(authority_index, "_CACHE_CHECK_INTERVAL", 4):
+            index = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, ["afp.com"], cache_size=16, max_cache_size=64)
+            for i in range(200):
+                index.lookup(f"site{i % 12}.example.com")
+                if i % 3 == 0:
+                    index.lookup(f"once{i}.example.com")
+        self.assertEqual(index.cache_info().maxsize, 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_runner import run_bounded
+
+
+class TestRunBounded(unittest.IsolatedAsyncioTestCase):
+    async def test_yields_in_completion_order_under_limit(self):
+        running = 0
+        peak = 0
+
+        async def worker(index, delay):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(delay)
+            running -= 1
+            return index * 10
+
+        results = [item async for item in run_bounded([0.1, 0.01, 0.03, 0.01], worker, concurrency=2)]
+        self.assertEqual(peak, 2)
+        self.assertEqual([index for index, _, _ in results], [1, 2, 3, 0])
+        self.assertEqual({index: value for index, value, _ in results}, {0: 0, 1: 10, 2: 20, 3: 30})
+
+    async def test_failing_item_does_not_stop_batch(self):
+        async def worker(index, item):
+            if item == "bad":
+                raise ValueError("boom")
+            return item.upper()
+
+        results = {index: (value, error) async for index, value, error in run_bounded(["a", "bad", "c"], worker, 3)}
+        self.assertEqual(results[0], ("A", None))
+        self.assertIsInstance(results[1][1], ValueError)
+        self.assertEqual(results[2], ("C", None))
+
+    async def test_closing_early_cancels_running_items(self):
+        cancelled = []
+
+        async def worker(index, delay):
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return index
+
+        results = run_bounded([0.0, 5, 5], worker, concurrency=3)
+        first = await results.__anext__()
+        await results.aclose()
+        self.assertEqual(first[0], 0)
+        self.assertEqual(sorted(cancelled), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import shutil
+import sys
+import asyncio
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+
+import main
+from document_sessions import DocumentSessionStore, LocalDocumentBackend, SessionNotFound
+from models import AnalysisResponse
+
+
+class FakeCacheBackend:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.deleted = []
+
+    async def create(self, parts, display_name, ttl_sec):
+        if self.fail:
+            raise RuntimeError("Cached content is too small")
+        self.created.append((len(parts), ttl_sec))
+        return f"cachedContents/{len(self.created)}", 4096
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+
+PDF = ("report.pdf", "application/pdf", b"%PDF-1.4 test", "digest-a")
+IMAGE = ("photo.png", "image/png", b"\x89PNG test", "digest-b")
+
+
+class TestDocumentSessions(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.session_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.session_dir, ignore_errors=True)
+
+    async def test_local_mode_reattaches_stored_documents(self):
+        store = DocumentSessionStore(LocalDocumentBackend(), self.session_dir)
+        session = await store.create([PDF, IMAGE], ingest_seconds=0.5)
+        self.assertEqual(session.mode, "local")
+        self.assertEqual(session.file_digests, ["digest-a", "digest-b"])
+
+        fetched = await store.get(session.session_id)
+        parts = await store.load_parts(fetched)
+        self.assertEqual([p.inline_data.data for p in parts], [PDF[2], IMAGE[2]])
+
+        tokens, seconds = store.record_claim(fetched)
+        self.assertEqual(tokens, 0)
+        self.assertGreaterEqual(seconds, 0.5)
+
+    async def test_context_cache_mode_sends_no_parts(self):
+        backend = FakeCacheBackend()
+        store = DocumentSessionStore(backend, self.session_dir, ttl_sec=600)
+        session = await store.create([PDF])
+        self.assertEqual(session.mode, "context_cache")
+        self.assertEqual(backend.created[0][0], 1)
+        # The remote cache outlives the local session
+        self.assertGreater(backend.created[0][1], 600)
+        self.assertEqual(await store.load_parts(session), [])
+
+        store.record_claim(session)
+        store.record_claim(session)
+        self.assertEqual(session.claims, 2)
+        self.assertEqual(session.tokens_saved, 8192)
+
+        await store.delete(session.session_id)
+        self.assertEqual(backend.deleted, [session.cache_name])
+        self.assertFalse(os.path.exists(os.path.join(self.session_dir, session.session_id)))
+        with self.assertRaises(SessionNotFound):
+            await store.get(session.session_id)
+
+    async def test_backend_failure_falls_back_to_local(self):
+        store = DocumentSessionStore(FakeCacheBackend(fail=True), self.session_dir)
+        session = await store.create([PDF])
+        self.assertEqual(session.mode, "local")
+        self.assertEqual(store.stats["cache_fallbacks"], 1)
+        self.assertEqual(len(await store.load_parts(session)), 1)
+
+    async def test_expired_sessions_are_swept(self):
+        backend = FakeCacheBackend()
+        store = DocumentSessionStore(backend, self.session_dir, ttl_sec=60)
+        session = await store.create([PDF])
+        session.expires_at = session.created_at - 1
+        with self.assertRaises(SessionNotFound):
+            await store.get(session.session_id)
+        self.assertEqual(store.stats["expired"], 1)
+        self.assertEqual(backend.deleted, [session.cache_name])
+        self.assertEqual(store.active(), 0)
+
+    async def test_oldest_session_evicted_at_capacity(self):
+        store = DocumentSessionStore(LocalDocumentBackend(), self.session_dir, max_sessions=2)
+        first = await store.create([PDF])
+        await store.create([IMAGE])
+        await store.create([PDF, IMAGE])
+        self.assertEqual(store.active(), 2)
+        self.assertEqual(store.stats["evicted"], 1)
+        with self.assertRaises(SessionNotFound):
+            await store.get(first.session_id)
+        self.assertFalse(os.path.exists(os.path.join(self.session_dir, first.session_id)))
+
+class TestSessionClaimSavings(unittest.TestCase):
+    def setUp(self):
+        self.session_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.session_dir, ignore_errors=True)
+        self.store = DocumentSessionStore(FakeCacheBackend(), self.session_dir)
+        self.session = asyncio.run(self.store.create([PDF]))
+        self.client = TestClient(main.app)
+
+    def _claim(self, cached=None, result=None):
+        model = mock.AsyncMock(return_value=result)
+        with mock.patch.object(main, "get_document_sessions", return_value=self.store), \
+                mock.patch.object(main, "get_cached_analysis", mock.AsyncMock(return_value=cached)), \
+                mock.patch.object(main, "store_cached_analysis", mock.AsyncMock()), \
+                mock.patch.object(main, "assemble_gemini_parts", mock.AsyncMock(return_value=[])), \
+                mock.patch.object(main, "process_multimodal_gemini", model):
+            response = self.client.post(f"/sessions/{self.session.session_id}/analyze", json={"text_claim": "Page 4 says so"})
+        self.assertEqual(response.status_code, 200)
+        return model
+
+    def test_savings_recorded_after_model_call(self):
+        model = self._claim(result=AnalysisResponse(verdict="TRUE", confidence_score=0.8, analysis="Checked"))
+        model.assert_awaited_once()
+        self.assertEqual((self.session.claims, self.session.tokens_saved), (1, 4096))
+        self.assertEqual(self.store.stats["claims"], 1)
+
+    def test_cache_hits_and_failures_save_nothing(self):
+        self._claim(cached=AnalysisResponse(verdict="TRUE", confidence_score=0.8, analysis="Cached"))
+        self._claim(result=AnalysisResponse(verdict="RATE_LIMIT_ERROR", confidence_score=0.0, analysis="Busy"))
+        self.assertEqual((self.session.claims, self.session.tokens_saved), (0, 0))
+        self.assertEqual(self.store.stats["claims"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logic
+from domain_registry import (
+    DomainRegistry, MappedRegistry, MemoryRegistry, RegistryFormatError, SOURCE_FLAGS, write_registry,
+)
+
+DOMAINS = {"afp.com": 1, "africacheck.org": 3, "afghanistan.factcrescendo.com": 1, "aap.com.au": 4, "ansa.it": 1}
+
+
+class TestMappedRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "verified.vdr")
+        write_registry(DOMAINS, self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookups_match_memory_registry(self):
+        mapped = MappedRegistry(self.path)
+        memory = MemoryRegistry(DOMAINS)
+        self.assertEqual(len(mapped), 5)
+        self.assertEqual(sorted(mapped), sorted(DOMAINS))
+        for domain in list(DOMAINS) + ["factcrescendo.com", "afp.co", "com", "", "zzz.it"]:
+            with self.subTest(domain=domain):
+                self.assertEqual(domain in mapped, domain in memory)
+
+    def test_inlined_and_mapped_indexes_agree(self):
+        from authority_index import AuthorityIndex, DEFAULT_AUTHORITY_TIERS
+        write_registry({**DOMAINS, "https": 1, "com.au": 4}, self.path)
+        mapped = MappedRegistry(self.path)
+        inline = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, mapped, cache_size=0)
+        in_place = AuthorityIndex(DEFAULT_AUTHORITY_TIERS, mapped, cache_size=0, inline_verified_max=0)
+        self.assertTrue(inline.verified_inline)
+        self.assertFalse(in_place.verified_inline)
+        hosts = list(DOMAINS) + ["news.afp.com", "factcrescendo.com", "x.aap.com.au", "abc.net.au", "https", "cdc.gov", "x.com"]
+        for host in hosts:
+            with self.subTest(host=host):
+                self.assertEqual(inline.lookup(host), in_place.lookup(host))
+
+    def test_hash_table_handles_collisions(self):
+        domains = {f"site{i}.example{i % 7}.com": 1 for i in range(3000)}
+        write_registry(domains, self.path)
+        mapped = MappedRegistry(self.path)
+        self.assertTrue(all(domain in mapped for domain in domains))
+        self.assertFalse(any(f"other{i}.example.com" in mapped for i in range(3000)))
+        self.assertEqual(mapped.first_listed("com.example3.site3.www".split(".")), 3)
+
+    def test_flags_record_sources(self):
+        mapped = MappedRegistry(self.path)
+        self.assertEqual(mapped.flags("africacheck.org"), SOURCE_FLAGS["ifcn"] | SOURCE_FLAGS["factcheckinsights"])
+        self.assertEqual(mapped.flags("aap.com.au"), SOURCE_FLAGS["curated"])
+        self.assertEqual(mapped.flags("example.com"), 0)
+
+    def test_written_file_is_world_readable(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o644)
+
+    def test_rejects_other_files(self):
+        bad = os.path.join(self.tmp.name, "bad.vdr")
+        with open(bad, "wb") as f:
+            f.write(b"not a registry at all")
+        with self.assertRaises(RegistryFormatError):
+            MappedRegistry(bad)
+
+
+class TestDomainRegistryReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "verified.vdr")
+        write_registry({"afp.com": 1}, self.path)
+        self.registry = DomainRegistry(self.path, json_path="", check_interval=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_swaps_in_replaced_file(self):
+        self.assertIn("afp.com", self.registry)
+        write_registry({"afp.com": 1, "boomlive.in": 1}, self.path)
+        self.assertIn("boomlive.in", self.registry)
+        self.assertEqual(self.registry.generation, 1)
+        self.assertFalse(self.registry.refresh())
+
+    def test_unreadable_replacement_keeps_previous_registry(self):
+        with open(self.path + ".tmp", "wb") as f:
+            f.write(b"garbage")
+        os.replace(self.path + ".tmp", self.path)
+        self.assertFalse(self.registry.refresh(force=True))
+        self.assertIn("afp.com", self.registry)
+
+    def test_checks_are_rate_limited(self):
+        registry = DomainRegistry(self.path, json_path="", check_interval=3600)
+        write_registry({"boomlive.in": 1}, self.path)
+        self.assertIn("afp.com", registry)
+        self.assertTrue(registry.refresh(force=True))
+        self.assertNotIn("afp.com", registry)
+
+    def test_json_fallback_without_registry_file(self):
+        json_path = os.path.join(self.tmp.name, "verified.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write('["afp.com"]')
+        registry = DomainRegistry(os.path.join(self.tmp.name, "missing.vdr"), json_path=json_path)
+        self.assertIn("afp.com", registry)
+        self.assertFalse(registry.describe()["mapped"])
+
+    def test_authority_index_follows_reload(self):
+        saved = logic._VERIFIED_REGISTRY
+        logic._VERIFIED_REGISTRY = self.registry
+        try:
+            self.assertEqual(logic.get_authority_index().lookup("boomlive.in").tier, "default")
+            write_registry({"boomlive.in": 1}, self.path)
+            self.assertTrue(logic.get_authority_index().lookup("https://www.boomlive.in/fact-check").verified)
+        finally:
+            logic._VERIFIED_REGISTRY = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from execution_profiles import EXECUTION_PROFILES, GEMINI_FAST_MODEL, GEMINI_MODEL, resolve_profile
+from models import AnalysisSettings
+
+
+class TestResolveProfile(unittest.TestCase):
+    def test_unset_depth_keeps_original_behaviour(self):
+        for settings in (None, AnalysisSettings(), AnalysisSettings(enable_grounding=True)):
+            with self.subTest(settings=settings):
+                profile = resolve_profile(settings)
+                self.assertEqual((profile.name, profile.model, profile.max_output_tokens, profile.grounding),
+                                 ("high", GEMINI_MODEL, 8192, True))
+
+    def test_explicit_medium_is_honoured(self):
+        profile = resolve_profile(AnalysisSettings(forensic_depth="medium"))
+        self.assertEqual(profile.name, "medium")
+        self.assertLess(profile.max_output_tokens, 8192)
+
+    def test_high_keeps_original_behaviour(self):
+        profile = resolve_profile(AnalysisSettings(forensic_depth="high"))
+        self.assertEqual((profile.model, profile.max_output_tokens, profile.grounding), (GEMINI_MODEL, 8192, True))
+
+    def test_low_is_faster_and_can_skip_grounding(self):
+        profile = resolve_profile(AnalysisSettings(forensic_depth="low", enable_grounding=False))
+        self.assertEqual(profile.model, GEMINI_FAST_MODEL)
+        self.assertFalse(profile.grounding)
+        self.assertLess(profile.max_output_tokens, EXECUTION_PROFILES["high"].max_output_tokens)
+        self.assertLessEqual(profile.deadline_sec, EXECUTION_PROFILES["high"].deadline_sec)
+        # The shared table entry is not modified
+        self.assertTrue(EXECUTION_PROFILES["low"].grounding)
+
+    def test_fingerprints_separate_depths_and_grounding(self):
+        fingerprints = {
+            resolve_profile(AnalysisSettings(forensic_depth=depth, enable_grounding=grounding)).fingerprint
+            for depth in ("low", "medium", "high") for grounding in (True, False)
+        }
+        self.assertEqual(len(fingerprints), 6)
+
+    def test_with_model_keeps_other_limits(self):
+        low = EXECUTION_PROFILES["low"]
+        pinned = low.with_model(GEMINI_MODEL)
+        self.assertEqual(pinned.model, GEMINI_MODEL)
+        self.assertEqual((pinned.name, pinned.max_output_tokens, pinned.max_attempts),
+                         (low.name, low.max_output_tokens, low.max_attempts))
+        self.assertIs(low.with_model(low.model), low)
+
+    def test_unknown_depth_is_rejected(self):
+        with self.assertRaises(ValueError):
+            resolve_profile(AnalysisSettings(forensic_depth="extreme"))
+
+
+if __name__ == "__main__":
+    unittest.main()
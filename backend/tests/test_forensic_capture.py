@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forensic_capture import ForensicCapture
+
+
+class TestForensicCapture(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "captures")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_per_request_files_do_not_clobber(self):
+        capture = ForensicCapture(capture_dir=self.dir, enabled=True)
+        capture.capture("req/1", "model_output.json", '{"a": 1}')
+        capture.capture("req/1", "model_output.json", lambda: '{"a": 2}')
+        capture.capture("req 2", "model_output.json", '{"a": 3}')
+        self.assertTrue(capture.flush())
+
+        names = sorted(os.listdir(self.dir))
+        self.assertEqual(len(names), 3)
+        self.assertTrue(all("/" not in n and " " not in n for n in names))
+        self.assertTrue(any("req_1_model_output.json" in n for n in names))
+        self.assertTrue(any("req_2_model_output.json" in n for n in names))
+
+    def test_rotation_by_count_and_size(self):
+        capture = ForensicCapture(capture_dir=self.dir, enabled=True, max_files=3, max_bytes=10_000)
+        for i in range(6):
+            capture.capture(f"r{i}", "dump.txt", "x" * 100)
+        capture.flush()
+        self.assertEqual(len(os.listdir(self.dir)), 3)
+
+        sized = ForensicCapture(capture_dir=os.path.join(self.tmp.name, "sized"), enabled=True, max_files=100, max_bytes=250)
+        for i in range(5):
+            sized.capture(f"r{i}", "dump.txt", "y" * 100)
+        sized.flush()
+        self.assertEqual(len(os.listdir(sized.capture_dir)), 2)
+        self.assertEqual(sized.stats["rotated"], 3)
+
+    def test_sampling_and_disable(self):
+        disabled = ForensicCapture(capture_dir=self.dir, enabled=False)
+        disabled.capture("r", "dump.txt", "data", always=True)
+        self.assertFalse(os.path.exists(self.dir))
+
+        sampled = ForensicCapture(capture_dir=self.dir, enabled=True, sample_rate=0.0)
+        sampled.capture("r", "model_output.json", "data")
+        self.assertEqual(sampled.stats["sampled_out"], 1)
+        sampled.capture("r", "failed_json_attempt_1.txt", "broken", always=True)
+        sampled.flush()
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+
+    def test_sampling_is_stable_per_request(self):
+        capture = ForensicCapture(capture_dir=self.dir, enabled=True, sample_rate=0.5)
+        decisions = {rid: capture.is_sampled(rid) for rid in (f"req-{i}" for i in range(200))}
+        self.assertTrue(all(capture.is_sampled(rid) == kept for rid, kept in decisions.items()))
+        self.assertTrue(40 < sum(decisions.values()) < 160)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from image_normalizer import Image, ImageNormalizer, normalize_image, strip_metadata
+
+if Image is not None:
+    from PIL import ImageDraw
+
+
+def _encode(image, fmt, **kwargs):
+    out = io.BytesIO()
+    image.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class TestNormalizeImage(unittest.TestCase):
+    def test_large_photo_is_downsampled_and_reencoded(self):
+        data = _encode(Image.effect_noise((2400, 1800), 64).convert("RGB"), "PNG")
+        result = normalize_image(data, "image/png", max_dimension=1024)
+        self.assertTrue(result.resized)
+        self.assertEqual(max(result.width, result.height), 1024)
+        self.assertEqual(result.mime_type, "image/jpeg")
+        self.assertGreater(result.bytes_saved, 0)
+
+    def test_exif_is_stripped_from_small_jpeg(self):
+        image = Image.new("RGB", (200, 100), "red")
+        exif = image.getexif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        data = _encode(image, "JPEG", exif=exif.tobytes())
+        result = normalize_image(data, "image/jpeg", max_dimension=1024)
+        self.assertTrue(result.reencoded)
+        self.assertFalse(result.resized)
+        self.assertFalse(Image.open(io.BytesIO(result.data)).getexif())
+
+    def test_metadata_only_png_stays_lossless_png(self):
+        # A screenshot with EXIF: stripping must not turn it into a larger, lossy JPEG
+        image = Image.new("RGB", (1200, 800), "white")
+        draw = ImageDraw.Draw(image)
+        for y in range(0, 800, 20):
+            draw.text((10, y), "The quick brown fox jumps over the lazy dog 0123456789 " * 3, fill="black")
+        exif = image.getexif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        data = _encode(image, "PNG", exif=exif.tobytes())
+        result = normalize_image(data, "image/png")
+        self.assertEqual(result.mime_type, "image/png")
+        self.assertFalse(result.resized)
+        self.assertGreater(result.bytes_saved, 0)
+        stripped = Image.open(io.BytesIO(result.data))
+        self.assertFalse(stripped.getexif())
+        self.assertEqual(stripped.convert("RGB").tobytes(), image.tobytes())
+
+    def test_lossy_webp_keeps_its_encoding_but_not_its_exif(self):
+        # A lossless re-encode would be larger, so the EXIF chunk is cut out of the original file
+        image = Image.effect_noise((400, 300), 64).convert("RGB")
+        exif = image.getexif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        data = _encode(image, "WEBP", quality=50, exif=exif.tobytes(), xmp=b"<x:xmpmeta/>")
+        clean = _encode(image, "WEBP", quality=50)
+        result = normalize_image(data, "image/webp")
+        self.assertEqual(result.mime_type, "image/webp")
+        self.assertFalse(result.reencoded)
+        self.assertGreater(result.bytes_saved, 0)
+        stripped = Image.open(io.BytesIO(result.data))
+        self.assertFalse(stripped.getexif())
+        self.assertNotIn("xmp", stripped.info)
+        self.assertEqual(stripped.convert("RGB").tobytes(), Image.open(io.BytesIO(clean)).convert("RGB").tobytes())
+
+    def test_jpeg_and_png_metadata_cut_without_touching_pixels(self):
+        image = Image.effect_noise((120, 80), 64).convert("RGB")
+        exif = image.getexif()
+        exif[0x010F] = "PhoneMaker"  # Make
+        for fmt, kwargs in (("JPEG", {"quality": 90, "comment": b"shot on a phone"}), ("PNG", {})):
+            with self.subTest(format=fmt):
+                data = _encode(image, fmt, exif=exif.tobytes(), **kwargs)
+                stripped = strip_metadata(data, fmt)
+                self.assertLess(len(stripped), len(data))
+                decoded = Image.open(io.BytesIO(stripped))
+                self.assertFalse(decoded.getexif())
+                self.assertNotIn("comment", decoded.info)
+                self.assertEqual(decoded.tobytes(), Image.open(io.BytesIO(data)).tobytes())
+        self.assertIsNone(strip_metadata(b"\xff\xd8 truncated", "JPEG"))
+        self.assertIsNone(strip_metadata(b"BM", "BMP"))
+
+    def test_small_clean_image_passes_through(self):
+        data = _encode(Image.new("RGB", (300, 200), "white"), "PNG")
+        result = normalize_image(data, "image/png", max_dimension=1024)
+        self.assertIs(result.data, data)
+        self.assertEqual(result.bytes_saved, 0)
+
+    def test_transparency_keeps_png(self):
+        data = _encode(Image.new("RGBA", (3000, 1000), (0, 0, 0, 0)), "PNG")
+        result = normalize_image(data, "image/png", max_dimension=1500)
+        self.assertEqual(result.mime_type, "image/png")
+        self.assertEqual((result.width, result.height), (1500, 500))
+
+    def test_undecodable_bytes_are_unchanged(self):
+        data = b"not an image"
+        result = normalize_image(data, "image/heic")
+        self.assertIs(result.data, data)
+        self.assertEqual(result.mime_type, "image/heic")
+
+
+@unittest.skipIf(Image is None, "Pillow is not installed")
+class TestImageNormalizer(unittest.IsolatedAsyncioTestCase):
+    async def test_normalize_all_preserves_order(self):
+        normalizer = ImageNormalizer(max_dimension=256, workers=2)
+        try:
+            sizes = [(1000, 400), (300, 900), (100, 100)]
+            images = [(_encode(Image.new("RGB", size, "blue"), "BMP"), "image/bmp") for size in sizes]
+            results = await normalizer.normalize_all(images)
+        finally:
+            normalizer.shutdown()
+        self.assertEqual([(r.width, r.height) for r in results], [(256, 102), (85, 256), (100, 100)])
+
+    async def test_disabled_returns_originals(self):
+        normalizer = ImageNormalizer(enabled=False)
+        data = _encode(Image.new("RGB", (3000, 3000)), "PNG")
+        results = await normalizer.normalize_all([(data, "image/png")])
+        self.assertIs(results[0].data, data)
+        self.assertIsNone(normalizer._executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from job_queue import InProcessBroker, JobBroker, JobNotFound, JobWorkerPool, RedisBroker, decode_payload, encode_payload, make_broker
+
+
+class _LocalRedis:
+    """Stand-in for the subset of redis.asyncio.Redis the broker uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def brpop(self, keys, timeout=0):
+        for _ in range(int(timeout * 100)):
+            for key in keys:
+                if self.lists.get(key):
+                    return key.encode(), self.lists[key].pop()
+            await asyncio.sleep(0.01)
+        return None
+
+
+async def _echo_handler(payload):
+    if payload.get("fail"):
+        raise ValueError("bad input")
+    await asyncio.sleep(payload.get("delay", 0))
+    return {"echo": payload["files"][0]["data"].decode()}
+
+
+class _BrokerContract:
+    def make_broker(self):
+        raise NotImplementedError
+
+    async def test_job_runs_to_completion(self):
+        broker = self.make_broker()
+        workers = JobWorkerPool(broker, _echo_handler, concurrency=2)
+        workers.start()
+        try:
+            record = await broker.submit({"files": [{"data": b"\x00hello"}]})
+            self.assertEqual(record["status"], "queued")
+            finished = await broker.wait(record["job_id"], timeout=3)
+        finally:
+            await workers.stop()
+        self.assertEqual(finished["status"], "succeeded")
+        self.assertEqual(finished["result"], {"echo": "\x00hello"})
+        self.assertIsNotNone(finished["started_at"])
+        self.assertEqual(workers.stats, {"succeeded": 1, "failed": 0})
+
+    async def test_failure_is_recorded_on_the_job(self):
+        broker = self.make_broker()
+        workers = JobWorkerPool(broker, _echo_handler, concurrency=1)
+        workers.start()
+        try:
+            record = await broker.submit({"fail": True})
+            finished = await broker.wait(record["job_id"], timeout=3)
+        finally:
+            await workers.stop()
+        self.assertEqual(finished["status"], "failed")
+        self.assertEqual(finished["error"], "bad input")
+
+    async def test_wait_returns_pending_record_after_timeout(self):
+        broker = self.make_broker()
+        record = await broker.submit({"files": []})
+        waited = await broker.wait(record["job_id"], timeout=0.1)
+        self.assertEqual(waited["status"], "queued")
+        self.assertEqual(await broker.pending(), 1)
+
+    async def test_unknown_job(self):
+        with self.assertRaises(JobNotFound):
+            await self.make_broker().get("missing")
+
+
+class TestInProcessBroker(_BrokerContract, unittest.IsolatedAsyncioTestCase):
+    def make_broker(self):
+        return InProcessBroker()
+
+    async def test_timeout_and_eviction(self):
+        broker = InProcessBroker(max_records=2)
+        workers = JobWorkerPool(broker, _echo_handler, concurrency=1, job_timeout=0.05)
+        workers.start()
+        try:
+            record = await broker.submit({"files": [{"data": b"x"}], "delay": 1})
+            finished = await broker.wait(record["job_id"], timeout=2)
+            self.assertEqual(finished["status"], "failed")
+            self.assertIn("exceeded", finished["error"])
+        finally:
+            await workers.stop()
+        await broker.submit({})
+        await broker.submit({})
+        with self.assertRaises(JobNotFound):
+            await broker.get(record["job_id"])
+
+
+class TestRedisBroker(_BrokerContract, unittest.IsolatedAsyncioTestCase):
+    def make_broker(self):
+        return RedisBroker(_LocalRedis(), prefix="test")
+
+    async def test_payload_is_not_stored_with_record(self):
+        client = _LocalRedis()
+        broker = RedisBroker(client, prefix="test")
+        record = await broker.submit({"files": [{"data": b"big"}]})
+        self.assertNotIn(b"big", client.values[f"test:job:{record['job_id']}"])
+        job_id, payload = await broker.next_job(timeout=1)
+        self.assertEqual(job_id, record["job_id"])
+        self.assertEqual(payload["files"][0]["data"], b"big")
+        self.assertNotIn(f"test:payload:{job_id}", client.values)
+
+
+class TestBrokerInterface(unittest.TestCase):
+    def test_incomplete_broker_fails_at_construction(self):
+        class QueueOnlyBroker(JobBroker):
+            async def next_job(self, timeout):
+                return None
+
+            async def pending(self):
+                return 0
+
+        with self.assertRaises(TypeError):
+            QueueOnlyBroker()
+
+    def test_memory_broker_warns_on_multi_instance_deployments(self):
+        with self.assertLogs("job_queue", level="WARNING") as logs:
+            self.assertIsInstance(make_broker("memory", multi_instance=True), InProcessBroker)
+        self.assertIn("JOB_BROKER=redis", logs.output[0])
+        with self.assertNoLogs("job_queue", level="WARNING"):
+            make_broker("memory")
+
+
+class TestPayloadEncoding(unittest.TestCase):
+    def test_bytes_round_trip(self):
+        payload = {"metadata": "{}", "files": [{"filename": "a.png", "data": b"\x89PNG\x00"}]}
+        self.assertEqual(decode_payload(encode_payload(payload)), payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from json_recovery import JsonRecoveryError, recover_json
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _captured_dump(name):
+    with open(os.path.join(BACKEND_DIR, name), "r", encoding="utf-8") as f:
+        return f.read().split("=" * 50 + "\n", 1)[1]
+
+
+class TestRecoverJson(unittest.TestCase):
+    def test_well_formed_output_takes_fast_path(self):
+        recovered = recover_json('Here you go:\n{"verdict": "TRUE", "analysis": "ok"}')
+        self.assertEqual(recovered.value, {"verdict": "TRUE", "analysis": "ok"})
+        self.assertEqual(recovered.repairs, [])
+        self.assertFalse(recovered.truncated)
+
+    def test_unescaped_quotes_in_any_string_field(self):
+        raw = ('{"verdict": "FALSE", "analysis": "He called it "a hoax", "baseless" and left.", '
+               '"grounding_citations": [{"title": "The "real" story", "snippet": "x"}]}')
+        recovered = recover_json(raw)
+        self.assertEqual(recovered.value["analysis"], 'He called it "a hoax", "baseless" and left.')
+        self.assertEqual(recovered.value["grounding_citations"][0]["title"], 'The "real" story')
+        self.assertIn("escaped_quote", recovered.repairs)
+
+    def test_truncation_closes_open_containers(self):
+        recovered = recover_json('{"verdict": "MIXTURE", "analysis": "Done.", "grounding_citations": [{"title": "A", "snippet": "cut of')
+        self.assertTrue(recovered.truncated)
+        self.assertEqual(recovered.value["verdict"], "MIXTURE")
+        self.assertEqual(recovered.value["grounding_citations"], [{"title": "A", "snippet": "cut of"}])
+
+    def test_fences_trailing_commas_and_double_escaped_newlines(self):
+        raw = '```json\n{"verdict": "TRUE", "analysis": "One\\\\nTwo \\u00b0C", "tags": ["a", "b",],}\n```'
+        recovered = recover_json(raw)
+        self.assertEqual(recovered.value, {"verdict": "TRUE", "analysis": "One\nTwo °C", "tags": ["a", "b"]})
+        self.assertFalse(recovered.truncated)
+
+    def test_restarted_answer_prefers_complete_document(self):
+        first = '```json\n{"verdict": "TRUE", "analysis": "cut off mid'
+        second = '```json\n{"verdict": "FALSE", "analysis": "complete"}\n```'
+        recovered = recover_json(first + second)
+        self.assertEqual(recovered.value, {"verdict": "FALSE", "analysis": "complete"})
+
+    def test_captured_failure_dumps(self):
+        # Both dumps broke the previous regex repair and forced a full re-prompt
+        restarted = recover_json(_captured_dump("failed_json_dump.txt"))
+        self.assertEqual(restarted.value["verdict"], "TRUE")
+        self.assertIn("Donald Trump", restarted.value["analysis"])
+
+        duplicated = recover_json(_captured_dump("failed_json_dump_attempt_1.txt"))
+        self.assertEqual(duplicated.value["verdict"], "MIXTURE")
+        self.assertIn("media_literacy", duplicated.value)
+        json.dumps(duplicated.value)
+
+        with self.assertRaises(JsonRecoveryError):
+            recover_json(_captured_dump("failed_json_dump_attempt_2.txt"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data')))
+
+import merge_datasets
+from domain_registry import SOURCE_FLAGS, MappedRegistry
+
+REVIEWS = [
+    {"author": {"name": "AFP", "url": "https://factcheck.afp.com/"}, "url": "https://factcheck.afp.com/doc.123", "reviewRating": {"ratingValue": -1.5e3}},
+    {"author": [{"url": "http://www.boomlive.in"}], "url": "https://www.boomlive.in/fact-check/x?y=1"},
+    {"author": "Snopes", "url": "snopes.com/fact-check/z"},
+    {"author": {"url": "https://co.uk/"}},
+    "not a review",
+]
+
+
+class TestIterClaimReviews(unittest.TestCase):
+    def test_bare_list_with_tiny_chunks(self):
+        # 7-char reads cut strings, numbers and literals at every possible boundary
+        text = json.dumps(REVIEWS + [123456789, True, None, "a\"b"])
+        self.assertEqual(list(merge_datasets.iter_claim_reviews(io.StringIO(text), chunk_chars=7)),
+                         REVIEWS + [123456789, True, None, "a\"b"])
+
+    def test_wrapped_object_skips_other_keys(self):
+        text = json.dumps({"meta": {"count": [1, 2]}, "claimReviews": REVIEWS, "next": 12})
+        self.assertEqual(list(merge_datasets.iter_claim_reviews(io.StringIO(text), chunk_chars=5)), REVIEWS)
+
+    def test_empty_and_truncated_input(self):
+        self.assertEqual(list(merge_datasets.iter_claim_reviews(io.StringIO(" [ ] "))), [])
+        with self.assertRaises(ValueError):
+            list(merge_datasets.iter_claim_reviews(io.StringIO('[{"url": "a"}, {"url": '), chunk_chars=4))
+
+    def test_review_urls(self):
+        self.assertEqual(merge_datasets.review_urls(REVIEWS[0]), ["https://factcheck.afp.com/", "https://factcheck.afp.com/doc.123"])
+        self.assertEqual(merge_datasets.review_urls(REVIEWS[2]), ["snopes.com/fact-check/z"])
+        self.assertEqual(merge_datasets.review_urls(REVIEWS[4]), [])
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ifcn = os.path.join(self.tmp.name, "ifcn.txt")
+        with open(self.ifcn, "w", encoding="utf-8") as f:
+            f.write("# signatories\nfactcheck.afp.com\n\nhttps://www.Snopes.com/\ncom\n")
+        self.fci = os.path.join(self.tmp.name, "fci.json")
+        with open(self.fci, "w", encoding="utf-8") as f:
+            json.dump({"claimReviews": REVIEWS}, f)
+        self.curated = os.path.join(self.tmp.name, "curated.json")
+        with open(self.curated, "w", encoding="utf-8") as f:
+            json.dump(["aap.com.au"], f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_dedupes_with_provenance(self):
+        collector, stats = merge_datasets.build([self.ifcn], [self.fci], [self.curated], batch_size=2)
+        self.assertEqual(sorted(collector.domains), ["aap.com.au", "boomlive.in", "factcheck.afp.com", "snopes.com"])
+        afp = collector.domains["factcheck.afp.com"]
+        self.assertEqual(afp["sources"], ["ifcn", "factcheckinsights"])
+        self.assertEqual(afp["urls"], 3)
+        self.assertEqual(afp["first_seen"], "ifcn.txt:2")
+        self.assertEqual(collector.domains["boomlive.in"]["first_seen"], "fci.json[1]")
+        # "com" and "co.uk" are public suffixes
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(stats["claim_reviews"], 5)
+        self.assertEqual(stats["urls"], 10)
+
+    def test_worker_pool_matches_serial(self):
+        serial, _ = merge_datasets.build([self.ifcn], [self.fci], [self.curated])
+        pooled, _ = merge_datasets.build([self.ifcn], [self.fci], [self.curated], workers=2, batch_size=1)
+        self.assertEqual(pooled.domains, serial.domains)
+
+    def test_writes_registry_json_and_provenance(self):
+        collector, _ = merge_datasets.build([self.ifcn], [self.fci], [self.curated])
+        paths = merge_datasets.write_outputs(collector, self.tmp.name)
+        registry = MappedRegistry(paths["registry"])
+        self.assertEqual(sorted(registry), ["aap.com.au", "boomlive.in", "factcheck.afp.com", "snopes.com"])
+        self.assertEqual(registry.flags("snopes.com"), SOURCE_FLAGS["ifcn"] | SOURCE_FLAGS["factcheckinsights"])
+        with open(paths["json"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f), sorted(registry))
+        with open(paths["provenance"], encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["aap.com.au"], {"sources": ["curated"], "urls": 1, "first_seen": "curated.json[0]"})
+
+    def test_registry_is_readable_by_the_service_user(self):
+        collector, _ = merge_datasets.build([self.ifcn], [], [])
+        paths = merge_datasets.write_outputs(collector, self.tmp.name)
+        self.assertEqual(stat.S_IMODE(os.stat(paths["registry"]).st_mode), 0o644)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+import sys
+import os
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model_gateway import GeminiGateway, ModelCallTimeout
+
+
+class _FakeModels:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def generate_content(self, model, contents, config):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return {"model": model, "contents": contents}
+        finally:
+            self.active -= 1
+
+
+class _FakeClient:
+    """Mimics the `client.aio.models` shape of google-genai."""
+    def __init__(self, delay: float = 0.01):
+        self.models = _FakeModels(delay)
+        self.aio = self
+
+
+class TestGeminiGateway(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrency_is_bounded(self):
+        """No more than max_concurrency calls reach the client at once."""
+        client = _FakeClient(delay=0.02)
+        gateway = GeminiGateway(max_concurrency=3, call_timeout=5)
+
+        results = await asyncio.gather(*[
+            gateway.generate_content(client, "m", [f"part {i}"], None) for i in range(10)
+        ])
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(client.models.peak, 3)
+        self.assertEqual(gateway.in_flight, 0)
+
+    async def test_timeout_raises_and_releases_slot(self):
+        """A call past its budget raises ModelCallTimeout and frees the gate."""
+        client = _FakeClient(delay=1.0)
+        gateway = GeminiGateway(max_concurrency=1, call_timeout=5)
+
+        with self.assertRaises(ModelCallTimeout):
+            await gateway.generate_content(client, "m", [], None, timeout=0.01)
+
+        client.models.delay = 0.0
+        result = await gateway.generate_content(client, "m", ["ok"], None)
+        self.assertEqual(result["contents"], ["ok"])
+        self.assertEqual(gateway.in_flight, 0)
+
+if __name__ == '__main__':
+    unittest.main()
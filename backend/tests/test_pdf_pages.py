@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pdf_pages import PYPDF_AVAILABLE, PdfPageSelector, claim_keywords, describe_selection, score_pages, select_pdf_pages
+
+FILLER = "Quarterly operations summary covering logistics staffing facilities and general administration. " * 4
+
+
+def _make_pdf(page_texts):
+    """Minimal text PDF, one Helvetica line per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 8 Tf 20 700 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+class TestScoring(unittest.TestCase):
+    def test_keywords_drop_stopwords_and_duplicates(self):
+        self.assertEqual(claim_keywords("The vaccine caused the outbreak, the report says vaccine"),
+                         ["vaccine", "caused", "outbreak"])
+
+    def test_rare_terms_outweigh_running_headers(self):
+        pages = ["acme annual report revenue", "acme annual report vaccine trial results", "acme annual report staff"]
+        scores = score_pages(pages, ["acme", "vaccine"])
+        self.assertEqual(max(range(3), key=lambda i: scores[i]), 1)
+        self.assertLess(scores[0] * 5, scores[1])
+
+
+@unittest.skipIf(not PYPDF_AVAILABLE, "pypdf is not installed")
+class TestSelectPdfPages(unittest.TestCase):
+    def setUp(self):
+        texts = [FILLER] * 20
+        texts[4] = "Phase three vaccine trial enrolled volunteers in Selangor. " + FILLER
+        texts[15] = "Vaccine trial adverse events were reviewed by the ministry. " + FILLER
+        self.pdf = _make_pdf(texts)
+
+    def test_keeps_matching_pages_in_document_order(self):
+        selection = select_pdf_pages(self.pdf, "Selangor vaccine trial was halted", max_pages=3, min_pages=5)
+        self.assertEqual(selection.pages, [5, 16])
+        self.assertEqual(selection.mime_type, "application/pdf")
+        self.assertEqual(selection.pages_dropped, 18)
+        from pypdf import PdfReader
+        self.assertEqual(len(PdfReader(io.BytesIO(selection.data)).pages), 2)
+        self.assertEqual(describe_selection(selection), "pages 5, 16 of 20, selected for relevance to the claim")
+
+    def test_text_mode_sends_page_text(self):
+        selection = select_pdf_pages(self.pdf, "Selangor vaccine", max_pages=1, min_pages=5, mode="text")
+        self.assertEqual(selection.mime_type, "text/plain")
+        self.assertIn(b"--- Page 5 of 20 ---", selection.data)
+
+    def test_falls_back_to_whole_document(self):
+        cases = {
+            "short": (self.pdf, "vaccine trial", 30),
+            "no_match": (self.pdf, "cryptocurrency scam", 5),
+            "no_keywords": (self.pdf, "the and of", 5),
+            "error": (b"%PDF-1.4 truncated", "vaccine", 5),
+        }
+        for reason, (data, claim, min_pages) in cases.items():
+            with self.subTest(reason=reason):
+                selection = select_pdf_pages(data, claim, max_pages=3, min_pages=min_pages)
+                self.assertFalse(selection.trimmed)
+                self.assertIs(selection.data, data)
+                self.assertEqual(selection.reason, reason)
+
+
+@unittest.skipIf(not PYPDF_AVAILABLE, "pypdf is not installed")
+class TestPdfPageSelector(unittest.IsolatedAsyncioTestCase):
+    async def test_select_all_runs_in_process_pool(self):
+        selector = PdfPageSelector(max_pages=2, min_pages=5, workers=1, enabled=True)
+        short = _make_pdf(["vaccine"] * 3)
+        try:
+            selections = await selector.select_all([short, _make_pdf([FILLER] * 9 + ["vaccine " + FILLER])], "vaccine")
+        finally:
+            selector.shutdown()
+        self.assertFalse(selections[0].trimmed)
+        self.assertEqual(selections[1].pages, [10])
+
+    async def test_disabled_returns_documents_whole(self):
+        selector = PdfPageSelector(enabled=False)
+        selections = await selector.select_all([b"%PDF"], "vaccine")
+        self.assertEqual(selections[0].data, b"%PDF")
+        self.assertIsNone(selector._executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+
+import main
+from pipeline_metrics import PipelineMetrics, start_request_timing, server_timing_header
+
+
+class TestPipelineMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = PipelineMetrics(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 0.5, 3.0):
+            metrics.observe("gemini_call", seconds)
+
+        text = metrics.render()
+        self.assertIn('veriscan_stage_duration_seconds_bucket{stage="gemini_call",le="0.1"} 1', text)
+        self.assertIn('veriscan_stage_duration_seconds_bucket{stage="gemini_call",le="1"} 3', text)
+        self.assertIn('veriscan_stage_duration_seconds_bucket{stage="gemini_call",le="+Inf"} 4', text)
+        self.assertIn('veriscan_stage_duration_seconds_count{stage="gemini_call"} 4', text)
+        self.assertIn('veriscan_stage_duration_seconds_sum{stage="gemini_call"} 4.05', text)
+
+    def test_counters_with_labels_and_gauges(self):
+        metrics = PipelineMetrics()
+        metrics.describe_counter("json_parse_failures_total", "Unparseable model responses.")
+        metrics.inc("gemini_retries_total", reason="rate_limit")
+        metrics.inc("gemini_retries_total", reason="rate_limit")
+        metrics.inc("gemini_retries_total", reason="json_parse")
+        metrics.register_gauge("gemini_in_flight", "In flight.", lambda: 3)
+
+        text = metrics.render()
+        self.assertEqual(metrics.counter_value("gemini_retries_total", reason="rate_limit"), 2)
+        self.assertIn('veriscan_gemini_retries_total{reason="json_parse"} 1', text)
+        # Declared counters are exported at zero before the first increment
+        self.assertIn("# TYPE veriscan_json_parse_failures_total counter\nveriscan_json_parse_failures_total 0", text)
+        self.assertIn("veriscan_gemini_in_flight 3", text)
+
+    def test_span_records_on_error(self):
+        metrics = PipelineMetrics()
+        with self.assertRaises(ValueError):
+            with metrics.span("json_parse"):
+                raise ValueError("broken")
+        self.assertEqual(metrics.stage_count("json_parse"), 1)
+
+    def test_request_timings_follow_child_tasks(self):
+        metrics = PipelineMetrics()
+
+        async def handler():
+            timings = start_request_timing()
+
+            async def stage():
+                metrics.observe("url_fetch", 0.010)
+
+            await asyncio.gather(asyncio.create_task(stage()), asyncio.create_task(stage()))
+            metrics.observe("gemini_call", 1.5)
+            return timings
+
+        timings = asyncio.run(handler())
+        self.assertEqual(
+            server_timing_header(timings, total=1.6),
+            "url_fetch;dur=20.0, gemini_call;dur=1500.0, total;dur=1600.0"
+        )
+
+
+class TestOpsEndpoints(unittest.TestCase):
+    PATHS = ("/metrics", "/forensics/stats", "/cache/stats")
+
+    def setUp(self):
+        self.client = TestClient(main.app)
+
+    def test_hidden_without_configured_token(self):
+        with mock.patch.object(main, "OPS_TOKEN", ""):
+            for path in self.PATHS:
+                with self.subTest(path=path):
+                    self.assertEqual(self.client.get(path).status_code, 404)
+
+    def test_token_is_required(self):
+        with mock.patch.object(main, "OPS_TOKEN", "s3cret"):
+            for path in self.PATHS:
+                with self.subTest(path=path):
+                    self.assertEqual(self.client.get(path).status_code, 401)
+                    self.assertEqual(self.client.get(path, headers={"Authorization": "Bearer wrong"}).status_code, 403)
+                    self.assertEqual(self.client.get(path, headers={"X-Ops-Token": "wrong"}).status_code, 403)
+            self.assertIn("veriscan_", self.client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).text)
+            self.assertEqual(self.client.get("/forensics/stats", headers={"X-Ops-Token": "s3cret"}).status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rate_limiter import AdaptiveRateLimiter, RateLimitTimeout, backoff_delay, is_rate_limit_error
+
+
+class _QuotaError(Exception):
+    code = 429
+
+
+class TestAdaptiveRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_burst_then_paced_in_arrival_order(self):
+        limiter = AdaptiveRateLimiter(rate=20, burst=2, min_rate=1, max_rate=20)
+        order = []
+
+        async def caller(i):
+            await limiter.acquire()
+            order.append(i)
+
+        started = time.monotonic()
+        await asyncio.gather(*(caller(i) for i in range(6)))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(order, list(range(6)))
+        # Two burst tokens, then four more at 20/s
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertEqual(limiter.stats["waited"], 4)
+        self.assertEqual(limiter.queue_depth, 0)
+
+    async def test_deadline_rejects_instead_of_queueing(self):
+        limiter = AdaptiveRateLimiter(rate=1, burst=1, min_rate=0.5)
+        await limiter.acquire()
+        with self.assertRaises(RateLimitTimeout):
+            await limiter.acquire(deadline=time.monotonic() + 0.2)
+        self.assertEqual(limiter.stats["rejected"], 1)
+
+    async def test_cancelled_waiter_returns_its_token(self):
+        limiter = AdaptiveRateLimiter(rate=5, burst=1, min_rate=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        self.assertEqual(limiter.queue_depth, 1)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(limiter.queue_depth, 0)
+        # The refunded token means the next caller waits one slot, not two
+        self.assertLess(await limiter.acquire(), 0.25)
+
+    async def test_rate_adapts_to_throttling(self):
+        limiter = AdaptiveRateLimiter(rate=8, burst=4, min_rate=1, max_rate=10, increase_step=0.5, decrease_cooldown=60)
+        limiter.on_throttled()
+        # A second 429 from a call already in flight must not halve the rate again
+        limiter.on_throttled()
+        self.assertEqual(limiter.rate, 4)
+        self.assertEqual(limiter.stats["throttled"], 1)
+        for _ in range(20):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 10)
+
+
+class TestBackoffHelpers(unittest.TestCase):
+    def test_backoff_is_jittered_and_capped(self):
+        delays = [backoff_delay(attempt, base=1, cap=4) for attempt in (1, 2, 3, 8) for _ in range(50)]
+        self.assertTrue(all(0 <= d <= 4 for d in delays))
+        self.assertGreater(len(set(delays)), 100)
+        self.assertTrue(all(backoff_delay(1, base=1, cap=4) <= 1 for _ in range(50)))
+
+    def test_rate_limit_detection(self):
+        self.assertTrue(is_rate_limit_error(_QuotaError("quota")))
+        self.assertTrue(is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED")))
+        self.assertFalse(is_rate_limit_error(ValueError("bad request")))
+
+if __name__ == '__main__':
+    unittest.main()
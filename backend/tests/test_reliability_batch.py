@@ -0,0 +1,116 @@
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import reliability_batch
+from logic import calculate_reliability
+from reliability_batch import NUMPY_AVAILABLE, SUMMARY_FIELDS, _score_shard, calculate_reliability_batch
+
+DOMAINS = ["afp.com", "reuters.com", "cdc.gov", "en.wikipedia.org", "x.com", "report.pdf", "example.com",
+           "blog.example.net", "unknown", ""]
+CONFIDENCES = [0.0, 0.1, 0.35, 0.5, 0.7, 0.7, 0.9, 0.95, 1.0, 1]
+
+
+def random_response(rng: random.Random) -> dict:
+    chunks = []
+    for i in range(rng.randint(0, 8)):
+        domain = rng.choice(DOMAINS)
+        uri = f"file://{domain}" if domain.endswith(".pdf") else f"https://{domain or 'site'}/a/{i}"
+        if rng.random() < 0.3:
+            chunks.append(SimpleNamespace(web=SimpleNamespace(domain=domain, uri=uri, title=f"Title {i}")))
+        else:
+            chunks.append({"domain": domain, "uri": uri, "title": f"Title {i}"})
+    supports = []
+    for s in range(rng.choice([0, 1, 2, 3, 5, 12])):
+        indices = [rng.randint(-1, len(chunks)) for _ in range(rng.randint(0, 5))]
+        confidences = [rng.choice(CONFIDENCES) for _ in range(rng.randint(0, len(indices)))]
+        if rng.random() < 0.5:
+            supports.append({"segment": {"text": f"Segment {s}"}, "groundingChunkIndices": indices, "confidenceScores": confidences})
+        else:
+            supports.append({"segment": {"text": f"Segment {s}"}, "grounding_chunk_indices": indices, "confidence_scores": confidences})
+    citations = [{"url": c["uri"] if isinstance(c, dict) else c.web.uri, "snippet": f"Snippet {i}"}
+                 for i, c in enumerate(chunks) if rng.random() < 0.5]
+    return {
+        "grounding_supports": supports,
+        "grounding_chunks": chunks,
+        "grounding_citations": citations,
+        "is_multimodal_verified": rng.random() < 0.3,
+        "ai_confidence": rng.random(),
+    }
+
+
+def single(response: dict) -> dict:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return calculate_reliability(response["grounding_supports"], response["grounding_chunks"], response["grounding_citations"],
+                                     response["is_multimodal_verified"], ai_confidence=response["ai_confidence"])
+
+
+class TestReliabilityBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(7)
+        cls.responses = [random_response(rng) for _ in range(400)]
+        cls.expected = [single(response) for response in cls.responses]
+
+    def test_python_reduction_matches_single_scoring(self):
+        self.assertEqual(_score_shard(self.responses, True, use_numpy=False), self.expected)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "numpy not installed")
+    def test_numpy_reduction_matches_single_scoring(self):
+        self.assertEqual(_score_shard(self.responses, True, use_numpy=True), self.expected)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "numpy not installed")
+    def test_long_responses_sum_left_to_right(self):
+        # Pairwise summation would differ from the scalar loop in the last bits here
+        rng = random.Random(3)
+        chunks = [{"domain": rng.choice(DOMAINS[:7]), "uri": f"https://s/{i}"} for i in range(40)]
+        supports = [{"groundingChunkIndices": [rng.randrange(40)], "confidenceScores": [rng.random()]} for _ in range(300)]
+        response = {"grounding_supports": supports, "grounding_chunks": chunks, "grounding_citations": [],
+                    "is_multimodal_verified": False, "ai_confidence": 0.0}
+        self.assertEqual(_score_shard([response], True, use_numpy=True), [single(response)])
+
+    def test_summary_is_the_scalar_part(self):
+        summary = calculate_reliability_batch(self.responses, detail=False, workers=1, shard_size=64)
+        self.assertEqual(summary, [{field: result[field] for field in SUMMARY_FIELDS} for result in self.expected])
+
+    def test_process_pool_keeps_order(self):
+        self.assertEqual(calculate_reliability_batch(self.responses, workers=2, shard_size=50), self.expected)
+
+    def test_tier_table_authority(self):
+        table = {"default_score": 0.5, "tiers": [{"name": "wire", "score": 1.0, "domains": ["example.com"]}]}
+        response = {"grounding_supports": [{"groundingChunkIndices": [0, 1], "confidenceScores": [0.8, 0.9]}],
+                    "grounding_chunks": [{"domain": "example.com"}, {"domain": "cdc.gov"}]}
+        result, = calculate_reliability_batch([response], authority=table, workers=1)
+        self.assertEqual(result["segments"][0]["top_source_domain"], "example.com")
+        self.assertEqual(result["base_grounding"], 0.8)
+        self.assertIs(reliability_batch.resolve_authority(dict(table)), reliability_batch.resolve_authority(table))
+
+    def test_shard_without_positive_scores(self):
+        response = {"grounding_supports": [{"groundingChunkIndices": [0], "confidenceScores": [0.0]}],
+                    "grounding_chunks": [{"domain": "afp.com"}], "grounding_citations": [],
+                    "is_multimodal_verified": False, "ai_confidence": 0.0}
+        for use_numpy in (False, NUMPY_AVAILABLE):
+            self.assertEqual(_score_shard([response], True, use_numpy=use_numpy), [single(response)])
+
+    def test_strategies_match_separate_runs(self):
+        table = {"default_score": 0.9, "tiers": [{"name": "social_media", "score": 0.1, "domains": ["x.com"]}]}
+        results = reliability_batch.calculate_reliability_strategies(self.responses, {"live": None, "alt": table})
+        self.assertEqual(results["live"], calculate_reliability_batch(self.responses, detail=False, workers=1))
+        self.assertEqual(results["alt"], calculate_reliability_batch(self.responses, detail=False, authority=table, workers=1))
+
+    def test_empty_inputs(self):
+        self.assertEqual(calculate_reliability_batch([]), [])
+        result, = calculate_reliability_batch([{"grounding_supports": [], "ai_confidence": 0.4}], workers=1)
+        self.assertEqual(result["verdict_label"], "Unverified / No Data")
+        self.assertEqual(result["ai_confidence"], 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
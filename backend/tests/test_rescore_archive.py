@@ -0,0 +1,139 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import rescore_archive
+from rescore_archive import BASELINE, plan_shards, replay_input, rescore, resolve_strategy
+from result_cache import AnalysisCache
+from test_reliability_batch import random_response, single
+
+# Everything not listed scores 1.0, so no strategy result can drop below the baseline
+GENEROUS = {"default_score": 1.0, "tiers": [{"name": "social_media", "score": 0.4, "domains": ["x.com"]}]}
+# Only used through module:attribute specs
+FLAT_TABLE = {"default_score": 0.5, "tiers": []}
+
+
+def stored_payload(response: dict) -> dict:
+    """What the analysis cache keeps for a response: no raw chunks, just supports, citations and the audit."""
+    return json.loads(json.dumps({
+        "verdict": "TRUE",
+        "confidence_score": response["ai_confidence"],
+        "multimodal_cross_check": response["is_multimodal_verified"],
+        "grounding_supports": response["grounding_supports"],
+        "grounding_citations": response["grounding_citations"],
+        "reliability_metrics": single(response),
+    }))
+
+
+class TestReplay(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(11)
+        cls.responses = [random_response(rng) for _ in range(300)]
+        cls.payloads = [stored_payload(response) for response in cls.responses]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_jsonl(self, records) -> str:
+        path = os.path.join(self.tmp.name, "archive.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return path
+
+    def test_stored_payloads_replay_to_their_scores(self):
+        for payload in self.payloads:
+            inputs = replay_input(payload)
+            self.assertEqual(single(inputs)["reliability_score"], payload["reliability_metrics"]["reliability_score"])
+
+    def test_raw_grounding_metadata(self):
+        response = self.responses[3]
+        chunks = [{"web": {"domain": c.web.domain, "uri": c.web.uri, "title": c.web.title}} if isinstance(c, SimpleNamespace) else c
+                  for c in response["grounding_chunks"]]
+        inputs = replay_input({"grounding_chunks": chunks, "grounding_supports": response["grounding_supports"],
+                               "grounding_citations": response["grounding_citations"],
+                               "multimodal_cross_check": response["is_multimodal_verified"], "confidence_score": response["ai_confidence"]})
+        self.assertEqual(single(inputs), single(response))
+        self.assertIsNone(replay_input({"verdict": "TRUE"}))
+        self.assertIsNone(replay_input("not a record"))
+
+    def test_baseline_reproduces_and_identical_strategy_does_not_shift(self):
+        path = self.write_jsonl(self.payloads + [{"job_id": "x", "result": self.payloads[0]}])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("{truncated\n")
+        report = rescore([path], {BASELINE: "current", "same": "current"}, batch_size=64).summary()
+        self.assertEqual(report["records_read"], 302)
+        self.assertEqual(report["records_skipped"], 1)
+        self.assertEqual(report["stored_scores_reproduced"], 301)
+        same = report["strategies"]["same"]
+        self.assertEqual((same["unchanged"], same["verdict_changed"]), (301, 0))
+
+    def test_strategy_shift_distribution(self):
+        path = self.write_jsonl(self.payloads)
+        table = os.path.join(self.tmp.name, "generous.json")
+        with open(table, "w", encoding="utf-8") as f:
+            json.dump(GENEROUS, f)
+        report = rescore([path], {BASELINE: "current", "generous": table, "flat": "test_rescore_archive:FLAT_TABLE"}).summary()
+        generous = report["strategies"]["generous"]
+        self.assertEqual(generous["lowered"], 0)
+        self.assertGreater(generous["raised"], 0)
+        self.assertGreater(generous["mean_shift"], 0)
+        self.assertEqual(sum(generous["shift_histogram"].values()), 300)
+        self.assertEqual(generous["verdict_changed"], sum(generous["verdict_transitions"].values()))
+        self.assertLessEqual(generous["shift_percentiles"]["p5"], generous["shift_percentiles"]["p95"])
+        flat = report["strategies"]["flat"]
+        self.assertEqual(flat["records"], 300)
+        self.assertTrue(set(flat["verdict_labels"]) <= {"Low (Unverified)", "Medium (Mixed/Uncertain)", "Unverified / No Data"})
+
+    def test_byte_range_shards_read_every_line_once(self):
+        path = self.write_jsonl(self.payloads)
+        shards = plan_shards([path], shard_bytes=4096)
+        self.assertGreater(len(shards), 10)
+        self.assertEqual(sum(1 for shard in shards for _ in rescore_archive.read_shard(shard)), 300)
+        pooled = rescore([path], {BASELINE: "current", "same": "current"}, workers=2, shard_bytes=4096).summary()
+        serial = rescore([path], {BASELINE: "current", "same": "current"}).summary()
+        # Means are summed per shard first, so only they may differ, in the last bits
+        for name in serial["strategies"]:
+            self.assertAlmostEqual(pooled["strategies"][name].pop("mean_score"), serial["strategies"][name].pop("mean_score"), places=12)
+        self.assertEqual(pooled, serial)
+
+    def test_analysis_cache_database(self):
+        db_path = os.path.join(self.tmp.name, "analysis_cache.db")
+        cache = AnalysisCache(db_path=db_path)
+        for i, payload in enumerate(self.payloads[:50]):
+            cache.set(f"key{i}", payload)
+        cache._conn.close()
+        shards = plan_shards([self.tmp.name], shard_rows=7)
+        self.assertEqual(len(shards), 8)
+        report = rescore([db_path], {BASELINE: "current"}, shard_rows=7).summary()
+        self.assertEqual((report["records_read"], report["stored_scores_reproduced"]), (50, 50))
+
+    def test_strategy_specs(self):
+        self.assertIsNone(resolve_strategy("current"))
+        self.assertEqual(resolve_strategy("test_rescore_archive:FLAT_TABLE"), FLAT_TABLE)
+        self.assertTrue(hasattr(resolve_strategy("logic:get_authority_index"), "lookup"))
+        with self.assertRaises(ValueError):
+            resolve_strategy("not-a-spec")
+        with self.assertRaises(ValueError):
+            resolve_strategy("rescore_archive:RESOLUTION")
+
+    def test_percentiles(self):
+        counter = rescore_archive.Counter({0.0: 90, 0.1: 9, 0.5: 1})
+        self.assertEqual(rescore_archive._percentiles(counter),
+                         {"p1": 0.0, "p5": 0.0, "p25": 0.0, "p50": 0.0, "p75": 0.0, "p95": 0.1, "p99": 0.1})
+
+
+if __name__ == '__main__':
+    unittest.main()
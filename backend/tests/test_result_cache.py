@@ -0,0 +1,135 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from result_cache import AnalysisCache, make_cache_key
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_claim_normalization(self):
+        """Case and whitespace differences map to the same key."""
+        a = make_cache_key("The Earth is  round", [], [], "m", "p")
+        b = make_cache_key("  the earth is round ", [], [], "m", "p")
+        self.assertEqual(a, b)
+
+    def test_inputs_change_key(self):
+        base = make_cache_key("claim", ["aa"], ["https://a.com"], "m", "p")
+        self.assertEqual(base, make_cache_key("claim", ["aa"], ["https://a.com"], "m", "p"))
+        self.assertNotEqual(base, make_cache_key("claim", ["bb"], ["https://a.com"], "m", "p"))
+        self.assertNotEqual(base, make_cache_key("claim", ["aa"], ["https://b.com"], "m", "p"))
+        self.assertNotEqual(base, make_cache_key("claim", ["aa"], ["https://a.com"], "m2", "p"))
+        self.assertNotEqual(base, make_cache_key("claim", ["aa"], ["https://a.com"], "m", "p2"))
+
+    def test_file_order_is_irrelevant(self):
+        self.assertEqual(
+            make_cache_key("c", ["aa", "bb"], [], "m", "p"),
+            make_cache_key("c", ["bb", "aa"], [], "m", "p"),
+        )
+
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_memory_then_disk_hit(self):
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60)
+        cache.set("k", {"verdict": "TRUE"})
+        self.assertEqual(cache.get("k"), {"verdict": "TRUE"})
+
+        # A fresh instance only has the persistent tier
+        reopened = AnalysisCache(db_path=self.db_path, ttl_sec=60)
+        self.assertEqual(reopened.get("k"), {"verdict": "TRUE"})
+        self.assertEqual(reopened.stats()["disk_hits"], 1)
+        self.assertEqual(reopened.get("k"), {"verdict": "TRUE"})
+        self.assertEqual(reopened.stats()["memory_hits"], 1)
+
+    def test_miss_and_ttl_expiry(self):
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=0.05)
+        self.assertIsNone(cache.get("absent"))
+        cache.set("k", {"verdict": "FALSE"})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+        stats = cache.stats()
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["disk_entries"], 0)
+
+    def test_memory_lru_eviction(self):
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60, max_memory_entries=2)
+        cache.set("a", {"n": 1})
+        cache.set("b", {"n": 2})
+        cache.get("a")
+        cache.set("c", {"n": 3})
+        stats = cache.stats()
+        self.assertEqual(stats["memory_entries"], 2)
+        # "b" was least recently used, so it now comes from disk
+        cache.get("b")
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_disk_byte_budget(self):
+        payload = {"analysis": "x" * 400}
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60, max_disk_bytes=1000)
+        for i in range(5):
+            cache.set(f"k{i}", payload)
+        stats = cache.stats()
+        self.assertLessEqual(stats["disk_bytes"], 1000)
+        self.assertEqual(stats["disk_entries"], 2)
+
+    def test_disk_hits_defer_access_updates(self):
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60, touch_batch=3, touch_flush_sec=3600)
+        for key in ("a", "b", "c"):
+            cache.set(key, {"k": key})
+        reader = AnalysisCache(db_path=self.db_path, ttl_sec=60, touch_batch=3, touch_flush_sec=3600)
+        last_access = lambda: dict(reader._conn.execute("SELECT cache_key, last_access FROM analysis_cache").fetchall())
+        before = last_access()
+        reader.get("a")
+        reader.get("b")
+        self.assertEqual(reader.stats()["pending_touches"], 2)
+        self.assertEqual(last_access(), before)
+        reader.get("c")
+        self.assertEqual(reader.stats()["pending_touches"], 0)
+        self.assertTrue(all(after > before[key] for key, after in last_access().items()))
+
+    def test_eviction_sees_deferred_touches(self):
+        payload = {"analysis": "x" * 400}
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60, max_memory_entries=1, max_disk_bytes=1000, touch_flush_sec=3600)
+        cache.set("old", payload)
+        cache.set("new", payload)
+        # Only a queued touch says "old" is now the most recently used
+        cache.get("old")
+        cache.set("newest", payload)
+        self.assertIsNone(cache._conn.execute("SELECT 1 FROM analysis_cache WHERE cache_key = 'new'").fetchone())
+        self.assertIsNotNone(cache._conn.execute("SELECT 1 FROM analysis_cache WHERE cache_key = 'old'").fetchone())
+
+    def test_disk_byte_total_tracks_replacements(self):
+        cache = AnalysisCache(db_path=self.db_path, ttl_sec=60)
+        cache.set("k", {"analysis": "x" * 100})
+        cache.set("k", {"analysis": "x" * 10})
+        cache.close()
+        reopened = AnalysisCache(db_path=self.db_path, ttl_sec=60)
+        self.assertEqual(reopened.stats()["disk_bytes"], len('{"analysis": "xxxxxxxxxx"}'))
+
+
+class TestAnalysisCacheAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_async_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AnalysisCache(db_path=os.path.join(tmp, "cache.db"), ttl_sec=60)
+            await cache.set_async("k", {"verdict": "TRUE"})
+            self.assertEqual(await cache.get_async("k"), {"verdict": "TRUE"})
+            reopened = AnalysisCache(db_path=os.path.join(tmp, "cache.db"), ttl_sec=60)
+            self.assertEqual(await reopened.get_async("k"), {"verdict": "TRUE"})
+            self.assertIsNone(await reopened.get_async("absent"))
+            self.assertEqual((reopened.stats()["disk_hits"], reopened.stats()["misses"]), (1, 1))
+            cache.close()
+            reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
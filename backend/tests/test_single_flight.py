@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_duplicates_share_one_call(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return "verdict"
+
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(5)])
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [("verdict", 4)] * 5)
+        self.assertEqual(flights.stats["leaders"], 1)
+        self.assertEqual(flights.stats["merged"], 4)
+        self.assertEqual(flights.in_flight(), 0)
+
+    async def test_leader_error_reaches_all_and_next_call_retries(self):
+        flights = SingleFlight()
+        attempts = 0
+
+        async def failing():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("quota")
+
+        results = await asyncio.gather(*[flights.do("k", failing) for _ in range(3)], return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(attempts, 1)
+        self.assertEqual(flights.stats["errors"], 1)
+
+        async def ok():
+            return "fresh"
+
+        self.assertEqual(await flights.do("k", ok), ("fresh", 0))
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        flights = SingleFlight()
+        finished = asyncio.Event()
+
+        async def work():
+            await asyncio.sleep(0.03)
+            finished.set()
+            return "done"
+
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        self.assertEqual(await follower, ("done", 1))
+        self.assertTrue(finished.is_set())
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+
+    async def test_work_cancelled_when_every_caller_leaves(self):
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.create_task(flights.do("k", work))
+        await started.wait()
+        caller.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+        self.assertTrue(cancelled.is_set())
+        self.assertEqual(flights.stats["cancelled"], 1)
+        self.assertEqual(flights.in_flight(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
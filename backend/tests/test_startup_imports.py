@@ -0,0 +1,39 @@
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from profile_startup import DEFERRED_MODULES, by_package, deferred_violations, parse_importtime, profile_import
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      4000 |       9000 | google.genai.types
+import time:      5000 |       5000 |   google.genai
+import time:       300 |      14300 | main
+"""
+
+
+class TestImportTimeParsing(unittest.TestCase):
+    def test_parses_rows_and_skips_header(self):
+        rows = parse_importtime(SAMPLE)
+        self.assertEqual(rows[0], ("_io", 120, 120))
+        self.assertEqual(rows[-1], ("main", 300, 14300))
+        self.assertEqual(len(rows), 4)
+
+    def test_groups_self_time_by_top_level_package(self):
+        self.assertEqual(by_package(parse_importtime(SAMPLE))["google"], 9000)
+
+    def test_reports_deferred_modules_loaded_at_startup(self):
+        self.assertEqual(deferred_violations(parse_importtime(SAMPLE)), ["google.genai"])
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_main_does_not_import_heavy_sdks(self):
+        rows = profile_import("main")
+        self.assertEqual(deferred_violations(rows, DEFERRED_MODULES), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from stream_parser import StreamingAnalysisParser
+
+
+def _feed_in_chunks(text, size):
+    parser = StreamingAnalysisParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+class TestStreamingAnalysisParser(unittest.TestCase):
+    def setUp(self):
+        self.analysis = '**1. The Core Claim(s):**\nA "quoted" claim °C \\ done.'
+        self.payload = json.dumps({
+            "verdict": "mostly_true",
+            "confidence_score": 0.75,
+            "analysis": self.analysis,
+            "multimodal_cross_check": False,
+        })
+
+    def test_verdict_emitted_first_and_once(self):
+        for size in (1, 3, 16, len(self.payload)):
+            _, events = _feed_in_chunks(self.payload, size)
+            self.assertEqual(events[0], ("verdict", {"verdict": "MOSTLY_TRUE", "confidence_score": 0.75}))
+            self.assertEqual(sum(1 for name, _ in events if name == "verdict"), 1)
+
+    def test_analysis_deltas_rebuild_decoded_text(self):
+        # Chunk sizes of 1 and 5 split escape sequences across feeds
+        for size in (1, 5, 64):
+            parser, events = _feed_in_chunks(self.payload, size)
+            deltas = "".join(payload["delta"] for name, payload in events if name == "analysis")
+            self.assertEqual(deltas, self.analysis)
+            self.assertEqual(parser.analysis_text, self.analysis)
+
+    def test_truncated_confidence_waits_for_delimiter(self):
+        parser = StreamingAnalysisParser()
+        self.assertEqual(parser.feed('{"verdict": "FALSE", "confidence_score": 0.'), [])
+        events = parser.feed('9, "analysis": "x')
+        self.assertEqual(events[0], ("verdict", {"verdict": "FALSE", "confidence_score": 0.9}))
+        self.assertEqual(events[1], ("analysis", {"delta": "x"}))
+
+if __name__ == '__main__':
+    unittest.main()
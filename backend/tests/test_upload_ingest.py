@@ -0,0 +1,112 @@
+import hashlib
+import os
+import sys
+import unittest
+from unittest import mock
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import upload_ingest
+from upload_ingest import UploadBudget, UploadLimitExceeded, read_multipart_upload
+
+
+def _build_client(max_file_bytes, max_total_bytes):
+    async def endpoint(request):
+        try:
+            fields, uploads = await read_multipart_upload(request, UploadBudget(max_file_bytes, max_total_bytes))
+        except UploadLimitExceeded as e:
+            return JSONResponse({"error": e.detail}, status_code=413)
+        files = []
+        for upload in uploads:
+            data = await upload.read_bytes()
+            files.append({
+                "name": upload.filename, "size": upload.size, "sha256": upload.sha256,
+                "read_sha256": hashlib.sha256(data).hexdigest(), "in_memory": upload.in_memory,
+            })
+            await upload.close()
+        return JSONResponse({"fields": fields, "files": files})
+
+    return TestClient(Starlette(routes=[Route("/upload", endpoint, methods=["POST"])]))
+
+
+class TestUploadIngest(unittest.TestCase):
+    def test_hashes_and_sizes_while_streaming(self):
+        client = _build_client(max_file_bytes=4 * 1024 * 1024, max_total_bytes=8 * 1024 * 1024)
+        small = b"\x89PNG" + os.urandom(1000)
+        large = os.urandom(3 * 1024 * 1024)
+        response = client.post(
+            "/upload",
+            data={"metadata": '{"text_claim": "x"}'},
+            files=[("files", ("a.png", small, "image/png")), ("files", ("b.pdf", large, "application/pdf"))],
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["fields"], {"metadata": '{"text_claim": "x"}'})
+        small_info, large_info = body["files"]
+        self.assertEqual(small_info["sha256"], hashlib.sha256(small).hexdigest())
+        self.assertEqual(large_info["sha256"], large_info["read_sha256"])
+        self.assertEqual(large_info["size"], len(large))
+        self.assertTrue(small_info["in_memory"])
+        self.assertFalse(large_info["in_memory"])
+
+    def test_per_file_and_total_limits_abort(self):
+        client = _build_client(max_file_bytes=1024, max_total_bytes=1500)
+        too_big = client.post("/upload", data={"metadata": "{}"}, files=[("files", ("big.pdf", b"x" * 2048, "application/pdf"))])
+        self.assertEqual(too_big.status_code, 413)
+        self.assertIn("big.pdf", too_big.json()["error"])
+
+        over_total = client.post(
+            "/upload", data={"metadata": "{}"},
+            files=[("files", ("a.png", b"x" * 1000, "image/png")), ("files", ("b.png", b"y" * 1000, "image/png"))],
+        )
+        self.assertEqual(over_total.status_code, 413)
+        self.assertIn("Total payload", over_total.json()["error"])
+
+    def test_spooled_parts_are_closed_when_a_limit_aborts(self):
+        spools = []
+        spool_class = upload_ingest.SpooledTemporaryFile
+
+        def tracking_spool(*args, **kwargs):
+            spools.append(spool_class(*args, **kwargs))
+            return spools[-1]
+
+        client = _build_client(max_file_bytes=1024, max_total_bytes=1500)
+        with mock.patch.object(upload_ingest, "SpooledTemporaryFile", side_effect=tracking_spool):
+            response = client.post(
+                "/upload", data={"metadata": "{}"},
+                files=[("files", ("a.png", b"x" * 1000, "image/png")), ("files", ("b.png", b"y" * 1000, "image/png"))],
+            )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(len(spools), 2)
+        self.assertTrue(all(spool.closed for spool in spools))
+
+    def test_malformed_bodies_are_value_errors(self):
+        async def endpoint(request):
+            try:
+                await read_multipart_upload(request)
+            except ValueError as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+            return JSONResponse({})
+
+        client = TestClient(Starlette(routes=[Route("/upload", endpoint, methods=["POST"])]))
+        no_boundary = client.post("/upload", content=b"--x\r\n", headers={"content-type": "multipart/form-data"})
+        self.assertEqual(no_boundary.status_code, 400)
+        too_many = client.post("/upload", files=[("files", (f"{i}.png", b"x", "image/png")) for i in range(11)])
+        self.assertEqual(too_many.status_code, 400)
+        self.assertIn("Too many files", too_many.json()["error"])
+
+    def test_declared_length_rejected_before_reading(self):
+        budget = UploadBudget(max_file_bytes=1024, max_total_bytes=1024)
+        with self.assertRaises(UploadLimitExceeded):
+            budget.check_declared_length(10 * 1024 * 1024)
+        budget.check_declared_length(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
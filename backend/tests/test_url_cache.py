@@ -0,0 +1,150 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from url_cache import UrlContentCache, freshness_lifetime
+from url_fetcher import UrlFetcher
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Local origin: /etag revalidates by ETag, /fresh is cacheable, /nostore is not, /broken fails."""
+    hits = {}
+
+    def do_GET(self):
+        _StubHandler.hits[self.path] = _StubHandler.hits.get(self.path, 0) + 1
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            self._send(200, "etag body", {"ETag": '"v1"', "Cache-Control": "no-cache"})
+        elif self.path == "/fresh":
+            self._send(200, "fresh body", {"Cache-Control": "public, max-age=300"})
+        elif self.path == "/nostore":
+            self._send(200, "secret body", {"Cache-Control": "no-store"})
+        else:
+            self._send(500, "boom", {})
+
+    def _send(self, status, body, headers):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFreshnessLifetime(unittest.TestCase):
+    def test_directives(self):
+        self.assertEqual(freshness_lifetime({"cache-control": "max-age=120"}, 900), 120)
+        self.assertEqual(freshness_lifetime({"cache-control": "no-cache"}, 900), 0)
+        self.assertIsNone(freshness_lifetime({"cache-control": "private, no-store"}, 900))
+        self.assertEqual(freshness_lifetime({}, 900), 900)
+        self.assertEqual(freshness_lifetime({
+            "date": "Wed, 21 Oct 2015 07:28:00 GMT",
+            "expires": "Wed, 21 Oct 2015 07:38:00 GMT",
+        }, 900), 600)
+
+
+class TestUrlContentCache(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        _StubHandler.hits = {}
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = UrlContentCache(db_path=os.path.join(self.tmp.name, "urls.db"), negative_ttl_sec=60)
+        self.fetcher = UrlFetcher(cache=self.cache)
+
+    async def asyncTearDown(self):
+        await self.fetcher.aclose()
+        self.tmp.cleanup()
+
+    async def test_max_age_serves_without_network(self):
+        for _ in range(3):
+            self.assertEqual(await self.fetcher.fetch(self.base + "/fresh"), "fresh body")
+        self.assertEqual(_StubHandler.hits["/fresh"], 1)
+        self.assertEqual(self.cache.stats()["fresh_hits"], 2)
+
+    async def test_etag_revalidation(self):
+        self.assertEqual(await self.fetcher.fetch(self.base + "/etag"), "etag body")
+        self.assertEqual(await self.fetcher.fetch(self.base + "/etag"), "etag body")
+        self.assertEqual(_StubHandler.hits["/etag"], 2)
+        stats = self.cache.stats()
+        self.assertEqual(stats["revalidated"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    async def test_no_store_is_not_cached(self):
+        await self.fetcher.fetch(self.base + "/nostore")
+        await self.fetcher.fetch(self.base + "/nostore")
+        self.assertEqual(_StubHandler.hits["/nostore"], 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    async def test_failures_are_negatively_cached(self):
+        url = self.base + "/broken"
+        first = await self.fetcher.fetch(url)
+        second = await self.fetcher.fetch(url)
+        self.assertEqual(first, f"[Error fetching content from {url}]")
+        self.assertEqual(second, first)
+        self.assertEqual(_StubHandler.hits["/broken"], 1)
+        self.assertEqual(self.cache.stats()["negative_hits"], 1)
+
+    async def test_byte_budget_eviction(self):
+        small = UrlContentCache(db_path=os.path.join(self.tmp.name, "small.db"), max_bytes=200)
+        for i in range(5):
+            small.store(f"https://a.example/{i}", "x" * 60, {"cache-control": "max-age=60"})
+        stats = small.stats()
+        self.assertLessEqual(stats["bytes"], 200)
+        self.assertGreater(stats["evictions"], 0)
+        self.assertIsNotNone(small.lookup("https://a.example/4"))
+        self.assertIsNone(small.lookup("https://a.example/0"))
+
+    async def test_age_header_shortens_freshness(self):
+        url = "https://shared.example/page"
+        self.cache.store(url, "body", {"cache-control": "max-age=300", "age": "290", "etag": '"v1"'})
+        remaining = self.cache.lookup(url).expires_at - time.time()
+        self.assertGreater(remaining, 5)
+        self.assertLessEqual(remaining, 10)
+        # Already older than its lifetime when it arrived: stored, but only for revalidation
+        self.cache.store(url, "body", {"cache-control": "max-age=300", "age": "400", "etag": '"v1"'})
+        self.assertFalse(self.cache.lookup(url).is_fresh())
+        self.cache.refresh(url, {"cache-control": "max-age=60", "age": "oops"})
+        self.assertTrue(self.cache.lookup(url).is_fresh())
+
+    async def test_lookups_defer_access_updates(self):
+        cache = UrlContentCache(db_path=os.path.join(self.tmp.name, "touch.db"), touch_batch=2, touch_flush_sec=3600)
+        for i in range(2):
+            cache.store(f"https://a.example/{i}", "text", {"cache-control": "max-age=60"})
+        last_access = lambda: dict(cache._conn.execute("SELECT url, last_access FROM url_cache").fetchall())
+        before = last_access()
+        self.assertIsNotNone(await cache.lookup_async("https://a.example/0"))
+        self.assertEqual(last_access(), before)
+        self.assertEqual(cache.stats()["pending_touches"], 1)
+        await cache.lookup_async("https://a.example/1")
+        self.assertEqual(cache.stats()["pending_touches"], 0)
+        self.assertTrue(all(after > before[url] for url, after in last_access().items()))
+
+if __name__ == '__main__':
+    unittest.main()
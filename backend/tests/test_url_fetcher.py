@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+import httpx
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from url_fetcher import UrlFetcher
+
+
+def _slow_transport(delay: float, body: str = "hello world", status: int = 200):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if "slow" in request.url.path:
+            await asyncio.sleep(10)
+        await asyncio.sleep(delay)
+        return httpx.Response(status, text=body)
+    return httpx.MockTransport(handler)
+
+
+class TestUrlFetcher(unittest.IsolatedAsyncioTestCase):
+    async def test_urls_fetched_concurrently_in_order(self):
+        fetcher = UrlFetcher(transport=_slow_transport(0.1))
+        urls = [f"https://site{i}.example/a" for i in range(5)]
+
+        started = time.perf_counter()
+        results = await fetcher.fetch_all(urls)
+        elapsed = time.perf_counter() - started
+        await fetcher.aclose()
+
+        self.assertEqual(results, ["hello world"] * 5)
+        self.assertLess(elapsed, 0.4)
+
+    async def test_body_cut_at_char_budget(self):
+        fetcher = UrlFetcher(max_chars=10, transport=_slow_transport(0, body="x" * 10000))
+        self.assertEqual(await fetcher.fetch("https://a.example/"), "x" * 10)
+        await fetcher.aclose()
+
+    async def test_deadline_marks_pending_urls(self):
+        fetcher = UrlFetcher(transport=_slow_transport(0))
+        results = await fetcher.fetch_all(["https://a.example/ok", "https://a.example/slow"], deadline=0.2)
+        await fetcher.aclose()
+
+        self.assertEqual(results[0], "hello world")
+        self.assertEqual(results[1], "[Error fetching content from https://a.example/slow]")
+
+    async def test_http_error_returns_marker(self):
+        fetcher = UrlFetcher(transport=_slow_transport(0, status=404))
+        self.assertEqual(await fetcher.fetch("https://a.example/missing"), "[Error fetching content from https://a.example/missing]")
+        await fetcher.aclose()
+
+    async def test_preconnect_sends_head_and_ignores_failures(self):
+        methods = []
+
+        async def handler(request):
+            methods.append(request.method)
+            if request.url.host == "down.example":
+                raise httpx.ConnectError("refused")
+            return httpx.Response(200)
+
+        fetcher = UrlFetcher(transport=httpx.MockTransport(handler))
+        opened = await fetcher.preconnect(["https://a.example/", "https://down.example/"])
+        await fetcher.aclose()
+
+        self.assertEqual(opened, 1)
+        self.assertEqual(methods, ["HEAD", "HEAD"])
+
+    async def test_per_host_limit(self):
+        active = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return httpx.Response(200, text="ok")
+
+        fetcher = UrlFetcher(max_per_host=2, transport=httpx.MockTransport(handler))
+        await fetcher.fetch_all([f"https://same.example/{i}" for i in range(6)])
+        self.assertEqual(peak, 2)
+        # Gates only live while their host has fetches in progress
+        await fetcher.fetch_all([f"https://host{i}.example/" for i in range(50)] + ["https://fail.invalid/x"])
+        self.assertEqual(fetcher._get_state().host_gates, {})
+        await fetcher.aclose()
+
+if __name__ == '__main__':
+    unittest.main()
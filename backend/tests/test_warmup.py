@@ -0,0 +1,89 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# Add parent directory to path so we can import backend modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from warmup import Warmup, WarmupStep
+
+
+class TestWarmup(unittest.IsolatedAsyncioTestCase):
+    async def test_ready_after_all_steps_succeed(self):
+        order = []
+
+        async def step(name):
+            order.append(name)
+            return {"name": name}
+
+        warmup = Warmup([WarmupStep("a", lambda: step("a")), WarmupStep("b", lambda: step("b"))])
+        self.assertFalse(warmup.ready)
+        state = await warmup.run()
+        self.assertTrue(state["ready"])
+        self.assertEqual(order, ["a", "b"])
+        self.assertEqual(state["steps"]["b"]["detail"], {"name": "b"})
+
+    async def test_optional_failure_does_not_block_readiness(self):
+        async def ok():
+            return None
+
+        async def broken():
+            raise RuntimeError("no network")
+
+        warmup = Warmup([WarmupStep("client", ok), WarmupStep("preconnect", broken, required=False)])
+        state = await warmup.run()
+        self.assertTrue(state["ready"])
+        self.assertEqual(state["steps"]["preconnect"]["status"], "failed")
+        self.assertEqual(state["steps"]["preconnect"]["error"], "no network")
+
+    async def test_required_failure_is_retried_by_next_run(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("credentials missing")
+
+        warmup = Warmup([WarmupStep("client", flaky)])
+        self.assertEqual((await warmup.run())["state"], "failed")
+        self.assertEqual((await warmup.run())["state"], "ready")
+        # A finished, successful run is not repeated
+        await warmup.run()
+        self.assertEqual(len(attempts), 2)
+
+    async def test_concurrent_callers_share_one_run(self):
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+
+        warmup = Warmup([WarmupStep("slow", slow)])
+        warmup.start()
+        states = await asyncio.gather(warmup.run(), warmup.run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(state["ready"] for state in states))
+
+    async def test_step_timeout_fails_the_run(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        warmup = Warmup([WarmupStep("hang", hang)], timeout=0.05)
+        state = await warmup.run()
+        self.assertEqual(state["state"], "failed")
+        self.assertIn("timed out", state["steps"]["hang"]["error"])
+
+    async def test_cancel_stops_a_background_run(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        warmup = Warmup([WarmupStep("hang", hang)])
+        warmup.start()
+        await asyncio.sleep(0)
+        await warmup.cancel()
+        self.assertFalse(warmup.ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
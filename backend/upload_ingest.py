@@ -0,0 +1,238 @@
+import hashlib
+import io
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, UploadFile
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13 only ships the old package name
+    from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_TOTAL_BYTES = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", str(20 * 1024 * 1024)))
+# Uploads above this size are spooled to a temp file instead of being held in RAM while parsing
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))
+# Non-file form fields (the metadata JSON) are held in memory and capped separately
+UPLOAD_MAX_FIELD_BYTES = int(os.getenv("UPLOAD_MAX_FIELD_BYTES", str(1024 * 1024)))
+# Headroom for multipart boundaries, part headers and the metadata field
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadLimitExceeded(Exception):
+    """Raised as soon as an upload crosses the per-file or total size limit."""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class UploadBudget:
+    """Tracks bytes received for one request against the per-file and total limits."""
+
+    def __init__(self, max_file_bytes: int = UPLOAD_MAX_FILE_BYTES, max_total_bytes: int = UPLOAD_MAX_TOTAL_BYTES):
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total = 0
+
+    def check_declared_length(self, content_length: Optional[int]):
+        """Rejects a request whose declared body can only be over budget, before reading any of it."""
+        if content_length is not None and content_length > self.max_total_bytes + _MULTIPART_OVERHEAD_BYTES:
+            raise UploadLimitExceeded(f"Total payload size exceeds {self.max_total_bytes // (1024 * 1024)}MB limit.")
+
+    def consume(self, filename: str, file_size: int, chunk_size: int):
+        """Accounts `chunk_size` more bytes of `filename`, which has now reached `file_size`."""
+        self.total += chunk_size
+        if file_size > self.max_file_bytes:
+            raise UploadLimitExceeded(f"File {filename} exceeds {self.max_file_bytes // (1024 * 1024)}MB limit.")
+        if self.total > self.max_total_bytes:
+            raise UploadLimitExceeded(f"Total payload size exceeds {self.max_total_bytes // (1024 * 1024)}MB limit.")
+
+
+class IngestedUpload:
+    """An uploaded file that has been size-checked and hashed while it streamed in."""
+
+    __slots__ = ("filename", "content_type", "size", "sha256", "_upload")
+
+    def __init__(self, filename: str, content_type: str, size: int, sha256: str, upload: UploadFile):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self._upload = upload
+
+    @classmethod
+    def from_bytes(cls, filename: str, content_type: str, data: bytes) -> "IngestedUpload":
+        """Wraps bytes received by other means (a queued job) so they go through the same preparation."""
+        return cls(filename, content_type, len(data), hashlib.sha256(data).hexdigest(),
+                   UploadFile(io.BytesIO(data), size=len(data), filename=filename))
+
+    @property
+    def in_memory(self) -> bool:
+        return self.size <= UPLOAD_SPOOL_THRESHOLD
+
+    async def read_bytes(self) -> bytes:
+        """Reads the spooled upload once into the single bytes object handed to Gemini."""
+        await self._upload.seek(0)
+        return await self._upload.read()
+
+    async def close(self):
+        await self._upload.close()
+
+
+class _Part:
+    __slots__ = ("name", "upload", "data", "size", "digest")
+
+    def __init__(self, name: str, upload: Optional[UploadFile]):
+        self.name = name
+        self.upload = upload
+        self.data = bytearray()
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+
+class _MultipartReader:
+    """
+    Streams multipart/form-data through python-multipart's public callback API, applying the
+    size limits and SHA-256 per chunk and spooling each file as it arrives. Callbacks only
+    record what to write; the writes are awaited between chunks so rolled-over spools do their
+    disk I/O off the event loop.
+    """
+
+    def __init__(self, content_type: str, budget: UploadBudget, max_files: int, max_fields: int = 16,
+                 max_field_bytes: int = UPLOAD_MAX_FIELD_BYTES, spool_max_size: int = UPLOAD_SPOOL_THRESHOLD):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise ValueError("Missing boundary in multipart.")
+        self.budget = budget
+        self.max_files = max_files
+        self.max_fields = max_fields
+        self.max_field_bytes = max_field_bytes
+        self.spool_max_size = spool_max_size
+        self.parts: List[_Part] = []
+        self._files = 0
+        self._fields = 0
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._pending: List[Tuple[UploadFile, bytes]] = []
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+        })
+
+    def _on_part_begin(self):
+        self._headers = []
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers.append((self._header_name.lower(), self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        disposition = dict(self._headers).get(b"content-disposition")
+        if disposition is None:
+            raise ValueError("Missing Content-Disposition header in multipart part.")
+        _, options = parse_options_header(disposition)
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            self._fields += 1
+            if self._fields > self.max_fields:
+                raise ValueError(f"Too many fields. Maximum number of fields is {self.max_fields}.")
+            self.parts.append(_Part(name, None))
+            return
+        self._files += 1
+        if self._files > self.max_files:
+            raise ValueError(f"Too many files. Maximum number of files is {self.max_files}.")
+        upload = UploadFile(
+            SpooledTemporaryFile(max_size=self.spool_max_size),
+            size=0,
+            filename=options[b"filename"].decode("utf-8", "replace"),
+            headers=Headers(raw=self._headers),
+        )
+        self.parts.append(_Part(name, upload))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        part = self.parts[-1]
+        chunk = data[start:end]
+        part.size += len(chunk)
+        if part.upload is None:
+            if part.size > self.max_field_bytes:
+                raise ValueError(f"Form field {part.name} exceeds the {self.max_field_bytes // 1024}KB limit.")
+            part.data += chunk
+            return
+        self.budget.consume(part.upload.filename or "upload", part.size, len(chunk))
+        part.digest.update(chunk)
+        self._pending.append((part.upload, chunk))
+
+    async def parse(self, stream) -> Tuple[Dict[str, str], List[IngestedUpload]]:
+        try:
+            async for chunk in stream:
+                self._parser.write(chunk)
+                for upload, data in self._pending:
+                    await upload.write(data)
+                self._pending.clear()
+            self._parser.finalize()
+        except BaseException:
+            # Over a limit or malformed: nothing will read the parts spooled so far
+            await self.close()
+            raise
+
+        fields: Dict[str, str] = {}
+        uploads: List[IngestedUpload] = []
+        for part in self.parts:
+            if part.upload is None:
+                fields[part.name] = part.data.decode("utf-8", "replace")
+                continue
+            await part.upload.seek(0)
+            uploads.append(IngestedUpload(
+                part.upload.filename or "upload", part.upload.content_type or "application/octet-stream",
+                part.size, part.digest.hexdigest(), part.upload
+            ))
+        return fields, uploads
+
+    async def close(self):
+        for part in self.parts:
+            if part.upload is not None:
+                await part.upload.close()
+
+
+async def read_multipart_upload(
+    request: Request,
+    budget: Optional[UploadBudget] = None,
+    max_files: int = 10,
+) -> Tuple[Dict[str, str], List[IngestedUpload]]:
+    """
+    Streams a multipart request body, aborting as soon as a limit is crossed.
+    Returns (form fields, uploads); file data stays spooled until read_bytes().
+    """
+    budget = budget or UploadBudget()
+    content_length = request.headers.get("content-length")
+    budget.check_declared_length(int(content_length) if content_length and content_length.isdigit() else None)
+
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        # URL-encoded forms (legacy Android client) carry no files
+        form = await request.form()
+        return {name: value for name, value in form.multi_items() if isinstance(value, str)}, []
+
+    # Raises ValueError (python-multipart's parse errors included) for malformed bodies
+    return await _MultipartReader(content_type, budget, max_files).parse(request.stream())
+
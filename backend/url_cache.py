@@ -0,0 +1,289 @@
+import asyncio
+import email.utils
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# On Cloud Run, the filesystem is read-only except for /tmp
+_IS_CLOUD_RUN = os.environ.get('K_SERVICE') is not None
+_DEFAULT_URL_CACHE_PATH = '/tmp/url_cache.db' if _IS_CLOUD_RUN else 'url_cache.db'
+
+URL_CACHE_ENABLED = os.getenv("URL_CACHE_ENABLED", "true").lower() != "false"
+URL_CACHE_PATH = os.getenv("URL_CACHE_PATH", _DEFAULT_URL_CACHE_PATH)
+# Freshness used when a response carries no Cache-Control/Expires information
+URL_CACHE_DEFAULT_TTL_SEC = float(os.getenv("URL_CACHE_DEFAULT_TTL_SEC", "900"))
+# How long a failed fetch is remembered before the URL is tried again
+URL_CACHE_NEGATIVE_TTL_SEC = float(os.getenv("URL_CACHE_NEGATIVE_TTL_SEC", "60"))
+URL_CACHE_MAX_BYTES = int(os.getenv("URL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Lookups only queue their last_access update; queued touches are written in one transaction
+# once this many are pending or the oldest is this old (and always before LRU eviction)
+URL_CACHE_TOUCH_BATCH = int(os.getenv("URL_CACHE_TOUCH_BATCH", "256"))
+URL_CACHE_TOUCH_FLUSH_SEC = float(os.getenv("URL_CACHE_TOUCH_FLUSH_SEC", "30"))
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parses a Cache-Control header into {directive: value-or-None}."""
+    directives = {}
+    for token in (value or "").split(","):
+        token = token.strip()
+        if not token:
+            continue
+        name, _, arg = token.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Mapping[str, str], default_ttl: float = URL_CACHE_DEFAULT_TTL_SEC) -> Optional[float]:
+    """
+    Seconds a response may be served without revalidation.
+    Returns None when the response must not be stored at all.
+    """
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    if directives.get("max-age") is not None:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except ValueError:
+            return 0.0
+    expires = headers.get("expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+            date_header = headers.get("date")
+            served_at = email.utils.parsedate_to_datetime(date_header).timestamp() if date_header else time.time()
+            return max(0.0, expires_at - served_at)
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+def response_age(headers: Mapping[str, str]) -> float:
+    """Seconds the response already spent in upstream caches, from its Age header."""
+    try:
+        return max(0.0, float(headers.get("age") or 0))
+    except ValueError:
+        return 0.0
+
+
+def expires_at_for(headers: Mapping[str, str], lifetime: float, now: Optional[float] = None) -> float:
+    """When a response with this freshness lifetime goes stale, counting the age it arrived with."""
+    return (time.time() if now is None else now) + max(0.0, lifetime - response_age(headers))
+
+
+class UrlCacheEntry:
+    __slots__ = ("url", "text", "etag", "last_modified", "expires_at", "is_error")
+
+    def __init__(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str], expires_at: float, is_error: bool):
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        self.is_error = is_error
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.expires_at > (time.time() if now is None else now)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Validators for revalidating a stale entry."""
+        headers = {}
+        if self.is_error:
+            return headers
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class UrlContentCache:
+    """
+    Persistent store of extracted URL text with HTTP validators.
+    Stale entries are revalidated with conditional requests by the caller,
+    failures are cached briefly, and total stored bytes are bounded (LRU).
+
+    The plain methods block on SQLite; the fetcher uses the *_async variants, which run them on
+    a worker thread so a slow disk never stalls the event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: str = URL_CACHE_PATH,
+        negative_ttl_sec: float = URL_CACHE_NEGATIVE_TTL_SEC,
+        default_ttl_sec: float = URL_CACHE_DEFAULT_TTL_SEC,
+        max_bytes: int = URL_CACHE_MAX_BYTES,
+        touch_batch: int = URL_CACHE_TOUCH_BATCH,
+        touch_flush_sec: float = URL_CACHE_TOUCH_FLUSH_SEC,
+    ):
+        self.db_path = db_path
+        self.negative_ttl_sec = negative_ttl_sec
+        self.default_ttl_sec = default_ttl_sec
+        self.max_bytes = max_bytes
+        self.touch_batch = max(1, touch_batch)
+        self.touch_flush_sec = touch_flush_sec
+        # Counters only; never held across SQLite calls
+        self._lock = threading.Lock()
+        # The connection and everything only it touches
+        self._db_lock = threading.Lock()
+        self._counters = {"fresh_hits": 0, "revalidated": 0, "negative_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._pending_touches: Dict[str, float] = {}
+        self._touches_since = time.monotonic()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the cache table."""
+        with self._db_lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS url_cache (
+                    url TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    is_error INTEGER NOT NULL DEFAULT 0,
+                    size_bytes INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_url_cache_access ON url_cache(last_access)")
+            self._conn.commit()
+            # Kept up to date on every write, so storing never scans the table
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM url_cache").fetchone()[0]
+
+    def lookup(self, url: str) -> Optional[UrlCacheEntry]:
+        """Returns the stored entry (fresh or stale), or None if the URL was never cached."""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, expires_at, is_error FROM url_cache WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._pending_touches[url] = time.time()
+            self._flush_touches(force=False)
+        text, etag, last_modified, expires_at, is_error = row
+        return UrlCacheEntry(url, text, etag, last_modified, expires_at, bool(is_error))
+
+    async def lookup_async(self, url: str) -> Optional[UrlCacheEntry]:
+        return await asyncio.to_thread(self.lookup, url)
+
+    def _flush_touches(self, force: bool = True):
+        """Writes queued last_access updates in one transaction. Caller holds _db_lock."""
+        if not self._pending_touches:
+            self._touches_since = time.monotonic()
+            return
+        if not force and len(self._pending_touches) < self.touch_batch and time.monotonic() - self._touches_since < self.touch_flush_sec:
+            return
+        self._conn.executemany(
+            "UPDATE url_cache SET last_access = ? WHERE url = ?",
+            [(accessed, url) for url, accessed in self._pending_touches.items()],
+        )
+        self._conn.commit()
+        self._pending_touches.clear()
+        self._touches_since = time.monotonic()
+
+    def record(self, outcome: str):
+        """Counts a lookup outcome: fresh_hits, revalidated, negative_hits or misses."""
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def store(self, url: str, text: str, headers: Mapping[str, str]):
+        """Stores a successful fetch, honouring Cache-Control/Expires and Age from `headers`."""
+        lifetime = freshness_lifetime(headers, self.default_ttl_sec)
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if lifetime is None or (lifetime == 0 and not etag and not last_modified):
+            # Nothing to serve later without a full refetch
+            return
+        self._write(url, text, etag, last_modified, expires_at_for(headers, lifetime), False)
+
+    async def store_async(self, url: str, text: str, headers: Mapping[str, str]):
+        await asyncio.to_thread(self.store, url, text, headers)
+
+    def store_failure(self, url: str, text: str):
+        """Remembers a failed fetch for the negative TTL."""
+        if self.negative_ttl_sec > 0:
+            self._write(url, text, None, None, time.time() + self.negative_ttl_sec, True)
+
+    async def store_failure_async(self, url: str, text: str):
+        await asyncio.to_thread(self.store_failure, url, text)
+
+    def refresh(self, url: str, headers: Mapping[str, str]):
+        """Extends an entry after a 304 Not Modified, picking up any new validators."""
+        lifetime = freshness_lifetime(headers, self.default_ttl_sec) or 0.0
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("""
+                UPDATE url_cache
+                SET expires_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), last_access = ?
+                WHERE url = ?
+            """, (expires_at_for(headers, lifetime, now), headers.get("etag"), headers.get("last-modified"), now, url))
+            self._pending_touches.pop(url, None)
+            self._conn.commit()
+
+    async def refresh_async(self, url: str, headers: Mapping[str, str]):
+        await asyncio.to_thread(self.refresh, url, headers)
+
+    def _write(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str], expires_at: float, is_error: bool):
+        size_bytes = len(text.encode("utf-8")) + len(url) + len(etag or "") + len(last_modified or "")
+        if size_bytes > self.max_bytes:
+            return
+        with self._db_lock:
+            replaced = self._conn.execute("SELECT size_bytes FROM url_cache WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO url_cache (url, text, etag, last_modified, expires_at, is_error, size_bytes, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, text, etag, last_modified, expires_at, int(is_error), size_bytes, time.time()))
+            self._pending_touches.pop(url, None)
+            self._bytes += size_bytes - (replaced[0] if replaced else 0)
+            evicted = self._evict()
+            self._conn.commit()
+        with self._lock:
+            self._counters["stores"] += 1
+            self._counters["evictions"] += evicted
+
+    def _evict(self) -> int:
+        """Drops least-recently-used rows until the table fits the byte budget. Caller holds _db_lock."""
+        if self._bytes <= self.max_bytes:
+            return 0
+        # LRU order needs the access times of recent lookups
+        self._flush_touches()
+        evicted = 0
+        for url, size_bytes in self._conn.execute(
+            "SELECT url, size_bytes FROM url_cache ORDER BY last_access ASC"
+        ).fetchall():
+            if self._bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM url_cache WHERE url = ?", (url,))
+            self._bytes -= size_bytes
+            evicted += 1
+        return evicted
+
+    def flush(self):
+        """Writes any queued access times."""
+        with self._db_lock:
+            self._flush_touches()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db_lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM url_cache").fetchone()[0]
+            stored_bytes = self._bytes
+            pending_touches = len(self._pending_touches)
+        with self._lock:
+            served = self._counters["fresh_hits"] + self._counters["revalidated"] + self._counters["negative_hits"]
+            lookups = served + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "bytes": stored_bytes,
+                "pending_touches": pending_touches,
+            }
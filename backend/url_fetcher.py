@@ -0,0 +1,189 @@
+import asyncio
+import contextlib
+import logging
+import os
+import urllib.parse
+import weakref
+from typing import Dict, List, Optional
+
+import httpx
+
+from url_cache import UrlContentCache
+
+logger = logging.getLogger(__name__)
+
+URL_FETCH_TIMEOUT_SEC = float(os.getenv("URL_FETCH_TIMEOUT_SEC", "10"))
+# Wall-clock budget for fetching every URL of one analysis
+URL_FETCH_DEADLINE_SEC = float(os.getenv("URL_FETCH_DEADLINE_SEC", "15"))
+URL_FETCH_MAX_CHARS = int(os.getenv("URL_FETCH_MAX_CHARS", "5000"))
+URL_FETCH_MAX_CONNECTIONS = int(os.getenv("URL_FETCH_MAX_CONNECTIONS", "64"))
+URL_FETCH_MAX_PER_HOST = int(os.getenv("URL_FETCH_MAX_PER_HOST", "4"))
+
+
+def fetch_error_text(url: str) -> str:
+    return f"[Error fetching content from {url}]"
+
+
+class _HostGate:
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        # Fetches holding or waiting for a slot; the gate is dropped when this reaches zero
+        self.users = 0
+
+
+class _LoopState:
+    __slots__ = ("client", "host_gates")
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        # Only hosts with a fetch in progress, so arbitrary cited URLs do not accumulate gates
+        self.host_gates: Dict[str, _HostGate] = {}
+
+
+class UrlFetcher:
+    """
+    Fetches URL text for prompts over a shared keep-alive connection pool.
+    Bodies are streamed and cut off at the character budget. With a
+    UrlContentCache, fresh entries skip the network and stale ones are
+    revalidated with conditional requests.
+    """
+
+    def __init__(
+        self,
+        timeout: float = URL_FETCH_TIMEOUT_SEC,
+        deadline: float = URL_FETCH_DEADLINE_SEC,
+        max_chars: int = URL_FETCH_MAX_CHARS,
+        max_connections: int = URL_FETCH_MAX_CONNECTIONS,
+        max_per_host: int = URL_FETCH_MAX_PER_HOST,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[UrlContentCache] = None,
+    ):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_chars = max_chars
+        self.max_connections = max_connections
+        self.max_per_host = max(1, max_per_host)
+        self._transport = transport
+        self.cache = cache
+        # Clients and semaphores cannot be shared across event loops
+        self._states = weakref.WeakKeyDictionary()
+
+    def _get_state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30.0,
+                ),
+                transport=self._transport,
+            )
+            state = _LoopState(client)
+            self._states[loop] = state
+        return state
+
+    @contextlib.asynccontextmanager
+    async def _host_gate(self, state: _LoopState, url: str):
+        """Holds one of the host's `max_per_host` slots for the duration of the block."""
+        host = urllib.parse.urlparse(url).netloc.lower()
+        gate = state.host_gates.get(host)
+        if gate is None:
+            gate = state.host_gates[host] = _HostGate(self.max_per_host)
+        gate.users += 1
+        try:
+            async with gate.semaphore:
+                yield
+        finally:
+            gate.users -= 1
+            if not gate.users:
+                del state.host_gates[host]
+
+    async def fetch(self, url: str) -> str:
+        """Fetches up to `max_chars` of decoded text from `url`, or an error marker on failure."""
+        entry = await self.cache.lookup_async(url) if self.cache else None
+        if entry is not None and entry.is_fresh():
+            self.cache.record("negative_hits" if entry.is_error else "fresh_hits")
+            return entry.text
+
+        state = self._get_state()
+        request_headers = entry.conditional_headers() if entry is not None else {}
+        try:
+            async with self._host_gate(state, url):
+                async with state.client.stream("GET", url, headers=request_headers) as response:
+                    if response.status_code == 304 and entry is not None and not entry.is_error:
+                        await self.cache.refresh_async(url, response.headers)
+                        self.cache.record("revalidated")
+                        return entry.text
+
+                    response.raise_for_status()
+                    parts = []
+                    remaining = self.max_chars
+                    async for chunk in response.aiter_text():
+                        parts.append(chunk[:remaining])
+                        remaining -= len(parts[-1])
+                        if remaining <= 0:
+                            break
+                    text = "".join(parts)
+
+            if self.cache:
+                self.cache.record("misses")
+                await self.cache.store_async(url, text, response.headers)
+            return text
+        except Exception as e:
+            logger.error(f"Error fetching URL {url}: {e}")
+            error_text = fetch_error_text(url)
+            if self.cache:
+                self.cache.record("misses")
+                await self.cache.store_failure_async(url, error_text)
+            return error_text
+
+    async def fetch_all(self, urls: List[str], deadline: Optional[float] = None) -> List[str]:
+        """
+        Fetches all URLs concurrently. Results keep the input order; any URL still
+        pending when the deadline passes gets the error marker instead.
+        """
+        if not urls:
+            return []
+        deadline = self.deadline if deadline is None else deadline
+
+        tasks = [asyncio.ensure_future(self.fetch(url)) for url in urls]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"URL fetch deadline of {deadline:.1f}s hit; {len(pending)} of {len(urls)} URLs dropped")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        return [task.result() if task in done else fetch_error_text(url) for task, url in zip(tasks, urls)]
+
+    async def preconnect(self, urls: List[str]) -> int:
+        """
+        Opens pooled keep-alive connections (DNS, TCP, TLS) to `urls` with HEAD requests,
+        so the first real fetch from those hosts skips the handshakes. Returns how many
+        connections were opened; failures are ignored.
+        """
+        state = self._get_state()
+
+        async def head(url: str) -> bool:
+            try:
+                async with self._host_gate(state, url):
+                    await state.client.head(url)
+                return True
+            except Exception as e:
+                logger.warning(f"Pre-connect to {url} failed: {e}")
+                return False
+
+        return sum(await asyncio.gather(*(head(url) for url in urls)))
+
+    async def aclose(self):
+        """Closes the connection pool owned by the current event loop."""
+        loop = asyncio.get_running_loop()
+        state = self._states.pop(loop, None)
+        if state is not None:
+            await state.client.aclose()
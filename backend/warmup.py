@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run warm-up from the lifespan; otherwise it waits for the first POST /warmup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+# Hold lifespan startup until warm-up finishes instead of warming in the background
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "false").lower() == "true"
+WARMUP_TIMEOUT_SEC = float(os.getenv("WARMUP_TIMEOUT_SEC", "30"))
+# Comma-separated origins whose TLS connections are opened ahead of the first URL fetch
+WARMUP_PRECONNECT_URLS = [u.strip() for u in os.getenv("WARMUP_PRECONNECT_URLS", "").split(",") if u.strip()]
+# One metadata call to Vertex AI: fetches the OAuth token and opens the client's connection
+WARMUP_MODEL_PING = os.getenv("WARMUP_MODEL_PING", "true").lower() == "true"
+
+
+class WarmupStep:
+    """A named warm-up action. A failed required step keeps the instance out of rotation."""
+
+    __slots__ = ("name", "run", "required")
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]], required: bool = True):
+        self.name = name
+        self.run = run
+        self.required = required
+
+
+class Warmup:
+    """
+    Runs the warm-up steps once per instance, in order, and tracks readiness. Concurrent
+    callers (the lifespan and POST /warmup) share the same run. Optional steps that fail
+    are reported but do not block readiness; a failed required step does, until a later
+    run succeeds.
+    """
+
+    def __init__(self, steps: List[WarmupStep], timeout: float = WARMUP_TIMEOUT_SEC):
+        self.steps = steps
+        self.timeout = timeout
+        self.state = "pending"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def start(self) -> "asyncio.Task":
+        """Starts a run in the background, or returns the one already running."""
+        if self._task is None or (self._task.done() and self.state == "failed"):
+            self._task = asyncio.ensure_future(self._run())
+        return self._task
+
+    async def run(self) -> Dict[str, Any]:
+        await asyncio.shield(self.start())
+        return self.describe()
+
+    async def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        self.state = "running"
+        self.started_at = time.time()
+        self.finished_at = None
+        self.results = {}
+        failed = False
+        deadline = time.monotonic() + self.timeout
+        for step in self.steps:
+            started = time.perf_counter()
+            result: Dict[str, Any] = {"status": "ok", "required": step.required}
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                detail = await asyncio.wait_for(step.run(), timeout=remaining)
+                if detail is not None:
+                    result["detail"] = detail
+            except asyncio.TimeoutError:
+                result.update(status="failed", error=f"timed out after {self.timeout:.0f}s")
+            except Exception as e:
+                result.update(status="failed", error=str(e))
+            result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.results[step.name] = result
+            if result["status"] == "failed":
+                log = logger.error if step.required else logger.warning
+                log(f"Warm-up step {step.name} failed: {result['error']}")
+                failed = failed or step.required
+        self.finished_at = time.time()
+        self.state = "failed" if failed else "ready"
+        logger.info(f"Warm-up {self.state} in {self.finished_at - self.started_at:.2f}s")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 1) if self.finished_at else None,
+            "steps": self.results,
+        }